@@ -0,0 +1,115 @@
+"""
+Batch ingest benchmark — files/sec for POST /api/artifacts/batch vs one-by-one uploads
+
+Usage (against a running backend):
+    python benchmarks/batch_upload.py --url http://localhost:8000 --files 1000 --batch-size 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+
+def make_files(count: int, size: int) -> list[tuple[str, bytes, str]]:
+    """Small unique .html/.gif payloads, like a legacy site dump."""
+    files = []
+    for i in range(count):
+        if i % 2:
+            files.append(
+                (
+                    f"page_{i}.html",
+                    f"<html><body>{i}</body></html>".encode().ljust(size, b" "),
+                    "text/html",
+                )
+            )
+        else:
+            files.append(
+                (f"img_{i}.gif", b"GIF89a" + os.urandom(max(0, size - 6)), "image/gif")
+            )
+    return files
+
+
+async def run_batch(
+    client: httpx.AsyncClient, url: str, files: list, batch_size: int, parallel: int
+) -> float:
+    slots = asyncio.Semaphore(parallel)
+    failed = 0
+
+    async def send(chunk: list) -> None:
+        nonlocal failed
+        async with slots:
+            response = await client.post(
+                f"{url}/api/artifacts/batch",
+                files=[
+                    ("files", (name, body, content_type))
+                    for name, body, content_type in chunk
+                ],
+            )
+            response.raise_for_status()
+            failed += response.json()["failed"]
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(send(files[i : i + batch_size]) for i in range(0, len(files), batch_size))
+    )
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"   ⚠️ {failed} file(s) failed")
+    return elapsed
+
+
+async def run_single(
+    client: httpx.AsyncClient, url: str, files: list, parallel: int
+) -> float:
+    slots = asyncio.Semaphore(parallel)
+
+    async def send(name: str, body: bytes, content_type: str) -> None:
+        async with slots:
+            response = await client.post(
+                f"{url}/api/artifacts/upload",
+                files={"file": (name, body, content_type)},
+            )
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(*f) for f in files))
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=2048, help="bytes per file")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent requests")
+    parser.add_argument(
+        "--skip-single", action="store_true", help="only benchmark the batch endpoint"
+    )
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/")
+    async with httpx.AsyncClient(timeout=300.0) as client:
+        batch_files = make_files(args.files, args.size)
+        elapsed = await run_batch(
+            client, url, batch_files, args.batch_size, args.parallel
+        )
+        print(
+            f"📦 batch  : {args.files} files in {elapsed:.2f}s → {args.files / elapsed:.1f} files/s"
+        )
+
+        if not args.skip_single:
+            single_files = make_files(args.files, args.size)
+            elapsed = await run_single(client, url, single_files, args.parallel)
+            print(
+                f"📄 single : {args.files} files in {elapsed:.2f}s → {args.files / elapsed:.1f} files/s"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
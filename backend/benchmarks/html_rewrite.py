@@ -0,0 +1,126 @@
+"""
+HTML rewrite benchmark — throughput and peak memory of the streaming sanitizer on large legacy pages
+
+Usage (no server needed; run from backend/):
+    python benchmarks/html_rewrite.py --size-mb 8 --assets 500 --chunk-kb 64
+"""
+
+import argparse
+import codecs
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.html_rewrite import HTMLRewriter, resolve_member_path  # noqa: E402
+
+
+def make_page(size: int, assets: int) -> bytes:
+    """A frameset-era page: tables, spacer gifs, inline handlers, scripts and styles."""
+    rng = random.Random(42)
+    parts = [
+        '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">',
+        '<html><head><meta charset=windows-1252><link rel=stylesheet href="css/site.css">',
+        "<style>body { background: url(img/bg.gif) } .nav { background-image: url('img/nav.gif') }</style>",
+        '<script>function popup(u){window.open(u)}</script></head><body onload="init()">',
+    ]
+    length = sum(len(p) for p in parts)
+    row = 0
+    while length < size:
+        asset = rng.randrange(assets)
+        chunk = (
+            f'<table width=100% background="img/tile{asset % 20}.gif"><tr><td onmouseover="hi({row})">'
+            f'<img src="img/spacer.gif" width=1 height=1><a href="pages/page{asset}.html">Page &amp; {row}</a>'
+            f'<img src="img/photo{asset}.jpg" alt="photo"><a href="javascript:popup(\'x\')">pop</a>'
+            f"<font face=\"Comic Sans MS\">Welcome to my homepage! {'~' * rng.randrange(40)}</font></td></tr></table>\n"
+        )
+        if row % 50 == 0:
+            chunk += "<script>document.write('<blink>counter</blink>')</script>\n"
+        parts.append(chunk)
+        length += len(chunk)
+        row += 1
+    parts.append("</body></html>")
+    return "".join(parts).encode("cp1252")
+
+
+def rewrite(page: bytes, chunk_size: int, members: dict[str, str]) -> tuple[int, dict]:
+    """Feed the page chunk by chunk, discarding output as it's produced (as the upload does)."""
+
+    def resolve(url: str):
+        target = resolve_member_path("site/index.html", url)
+        return members.get(target[0]) if target else None
+
+    rewriter = HTMLRewriter(resolve)
+    decoder = codecs.getincrementaldecoder("cp1252")(errors="replace")
+    out_bytes = 0
+    for i in range(0, len(page), chunk_size):
+        out_bytes += len(
+            rewriter.feed(decoder.decode(page[i : i + chunk_size])).encode("utf-8")
+        )
+    out_bytes += len(rewriter.close().encode("utf-8"))
+    return out_bytes, rewriter.stats
+
+
+def run(
+    page: bytes, chunk_size: int, members: dict[str, str]
+) -> tuple[float, int, int, dict]:
+    """Timed pass, then a tracemalloc pass for peak memory (tracing slows the parser down a lot)."""
+    started = time.perf_counter()
+    out_bytes, stats = rewrite(page, chunk_size, members)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    rewrite(page, chunk_size, members)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, out_bytes, peak, stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--size-mb", type=float, default=8.0, help="page size")
+    parser.add_argument(
+        "--assets", type=int, default=500, help="distinct asset references"
+    )
+    parser.add_argument(
+        "--chunk-kb",
+        type=int,
+        nargs="+",
+        default=[16, 64, 1024],
+        help="feed chunk sizes to compare",
+    )
+    args = parser.parse_args()
+
+    page = make_page(int(args.size_mb * 1024 * 1024), args.assets)
+    members = {
+        f"site/img/photo{i}.jpg": f"https://cdn.example/photo{i}.jpg"
+        for i in range(args.assets)
+    }
+    members.update(
+        {
+            f"site/pages/page{i}.html": f"https://cdn.example/page{i}.html"
+            for i in range(args.assets)
+        }
+    )
+    members.update(
+        {f"site/img/tile{i}.gif": "https://cdn.example/tile.gif" for i in range(20)}
+    )
+    members["site/img/spacer.gif"] = "https://cdn.example/spacer.gif"
+    members["site/css/site.css"] = "https://cdn.example/site.css"
+
+    print(f"📄 page: {len(page) / 1024 / 1024:.1f} MiB, {args.assets} distinct assets")
+    for chunk_kb in args.chunk_kb:
+        elapsed, out_bytes, peak, stats = run(page, chunk_kb * 1024, members)
+        print(
+            f"   chunk {chunk_kb:>5} KiB: {len(page) / 1024 / 1024 / elapsed:6.1f} MiB/s, "
+            f"peak traced memory {peak / 1024 / 1024:6.2f} MiB, output {out_bytes / 1024 / 1024:.1f} MiB"
+        )
+    print(f"   {stats}")
+
+
+if __name__ == "__main__":
+    main()
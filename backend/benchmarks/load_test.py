@@ -0,0 +1,616 @@
+"""
+Ingestion API load test — boots the backend against local stand-ins and drives a mixed workload
+
+The API runs as a uvicorn subprocess wired to an in-process PostgREST stub (Supabase),
+a fake ElevenLabs with configurable latency, and either local-disk storage or a moto /
+MinIO S3 endpoint. Virtual users mix uploads of varied sizes, status polling and listing;
+the report has req/s and p50/p95/p99 per operation, upload→ready migration latency and
+the API's peak RSS. Payloads and the operation mix are seeded, so JSON results from
+different commits are comparable.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --duration 30 --users 16 --output results.json
+    python benchmarks/load_test.py --compare results.json          # deltas vs a previous run
+    python benchmarks/load_test.py --storage moto                  # needs moto[server]
+    python benchmarks/load_test.py --s3-endpoint http://localhost:9000   # MinIO; AWS_* creds from env
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from standins import FakeElevenLabs, PostgrestStub, free_port, serve  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SIZE_UNITS = {"k": 1024, "m": 1024 * 1024}
+TERMINAL_STATUSES = {"ready", "failed"}
+BENCHMARK_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYmVuY2htYXJrIn0.benchmark"  # supabase-py wants a JWT shape
+CLIENT_HEADER = "X-Load-Client"  # every virtual user shares 127.0.0.1, so upload admission keys on this instead
+
+current_user: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_user", default="user-0"
+)
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    return (
+        int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+        if text[-1] in SIZE_UNITS
+        else int(text)
+    )
+
+
+def make_swf(size: int, rng: random.Random) -> bytes:
+    """Uncompressed FWS movie padded to ~`size` with a DefineBinaryData tag (recompressed on migration)."""
+    rect = bytes(
+        [0x50, 0x00, 0x02, 0x58, 0x00, 0x00, 0x96, 0x00, 0x00]
+    )  # 5-bit RECT: 0..800 x 0..600 twips/20
+    padding = max(0, size - 40)
+    body = rect + struct.pack("<HH", 24 << 8, 1)
+    body += struct.pack("<H", (69 << 6) | 4) + struct.pack("<I", 0x08)  # FileAttributes
+    body += (
+        struct.pack("<H", (87 << 6) | 0x3F)
+        + struct.pack("<I", padding + 6)
+        + struct.pack("<HI", 1, 0)
+    )
+    body += rng.randbytes(padding // 4) * 4 + bytes(padding % 4)
+    body += struct.pack("<H", 0)  # End
+    return b"FWS" + bytes([10]) + struct.pack("<I", len(body) + 8) + body
+
+
+def make_payload(index: int, size: int, rng: random.Random) -> tuple[str, bytes, str]:
+    """Rotate through page / movie / binary uploads so each migration strategy gets traffic."""
+    kind = index % 3
+    if kind == 0:
+        row = f'<p>Guestbook entry {index}: <a href="page_{index + 1}.html">next</a> <img src="counter.gif"></p>\n'
+        body = f"<html><head><title>Page {index}</title></head><body>\n".encode()
+        body += row.encode() * max(1, (size - len(body)) // len(row))
+        return f"page_{index}.html", body + b"</body></html>", "text/html"
+    if kind == 1:
+        return (
+            f"movie_{index}.swf",
+            make_swf(size, rng),
+            "application/x-shockwave-flash",
+        )
+    return f"blob_{index}.bin", rng.randbytes(size), "application/octet-stream"
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(
+        0,
+        min(
+            len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1
+        ),
+    )
+    return sorted_values[rank]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+class RssSampler:
+    """Samples the resident set of a process and its children from /proc (Linux only)."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_tree_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.available = Path(f"/proc/{pid}/status").exists()
+
+    @staticmethod
+    def _status_kb(pid: int, field: str) -> int:
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def _tree(self) -> list[int]:
+        children: dict[int, list[int]] = {}
+        for entry in Path("/proc").iterdir():
+            if entry.name.isdigit():
+                try:
+                    ppid = int(
+                        (entry / "stat").read_text().rsplit(")", 1)[1].split()[1]
+                    )
+                except (OSError, ValueError, IndexError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry.name))
+        tree, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            tree.append(pid)
+            stack.extend(children.get(pid, []))
+        return tree
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            total = sum(self._status_kb(pid, "VmRSS") for pid in self._tree()) * 1024
+            self.peak_tree_bytes = max(self.peak_tree_bytes, total)
+
+    def start(self) -> "RssSampler":
+        if self.available:
+            self._thread.start()
+        return self
+
+    def stop(self) -> dict:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return {
+            "api_peak_rss_mb": round(self._status_kb(self.pid, "VmHWM") / 1024, 1),
+            "process_tree_peak_rss_mb": round(self.peak_tree_bytes / (1024 * 1024), 1),
+        }
+
+
+class Workload:
+    """Virtual users picking upload / poll / list by weight until the deadline."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.sizes = [parse_size(s) for s in args.sizes.split(",")]
+        self.ops = ["upload", "poll", "list"]
+        self.weights = [float(w) for w in args.mix.split(",")]
+        self.latencies: dict[str, list[float]] = {op: [] for op in self.ops}
+        self.errors: dict[str, int] = {op: 0 for op in self.ops}
+        self.uploaded_bytes = 0
+        self.uploads = 0
+        self.pending: dict[str, float] = {}  # artifact_id → upload completed at
+        self.known: list[str] = []
+        self.next_cursor: Optional[str] = None
+        self.migrations: list[float] = []
+        self.migration_statuses: dict[str, int] = {}
+
+    def _observe(self, artifact: dict) -> None:
+        artifact_id = artifact.get("artifact_id")
+        status = artifact.get("status")
+        if artifact_id in self.pending and status in TERMINAL_STATUSES:
+            self.migrations.append(time.perf_counter() - self.pending.pop(artifact_id))
+            self.migration_statuses[status] = self.migration_statuses.get(status, 0) + 1
+
+    async def upload(self, rng: random.Random) -> None:
+        index = self.uploads
+        self.uploads += 1
+        name, body, content_type = make_payload(index, rng.choice(self.sizes), rng)
+        response = await self.client.post(
+            "/api/artifacts/upload",
+            files={"file": (name, body, content_type)},
+            headers={CLIENT_HEADER: current_user.get()},
+        )
+        response.raise_for_status()
+        artifact = response.json()
+        self.uploaded_bytes += len(body)
+        self.known.append(artifact["artifact_id"])
+        if artifact["status"] not in TERMINAL_STATUSES:
+            self.pending[artifact["artifact_id"]] = time.perf_counter()
+
+    async def poll(self, rng: random.Random) -> None:
+        candidates = list(self.pending) or self.known
+        if not candidates:
+            return await self.list(rng)
+        artifact_id = candidates[0] if self.pending else rng.choice(candidates)
+        response = await self.client.get(f"/api/artifacts/{artifact_id}")
+        response.raise_for_status()
+        self._observe(response.json())
+
+    async def list(self, rng: random.Random) -> None:
+        """First page, or (half the time) the page after the last one seen — keyset pagination."""
+        params = {"limit": self.args.page_size}
+        if self.next_cursor and rng.random() < 0.5:
+            params["cursor"] = self.next_cursor
+        response = await self.client.get("/api/artifacts", params=params)
+        response.raise_for_status()
+        page = response.json()
+        self.next_cursor = page.get("next_cursor")
+        for artifact in page["artifacts"]:
+            self._observe(artifact)
+
+    async def user(self, seed: int, deadline: float) -> None:
+        rng = random.Random(seed)
+        current_user.set(f"user-{seed}")
+        while time.perf_counter() < deadline:
+            op = rng.choices(self.ops, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                await getattr(self, op)(rng)
+                self.latencies[op].append(time.perf_counter() - started)
+            except (httpx.HTTPError, KeyError, ValueError):
+                self.errors[op] += 1
+
+    async def drain(self, timeout: float) -> None:
+        """Poll outstanding migrations until they finish or `timeout` passes."""
+        deadline = time.perf_counter() + timeout
+        while self.pending and time.perf_counter() < deadline:
+            for artifact_id in list(self.pending)[:50]:
+                try:
+                    response = await self.client.get(f"/api/artifacts/{artifact_id}")
+                    self._observe(response.json())
+                except (httpx.HTTPError, ValueError):
+                    pass
+            await asyncio.sleep(0.1)
+
+
+async def wait_until_ready(
+    url: str, process: subprocess.Popen, timeout: float = 60.0
+) -> float:
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"API exited during startup (code {process.returncode})"
+                )
+            try:
+                if (await client.get(f"{url}/ready")).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("API did not become ready in time")
+
+
+async def run(args: argparse.Namespace, url: str, process: subprocess.Popen) -> dict:
+    startup_seconds = await wait_until_ready(url, process)
+    sampler = RssSampler(process.pid).start()
+    limits = httpx.Limits(
+        max_connections=args.users, max_keepalive_connections=args.users
+    )
+    async with httpx.AsyncClient(base_url=url, timeout=120.0, limits=limits) as client:
+        workload = Workload(client, args)
+        if args.warmup:
+            await asyncio.gather(
+                *(
+                    workload.user(
+                        args.seed + 10_000 + i, time.perf_counter() + args.warmup
+                    )
+                    for i in range(args.users)
+                )
+            )
+            workload.latencies = {op: [] for op in workload.ops}
+            workload.errors = {op: 0 for op in workload.ops}
+            workload.migrations.clear()
+            workload.migration_statuses.clear()
+            workload.uploaded_bytes = 0
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                workload.user(args.seed + i, started + args.duration)
+                for i in range(args.users)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        await workload.drain(args.drain_timeout)
+
+    memory = sampler.stop()
+    everything = [
+        latency for values in workload.latencies.values() for latency in values
+    ]
+    return {
+        "startup_seconds": round(startup_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "total": summarize(everything, elapsed, sum(workload.errors.values())),
+        "operations": {
+            op: summarize(workload.latencies[op], elapsed, workload.errors[op])
+            for op in workload.ops
+        },
+        "upload_mib_per_s": round(workload.uploaded_bytes / (1024 * 1024) / elapsed, 2),
+        "migrations": {
+            **summarize(workload.migrations, elapsed),
+            "statuses": workload.migration_statuses,
+            "unfinished": len(workload.pending),
+        },
+        "memory": memory,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, baseline: Optional[dict]) -> None:
+    def delta(path: list[str], value: float) -> str:
+        if not baseline:
+            return ""
+        previous = baseline["results"]
+        for part in path:
+            previous = previous.get(part, {}) if isinstance(previous, dict) else {}
+        if not isinstance(previous, (int, float)) or not previous:
+            return ""
+        return f" ({(value - previous) / previous * 100:+.1f}%)"
+
+    r = results["results"]
+    print(
+        f"\n📊 {results['commit'] or 'working tree'} — {r['elapsed_seconds']}s, {results['config']['users']} users, "
+        f"startup {r['startup_seconds']}s"
+    )
+    for name, stats in [
+        ("total", r["total"]),
+        *r["operations"].items(),
+        ("migrations", r["migrations"]),
+    ]:
+        section = (
+            ["total"]
+            if name == "total"
+            else ["migrations"] if name == "migrations" else ["operations", name]
+        )
+        line = f"   {name:<10} {stats['count']:>6} "
+        if name != "migrations":
+            line += (
+                f"| {stats['rps']:>8.1f} req/s{delta(section + ['rps'], stats['rps'])} "
+            )
+        line += (
+            f"| p50 {stats['p50_ms']:.1f}ms{delta(section + ['p50_ms'], stats['p50_ms'])} "
+            f"p95 {stats['p95_ms']:.1f}ms{delta(section + ['p95_ms'], stats['p95_ms'])} "
+            f"p99 {stats['p99_ms']:.1f}ms{delta(section + ['p99_ms'], stats['p99_ms'])}"
+        )
+        if stats.get("errors"):
+            line += f" | ⚠️ {stats['errors']} errors"
+        print(line)
+    migrations = r["migrations"]
+    if migrations["unfinished"]:
+        print(f"   ⚠️ {migrations['unfinished']} migration(s) unfinished after drain")
+    print(
+        f"   📦 upload {r['upload_mib_per_s']} MiB/s | migrations {migrations['statuses']}"
+    )
+    memory = r["memory"]
+    print(
+        f"   🧠 peak RSS: API {memory['api_peak_rss_mb']} MB"
+        f"{delta(['memory', 'api_peak_rss_mb'], memory['api_peak_rss_mb'])}, "
+        f"process tree {memory['process_tree_peak_rss_mb']} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument(
+        "--warmup", type=float, default=3.0, help="unmeasured seconds before the run"
+    )
+    parser.add_argument(
+        "--users", type=int, default=16, help="concurrent virtual users"
+    )
+    parser.add_argument("--mix", default="2,6,2", help="upload,poll,list weights")
+    parser.add_argument(
+        "--sizes", default="4k,64k,512k,4m", help="upload sizes to draw from"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=50, help="limit for list requests"
+    )
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument(
+        "--db-latency-ms",
+        type=float,
+        default=5.0,
+        help="added to every PostgREST request",
+    )
+    parser.add_argument(
+        "--tts-latency-ms",
+        type=float,
+        default=400.0,
+        help="fake ElevenLabs synthesis time",
+    )
+    parser.add_argument(
+        "--tts-429-ratio",
+        type=float,
+        default=0.0,
+        help="share of TTS calls answered 429",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["local", "moto"],
+        default="local",
+        help="local-disk backend or an in-process moto S3 server",
+    )
+    parser.add_argument(
+        "--s3-endpoint",
+        help="existing S3-compatible endpoint (e.g. MinIO); overrides --storage",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=60.0,
+        help="seconds to wait for queued migrations",
+    )
+    parser.add_argument(
+        "--api-env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="extra environment for the API process (repeatable)",
+    )
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="previous JSON results to diff against")
+    parser.add_argument(
+        "--keep-data", action="store_true", help="keep the temp data directory"
+    )
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    workdir = Path(tempfile.mkdtemp(prefix="necronet-bench-"))
+    postgrest = PostgrestStub(latency_seconds=args.db_latency_ms / 1000)
+    elevenlabs = FakeElevenLabs(
+        latency_seconds=args.tts_latency_ms / 1000,
+        rate_limit_ratio=args.tts_429_ratio,
+        seed=args.seed,
+    )
+
+    with ExitStack() as stack:
+        env = {
+            **os.environ,
+            "SUPABASE_URL": stack.enter_context(serve(postgrest.app)),
+            "SUPABASE_KEY": BENCHMARK_SUPABASE_KEY,
+            "ELEVENLABS_API_BASE": stack.enter_context(serve(elevenlabs.app)),
+            "ELEVENLABS_API_KEY": "benchmark",
+            "ELEVENLABS_VOICE_ID": "benchmark-voice",
+            "USE_MOCK_MODE": "false",
+            "MIGRATION_QUEUE_PATH": str(workdir / "migration_jobs.db"),
+            "UPLOAD_CLIENT_HEADER": CLIENT_HEADER,
+            "PYTHONUNBUFFERED": "1",
+        }
+        if args.s3_endpoint:
+            env.update(
+                {
+                    "STORAGE_BACKEND": "s3",
+                    "AWS_S3_ENDPOINT": args.s3_endpoint,
+                    "AWS_S3_BUCKET": os.getenv("AWS_S3_BUCKET", "necronet-bench"),
+                }
+            )
+        elif args.storage == "moto":
+            try:
+                from moto.server import ThreadedMotoServer
+            except ImportError:
+                sys.exit(
+                    "❌ --storage moto needs moto[server] (pip install 'moto[server]')"
+                )
+            import boto3
+
+            port = free_port()
+            moto_server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+            moto_server.start()
+            stack.callback(moto_server.stop)
+            endpoint = f"http://127.0.0.1:{port}"
+            credentials = {
+                "aws_access_key_id": "benchmark",
+                "aws_secret_access_key": "benchmark",
+            }
+            boto3.client(
+                "s3", endpoint_url=endpoint, region_name="us-east-1", **credentials
+            ).create_bucket(Bucket="necronet-bench")
+            env.update(
+                {
+                    "STORAGE_BACKEND": "s3",
+                    "AWS_S3_ENDPOINT": endpoint,
+                    "AWS_S3_BUCKET": "necronet-bench",
+                    "AWS_S3_REGION": "us-east-1",
+                    "AWS_ACCESS_KEY_ID": "benchmark",
+                    "AWS_SECRET_ACCESS_KEY": "benchmark",
+                }
+            )
+        else:
+            env.update(
+                {
+                    "STORAGE_BACKEND": "local",
+                    "LOCAL_STORAGE_PATH": str(workdir / "objects"),
+                    "AWS_ACCESS_KEY_ID": "",
+                    "AWS_SECRET_ACCESS_KEY": "",
+                }
+            )
+        env.update(item.split("=", 1) for item in args.api_env)
+
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        log_path = workdir / "api.log"
+        log = stack.enter_context(open(log_path, "w"))
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        print(f"🚀 API pid {process.pid} on {url} (log: {log_path})")
+        measured = None
+        try:
+            measured = asyncio.run(run(args, url, process))
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            if measured is None:
+                print(f"❌ Run failed — see {log_path}")
+
+    if not RssSampler(os.getpid()).available:
+        measured["memory"]["api_peak_rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        )
+
+    results = {
+        "commit": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            k: v
+            for k, v in vars(args).items()
+            if k not in ("output", "compare", "keep_data")
+        },
+        "standins": {
+            "postgrest_requests": postgrest.requests,
+            "tts_requests": elevenlabs.requests,
+            "tts_rate_limited": elevenlabs.rate_limited,
+            "artifact_rows": len(postgrest.tables.get("artifacts", {})),
+        },
+        "results": measured,
+    }
+    print_report(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"💾 Results written to {args.output}")
+    if not args.keep_data:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
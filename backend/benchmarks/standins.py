@@ -0,0 +1,332 @@
+"""
+Local stand-ins for the API's external services, for benchmarks
+- PostgrestStub: the slice of PostgREST that supabase-py uses (filters, in/or=, order, limit/Range, counts, upserts,
+  foreign keys)
+- FakeElevenLabs: text-to-speech endpoint returning fake audio after a configurable delay
+- serve(): runs an ASGI app on a background uvicorn thread
+"""
+
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+from typing import Any, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+FILTER_RE = re.compile(r"^(\w+)\.(eq|neq|lt|lte|gt|gte|is|in)\.(.*)$", re.DOTALL)
+RESERVED_PARAMS = {
+    "select",
+    "order",
+    "limit",
+    "offset",
+    "on_conflict",
+    "or",
+    "and",
+    "columns",
+}
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _split_top_level(text: str) -> list[str]:
+    """Split "a,b(c,d),e" on commas outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and ch == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current))
+    return [p for p in parts if p]
+
+
+def _compare(row_value: Any, op: str, value: str) -> bool:
+    if op == "is":
+        return row_value is None if value == "null" else str(row_value).lower() == value
+    if row_value is None:
+        return False
+    if op == "in":
+        return str(row_value) in {
+            _unquote(item) for item in _split_top_level(value.strip("()"))
+        }
+    left, right = (
+        (row_value, type(row_value)(value))
+        if isinstance(row_value, (int, float))
+        else (str(row_value), value)
+    )
+    return {
+        "eq": left == right,
+        "neq": left != right,
+        "lt": left < right,
+        "lte": left <= right,
+        "gt": left > right,
+        "gte": left >= right,
+    }[op]
+
+
+def _condition(expr: str):
+    """Row predicate for "col.op.value", "and(...)" or "or(...)"."""
+    for combinator, reducer in (("and(", all), ("or(", any)):
+        if expr.startswith(combinator) and expr.endswith(")"):
+            terms = [
+                _condition(term)
+                for term in _split_top_level(expr[len(combinator) : -1])
+            ]
+            return lambda row: reducer(term(row) for term in terms)
+    match = FILTER_RE.match(expr)
+    if not match:
+        raise ValueError(f"Unsupported filter: {expr}")
+    column, op, value = match.groups()
+    return lambda row: _compare(
+        row.get(column), op, value if op == "in" else _unquote(value)
+    )
+
+
+class PostgrestStub:
+    """In-memory tables behind /rest/v1/{table}, with a fixed per-request latency.
+
+    Rows are keyed by `primary_keys[table]`; counts are always exact, whatever
+    mode is requested. `foreign_keys[table] = (column, referenced table)` rejects
+    inserts whose rows reference a missing row, as Postgres does (23503).
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        primary_keys: Optional[dict[str, str]] = None,
+        foreign_keys: Optional[dict[str, tuple[str, str]]] = None,
+    ):
+        self.latency_seconds = latency_seconds
+        self.primary_keys = primary_keys or {"artifacts": "artifact_id"}
+        if foreign_keys is None:
+            foreign_keys = {"migration_logs": ("artifact_id", "artifacts")}
+        self.foreign_keys = foreign_keys
+        self.tables: dict[str, dict[Any, dict]] = {}
+        self.requests = 0
+        self.app = Starlette(
+            routes=[
+                Route(
+                    "/rest/v1/{table}",
+                    self.handle,
+                    methods=["GET", "POST", "PATCH", "DELETE"],
+                )
+            ]
+        )
+
+    def _matching(self, table: str, request: Request) -> list[dict]:
+        predicates = []
+        for key, value in request.query_params.multi_items():
+            if key == "or":
+                predicates.append(_condition(f"or{value}"))
+            elif key == "and":
+                predicates.append(_condition(f"and{value}"))
+            elif key not in RESERVED_PARAMS:
+                predicates.append(_condition(f"{key}.{value}"))
+        return [
+            row
+            for row in self.tables.get(table, {}).values()
+            if all(p(row) for p in predicates)
+        ]
+
+    @staticmethod
+    def _order(rows: list[dict], order: Optional[str]) -> list[dict]:
+        for term in reversed(_split_top_level(order or "")):
+            column, _, direction = term.partition(".")
+            descending = direction.startswith("desc")
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            rows = (
+                sorted(present, key=lambda r: r[column], reverse=descending) + missing
+            )
+        return rows
+
+    @staticmethod
+    def _project(rows: list[dict], select: Optional[str]) -> list[dict]:
+        if not select or select == "*":
+            return rows
+        columns = [c.strip() for c in select.split(",")]
+        return [{c: row.get(c) for c in columns} for row in rows]
+
+    async def handle(self, request: Request) -> Response:
+        self.requests += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        table = request.path_params["table"]
+        rows = self.tables.setdefault(table, {})
+        pk = self.primary_keys.get(table, "id")
+        prefer = request.headers.get("prefer", "")
+        params = request.query_params
+
+        try:
+            if request.method == "GET":
+                matched = self._order(
+                    self._matching(table, request), params.get("order")
+                )
+                start, end = 0, len(matched) - 1
+                if request.headers.get("range"):
+                    first, _, last = request.headers["range"].partition("-")
+                    start, end = int(first), min(int(last), end) if last else end
+                start += int(params.get("offset", 0))
+                if params.get("limit"):
+                    end = min(end, start + int(params["limit"]) - 1)
+                page = matched[start : end + 1]
+                headers = {}
+                if "count=" in prefer:
+                    headers["Content-Range"] = (
+                        f"{start}-{start + len(page) - 1}/{len(matched)}"
+                        if page
+                        else f"*/{len(matched)}"
+                    )
+                return JSONResponse(
+                    self._project(page, params.get("select")), headers=headers
+                )
+
+            if request.method == "POST":
+                body = await request.json()
+                incoming = body if isinstance(body, list) else [body]
+                merge = "resolution=merge-duplicates" in prefer
+                if len({frozenset(row) for row in incoming}) > 1:
+                    return JSONResponse(
+                        {"code": "PGRST102", "message": "All object keys must match"},
+                        status_code=400,
+                    )
+                if table in self.foreign_keys:
+                    column, referenced = self.foreign_keys[table]
+                    if any(
+                        row.get(column) not in self.tables.get(referenced, {})
+                        for row in incoming
+                    ):
+                        return JSONResponse(
+                            {
+                                "code": "23503",
+                                "message": f"insert on {table} violates foreign key on {column}",
+                            },
+                            status_code=409,
+                        )
+                written = []
+                for row in incoming:
+                    if pk not in row and pk == "id":  # identity column
+                        row = {"id": len(rows) + 1, **row}
+                    key = row.get(pk)
+                    if key in rows and not merge:
+                        return JSONResponse(
+                            {"code": "23505", "message": "duplicate key value"},
+                            status_code=409,
+                        )
+                    rows[key] = {**rows.get(key, {}), **row}
+                    written.append(rows[key])
+                return JSONResponse(written, status_code=201)
+
+            if request.method == "PATCH":
+                updates = await request.json()
+                matched = self._matching(table, request)
+                for row in matched:
+                    row.update(updates)
+                return JSONResponse(matched)
+
+            matched = self._matching(table, request)
+            for row in matched:
+                rows.pop(row.get(pk), None)
+            return JSONResponse(matched)
+        except (ValueError, json.JSONDecodeError) as e:
+            return JSONResponse(
+                {"code": "PGRST100", "message": str(e)}, status_code=400
+            )
+
+
+class FakeElevenLabs:
+    """POST /v1/text-to-speech/{voice} → fake MP3 bytes after `latency_seconds` (±`jitter`).
+
+    `rate_limit_ratio` of requests get a 429 with Retry-After, to exercise the TTS dispatcher.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.5,
+        jitter: float = 0.2,
+        audio_bytes: int = 48_000,
+        rate_limit_ratio: float = 0.0,
+        seed: int = 42,
+    ):
+        self.latency_seconds = latency_seconds
+        self.jitter = jitter
+        self.audio = b"ID3" + bytes(max(0, audio_bytes - 3))
+        self.rate_limit_ratio = rate_limit_ratio
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self.app = Starlette(
+            routes=[
+                Route(
+                    "/v1/text-to-speech/{voice_id}", self.synthesize, methods=["POST"]
+                ),
+                Route("/v1/voices/{voice_id}", self.voice, methods=["GET"]),
+            ]
+        )
+
+    async def synthesize(self, request: Request) -> Response:
+        self.requests += 1
+        if self.random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            return JSONResponse(
+                {"detail": "rate limited"},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        delay = self.latency_seconds * (
+            1 + self.random.uniform(-self.jitter, self.jitter)
+        )
+        await asyncio.sleep(max(0.0, delay))
+        return Response(self.audio, media_type="audio/mpeg")
+
+    async def voice(self, request: Request) -> Response:
+        return JSONResponse(
+            {"voice_id": request.path_params["voice_id"], "name": "Benchmark Ghost"}
+        )
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class serve:
+    """Context manager running `app` on 127.0.0.1 in a background thread; yields its base URL."""
+
+    def __init__(self, app: Any, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("Stand-in server failed to start")
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,215 @@
+"""
+Cold-start benchmark — import time of `main` and process start → GET /ready 200
+
+Imports run in fresh interpreters (`python -X importtime -c "import main"`), so nothing is
+warm in sys.modules; the slowest modules main imports are listed to show where time goes.
+The boot measurement starts uvicorn against the same PostgREST / ElevenLabs stand-ins as
+load_test.py and times the first 200 from /ready (DB + storage warm, workers started).
+
+Usage (from backend/):
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --budget 3.0 --output startup.json    # exit 1 if ready takes longer
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from standins import FakeElevenLabs, PostgrestStub, free_port, serve  # noqa: E402
+from load_test import BACKEND_DIR, BENCHMARK_SUPABASE_KEY, git_revision  # noqa: E402
+
+
+def measure_import(env: dict) -> tuple[float, dict[str, float]]:
+    """Wall seconds for `import main` in a fresh interpreter, plus cumulative ms per module `main` imports directly."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started
+    # -X importtime lists children before their parent, indented two spaces per level
+    children: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == "main":
+                return elapsed, children
+            children = {}
+    return elapsed, children
+
+
+def measure_boot(env: dict, timeout: float) -> dict:
+    """Seconds from spawning uvicorn to the first /health 200 and the first /ready 200."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    timings: dict = {"health_seconds": None, "ready_seconds": None}
+    try:
+        with httpx.Client(timeout=2.0) as client:
+            while (
+                time.perf_counter() - started < timeout
+                and timings["ready_seconds"] is None
+            ):
+                if process.poll() is not None:
+                    raise RuntimeError(
+                        f"API exited during startup (code {process.returncode})"
+                    )
+                try:
+                    if (
+                        timings["health_seconds"] is None
+                        and client.get(f"{url}/health").status_code == 200
+                    ):
+                        timings["health_seconds"] = round(
+                            time.perf_counter() - started, 3
+                        )
+                    response = client.get(f"{url}/ready")
+                    if response.status_code == 200:
+                        timings["ready_seconds"] = round(
+                            time.perf_counter() - started, 3
+                        )
+                        timings["components"] = response.json()["components"]
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.02)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    if timings["ready_seconds"] is None:
+        raise RuntimeError(f"API was not ready within {timeout:.0f}s")
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="fresh-interpreter imports / boots to take the median of",
+    )
+    parser.add_argument(
+        "--db-latency-ms",
+        type=float,
+        default=5.0,
+        help="added to every PostgREST request",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help="fail (exit 1) if median start → ready exceeds this many seconds",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="give up on a boot after this many seconds",
+    )
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="necronet-startup-"))
+    postgrest = PostgrestStub(latency_seconds=args.db_latency_ms / 1000)
+    elevenlabs = FakeElevenLabs(latency_seconds=0.0)
+    imports, boots = [], []
+    with ExitStack() as stack:
+        env = {
+            **os.environ,
+            "SUPABASE_URL": stack.enter_context(serve(postgrest.app)),
+            "SUPABASE_KEY": BENCHMARK_SUPABASE_KEY,
+            "ELEVENLABS_API_BASE": stack.enter_context(serve(elevenlabs.app)),
+            "ELEVENLABS_API_KEY": "benchmark",
+            "ELEVENLABS_VOICE_ID": "benchmark-voice",
+            "USE_MOCK_MODE": "false",
+            "STORAGE_BACKEND": "local",
+            "LOCAL_STORAGE_PATH": str(workdir / "objects"),
+            "MIGRATION_QUEUE_PATH": str(workdir / "migration_jobs.db"),
+            "AWS_ACCESS_KEY_ID": "",
+            "AWS_SECRET_ACCESS_KEY": "",
+        }
+        for run in range(args.runs):
+            imports.append(measure_import(env))
+            boots.append(measure_boot(env, args.timeout))
+            print(
+                f"  run {run + 1}: import {imports[-1][0] * 1000:.0f} ms, "
+                f"/health {boots[-1]['health_seconds'] * 1000:.0f} ms, "
+                f"/ready {boots[-1]['ready_seconds'] * 1000:.0f} ms"
+            )
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    slowest = sorted(imports[-1][1].items(), key=lambda item: item[1], reverse=True)[:8]
+    ready = statistics.median(boot["ready_seconds"] for boot in boots)
+    results = {
+        "commit": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "runs": args.runs,
+        "import_seconds": round(
+            statistics.median(elapsed for elapsed, _ in imports), 3
+        ),
+        "health_seconds": round(
+            statistics.median(boot["health_seconds"] for boot in boots), 3
+        ),
+        "ready_seconds": round(ready, 3),
+        "slowest_imports_ms": {name: round(ms, 1) for name, ms in slowest},
+        "budget_seconds": args.budget,
+    }
+    print(
+        f"\n⏱️ import main: {results['import_seconds'] * 1000:.0f} ms   "
+        f"/health: {results['health_seconds'] * 1000:.0f} ms   /ready: {ready * 1000:.0f} ms (medians of {args.runs})"
+    )
+    for name, ms in slowest:
+        print(f"  {name:<24} {ms:8.1f} ms")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"💾 Results written to {args.output}")
+    if args.budget is not None and ready > args.budget:
+        sys.exit(f"❌ Start → ready {ready:.2f}s is over the {args.budget:.2f}s budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,60 @@ FastAPI + Supabase + ElevenLabs TTS + S3-compatible storage
 Ready to deploy on Render with PostgreSQL
 """
 
+from services.startup import IMPORT_STARTED  # first import: the startup budget is measured from here to /ready
+
+import time
 import os
 import uuid
 import asyncio
 import httpx
+import importlib.util
+import io
+import json
 import logging
-from datetime import datetime
+import mimetypes
+import re
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import quote
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from services.admission import AdmissionController, AdmissionMiddleware
+from services.archives import TAR_SUFFIXES, ArchiveError, ArchiveLimits, archive_kind, iter_members
+from services.artifact_index import decode_cursor, encode_cursor
+from services.artifact_store import ArtifactStore
+from services.clients import LazyClient, Readiness
+from services.cache import CacheBackend, TTLCache, compute_etag, etag_matches
+from services.delivery import IMMUTABLE_CACHE_CONTROL, ObjectStreamResponse, PresignedUrlCache, normalize_range
+from services.events import EventBroker, format_sse
+from services.executor import IOExecutor
+from services.html_rewrite import HTMLRewriter, RewriteStream, resolve_member_path
+from services.images import ImageDecodeError, ImageProcessor
+from services.jobs import Job, JobDeferred, JobQueue, MigrationWorkerPool, PermanentJobError
+from services.metrics import (
+    CONTENT_TYPE_LATEST, DB_ERRORS, DB_SECONDS, MIGRATION_STAGE_ERRORS, MIGRATION_STAGE_SECONDS, NARRATIONS,
+    REGISTRY as METRICS_REGISTRY, TTS_AUDIO_BYTES, TTS_RETRIES, TTS_SECONDS, UPLOAD_BYTES, UPLOAD_SECONDS,
+    InstrumentedStorage, MetricsMiddleware, RuntimeCollector, observe, render as render_metrics, span, trace_carrier,
+    tracing_enabled,
+)
+from services.narration_cache import NarrationCache
+from services.swf import (
+    PREFIX_BYTES as SWF_PREFIX_BYTES, CompressingSwfStream, SwfError, SwfTruncated, parse_swf_header,
+)
+from services.tts import TTSDispatcher, TTSRateLimited, parse_retry_after
+from services.storage import (
+    InvalidRange, LocalStorage, ObjectNotFound, ObjectStream, S3Storage, StorageBackend, StorageError,
+)
+from services.uploads import BlockingSource, EmptyUploadError, UploadTooLargeError, safe_filename, stream_upload
+from services.write_batch import WriteBatcher
+
 # Load environment variables
 load_dotenv()
 
@@ -38,8 +78,128 @@ AWS_S3_REGION = os.getenv("AWS_S3_REGION", "eu-north-1").strip()
 AWS_S3_ENDPOINT = os.getenv("AWS_S3_ENDPOINT", "").strip()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "").strip()
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "").strip()
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io").strip().rstrip("/")
 USE_MOCK_MODE = os.getenv("USE_MOCK_MODE", "false").lower() == "true"
 
+# Streaming upload tuning (bytes)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+S3_MULTIPART_PART_SIZE = int(os.getenv("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024)))
+S3_MULTIPART_CONCURRENCY = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+
+# Upload admission control — limits on uploads in flight (declared Content-Length bytes), global and per client;
+# over a client's share → 429, global queue full / timed out or migration backlog too deep → 503
+UPLOAD_MAX_CONCURRENT = int(os.getenv("UPLOAD_MAX_CONCURRENT", "32"))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_CLIENT_MAX_CONCURRENT = int(os.getenv("UPLOAD_CLIENT_MAX_CONCURRENT", "4"))
+UPLOAD_CLIENT_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_CLIENT_MAX_INFLIGHT_BYTES", str(256 * 1024 * 1024)))
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "64"))
+UPLOAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("UPLOAD_QUEUE_TIMEOUT_SECONDS", "5"))
+UPLOAD_RETRY_AFTER_SECONDS = float(os.getenv("UPLOAD_RETRY_AFTER_SECONDS", "2"))
+UPLOAD_CLIENT_HEADER = os.getenv("UPLOAD_CLIENT_HEADER", "").strip()  # e.g. X-Forwarded-For behind a trusted proxy
+UPLOAD_TRUSTED_PROXY_HOPS = int(os.getenv("UPLOAD_TRUSTED_PROXY_HOPS", "1"))  # proxies appending to that header
+MIGRATION_MAX_BACKLOG = int(os.getenv("MIGRATION_MAX_BACKLOG", "10000"))  # queued jobs; 0 = unlimited
+
+# Object storage backend (auto = S3 when AWS credentials are set, local disk otherwise)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "auto").strip().lower()  # auto | s3 | local
+LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "data/objects").strip()
+LOCAL_STORAGE_FSYNC = os.getenv("LOCAL_STORAGE_FSYNC", "false").lower() == "true"
+STORAGE_PUBLIC_URL = os.getenv("STORAGE_PUBLIC_URL", "").strip().rstrip("/")  # base URL for object links
+
+# Batch ingest
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "16"))
+BULK_INSERT_CHUNK = int(os.getenv("BULK_INSERT_CHUNK", "500"))
+
+# Thread pools for blocking storage / DB calls (per-backend concurrency limits)
+STORAGE_IO_WORKERS = int(os.getenv("STORAGE_IO_WORKERS", "16"))
+DB_IO_WORKERS = int(os.getenv("DB_IO_WORKERS", "8"))
+HTML_REWRITE_WORKERS = int(os.getenv("HTML_REWRITE_WORKERS", "2"))
+
+# Durable migration queue (SQLite) and worker pool
+MIGRATION_QUEUE_PATH = os.getenv("MIGRATION_QUEUE_PATH", "data/migration_jobs.db").strip()
+MIGRATION_CONCURRENCY = int(os.getenv("MIGRATION_CONCURRENCY", "2"))
+MIGRATION_CONCURRENCY_OVERRIDES = os.getenv("MIGRATION_CONCURRENCY_OVERRIDES", "").strip()  # e.g. "flash=1,image=4"
+MIGRATION_MAX_ATTEMPTS = int(os.getenv("MIGRATION_MAX_ATTEMPTS", "5"))
+MIGRATION_LEASE_SECONDS = float(os.getenv("MIGRATION_LEASE_SECONDS", "60"))
+MIGRATION_JOB_RETENTION_SECONDS = float(os.getenv("MIGRATION_JOB_RETENTION_SECONDS", "86400"))  # done jobs, then pruned
+# A duplicate's job waits for its canonical's migration (re-checked every few seconds) before migrating on its own
+MIGRATION_DUPLICATE_WAIT_SECONDS = float(os.getenv("MIGRATION_DUPLICATE_WAIT_SECONDS", "600"))
+DUPLICATE_RECHECK_SECONDS = 2.0
+
+# Local artifact store (SQLite) — mock mode, plus write-behind buffer while Supabase is unreachable
+ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", "data/artifacts.db").strip()
+ARTIFACT_STORE_MAX_ROWS = int(os.getenv("ARTIFACT_STORE_MAX_ROWS", "100000"))
+ARTIFACT_SYNC_INTERVAL_SECONDS = float(os.getenv("ARTIFACT_SYNC_INTERVAL_SECONDS", "5"))
+
+# Migration status updates to the same artifact within this window merge into one write;
+# updates and migration_logs rows are flushed in bulk
+DB_WRITE_WINDOW_SECONDS = float(os.getenv("DB_WRITE_WINDOW_SECONDS", "0.1"))
+
+# Narration synthesis settings (part of the narration cache key)
+NARRATION_MODEL_ID = "eleven_turbo_v2_5"
+NARRATION_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.75}
+NARRATION_CACHE_ENTRIES = int(os.getenv("NARRATION_CACHE_ENTRIES", "1024"))
+
+# Shared outbound HTTP pool + TTS rate limiting
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None  # installed via httpx[http2]
+TTS_RATE_PER_SECOND = float(os.getenv("TTS_RATE_PER_SECOND", "2"))
+TTS_BURST = int(os.getenv("TTS_BURST", "4"))
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "2"))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "3"))
+
+# Artifact listing
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "200"))
+ARTIFACT_COUNT_MODE = os.getenv("ARTIFACT_COUNT_MODE", "estimated").strip()  # exact | planned | estimated
+ARTIFACT_COUNT_TTL_SECONDS = float(os.getenv("ARTIFACT_COUNT_TTL_SECONDS", "30"))
+
+# Read-through cache for artifact records and list pages (Supabase mode)
+ARTIFACT_CACHE_ENTRIES = int(os.getenv("ARTIFACT_CACHE_ENTRIES", "4096"))
+ARTIFACT_CACHE_TTL_SECONDS = float(os.getenv("ARTIFACT_CACHE_TTL_SECONDS", "5"))
+
+# Server-sent migration events
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "32"))
+
+# Archive explosion (each .zip / .tar / .gz member becomes a child artifact)
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "5000"))
+ARCHIVE_MAX_EXPANDED_BYTES = int(os.getenv("ARCHIVE_MAX_EXPANDED_BYTES", str(1024 * 1024 * 1024)))
+ARCHIVE_MAX_RATIO = float(os.getenv("ARCHIVE_MAX_RATIO", "100"))  # expanded / compressed
+ARCHIVE_UPLOAD_CONCURRENCY = int(os.getenv("ARCHIVE_UPLOAD_CONCURRENCY", "8"))
+
+# Image variants (decoded once in a process pool, stored as WebP/AVIF next to the original)
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+IMAGE_THUMBNAIL_WIDTHS = [int(w) for w in os.getenv("IMAGE_THUMBNAIL_WIDTHS", "160,320,640").split(",") if w.strip()]
+IMAGE_FORMATS = [f.strip().lower() for f in os.getenv("IMAGE_FORMATS", "webp,avif").split(",") if f.strip()]
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(50 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "50000000"))
+
+# Flash movies: uncompressed (FWS) SWFs get a zlib-compressed (CWS) copy for faster player loads
+SWF_RECOMPRESS = os.getenv("SWF_RECOMPRESS", "true").lower() == "true"
+SWF_RECOMPRESS_LEVEL = int(os.getenv("SWF_RECOMPRESS_LEVEL", "9"))
+
+# Asset cache (content hash → stored object, archive → member map) used by dedup and HTML rewriting
+ASSET_CACHE_ENTRIES = int(os.getenv("ASSET_CACHE_ENTRIES", "16384"))
+ASSET_CACHE_TTL_SECONDS = float(os.getenv("ASSET_CACHE_TTL_SECONDS", "300"))
+
+# Artifact delivery (GET /api/artifacts/{id}/content)
+# redirect (presigned URL) | proxy (stream via the API)
+DELIVERY_MODE = os.getenv("DELIVERY_MODE", "redirect").strip().lower()
+PRESIGNED_URL_TTL_SECONDS = int(os.getenv("PRESIGNED_URL_TTL_SECONDS", "3600"))
+PRESIGNED_URL_CACHE_ENTRIES = int(os.getenv("PRESIGNED_URL_CACHE_ENTRIES", "4096"))
+# Unversioned URLs; ?v=<content_hash> is immutable
+DELIVERY_MAX_AGE_SECONDS = int(os.getenv("DELIVERY_MAX_AGE_SECONDS", "300"))
+DELIVERY_CHUNK_SIZE = int(os.getenv("DELIVERY_CHUNK_SIZE", str(256 * 1024)))
+
+# Observability (GET /metrics; OpenTelemetry spans when opentelemetry-api is installed)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Startup — clients warm up in the background; GET /ready turns 200 once DB + storage are warm
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3"))  # import → ready; slower starts are logged
+
 # Log configuration status
 logger.info("=" * 60)
 logger.info("🎃 NecroNet Backend Configuration")
@@ -52,63 +212,256 @@ logger.info(f"AWS_S3_REGION: {AWS_S3_REGION}")
 logger.info(f"ELEVENLABS_API_KEY: {'✅ Set (' + ELEVENLABS_API_KEY[:8] + '...)' if ELEVENLABS_API_KEY else '❌ Not set'}")
 logger.info(f"ELEVENLABS_VOICE_ID: {'✅ Set (' + ELEVENLABS_VOICE_ID + ')' if ELEVENLABS_VOICE_ID else '❌ Not set'}")
 logger.info(f"USE_MOCK_MODE: {USE_MOCK_MODE}")
+logger.info(f"MAX_UPLOAD_BYTES: {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+logger.info(
+    f"Upload admission: {UPLOAD_MAX_CONCURRENT} concurrent / {UPLOAD_MAX_INFLIGHT_BYTES // (1024 * 1024)} MB in flight,"
+    f" per client {UPLOAD_CLIENT_MAX_CONCURRENT} / {UPLOAD_CLIENT_MAX_INFLIGHT_BYTES // (1024 * 1024)} MB"
+)
+logger.info(f"I/O workers: storage={STORAGE_IO_WORKERS}, db={DB_IO_WORKERS}")
+logger.info(f"MIGRATION_QUEUE_PATH: {MIGRATION_QUEUE_PATH}")
+logger.info(f"ARTIFACT_STORE_PATH: {ARTIFACT_STORE_PATH} (max {ARTIFACT_STORE_MAX_ROWS} rows)")
+logger.info(
+    f"METRICS_ENABLED: {METRICS_ENABLED} (tracing: {'✅ OpenTelemetry' if tracing_enabled() else '❌ not installed'})"
+)
 logger.info("=" * 60)
 
-# Initialize clients
-supabase = None
-s3_client = None
 
-# Initialize Supabase client (fixed for supabase-py 2.x)
-if SUPABASE_URL and SUPABASE_KEY:
+# SDK clients are built on first use or by the background warm-up — importing
+# supabase-py / boto3 and constructing the clients used to cost every cold start
+def build_supabase_client():
+    from supabase import create_client
     try:
-        from supabase import create_client
         # supabase-py 2.x uses only url and key, no proxy argument
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        logger.info("✅ Supabase client initialized successfully")
+        return create_client(SUPABASE_URL, SUPABASE_KEY)
     except TypeError as e:
         # Handle version mismatch - try alternative initialization
         logger.warning(f"⚠️ Supabase init TypeError: {e}")
-        try:
-            from supabase._sync.client import SyncClient
-            supabase = SyncClient(SUPABASE_URL, SUPABASE_KEY)
-            logger.info("✅ Supabase client initialized (alternative method)")
-        except Exception as e2:
-            logger.error(f"❌ Supabase initialization failed: {e2}")
-            supabase = None
-    except Exception as e:
-        logger.error(f"❌ Supabase not configured: {e}")
-        supabase = None
-else:
+        from supabase._sync.client import SyncClient
+        return SyncClient(SUPABASE_URL, SUPABASE_KEY)
+
+
+def build_s3_client():
+    import boto3
+    s3_config = {
+        "aws_access_key_id": AWS_ACCESS_KEY_ID,
+        "aws_secret_access_key": AWS_SECRET_ACCESS_KEY,
+        "region_name": AWS_S3_REGION,
+    }
+    if AWS_S3_ENDPOINT:
+        s3_config["endpoint_url"] = AWS_S3_ENDPOINT
+    return boto3.client("s3", **s3_config)
+
+
+supabase = LazyClient("Supabase", build_supabase_client if SUPABASE_URL and SUPABASE_KEY else None)
+if not supabase.configured:
     logger.warning("⚠️ Supabase credentials not provided - using mock storage")
 
-# Initialize S3 client
-if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
-    try:
-        import boto3
-        s3_config = {
-            "aws_access_key_id": AWS_ACCESS_KEY_ID,
-            "aws_secret_access_key": AWS_SECRET_ACCESS_KEY,
-            "region_name": AWS_S3_REGION,
-        }
-        if AWS_S3_ENDPOINT:
-            s3_config["endpoint_url"] = AWS_S3_ENDPOINT
-        
-        s3_client = boto3.client("s3", **s3_config)
-        logger.info(f"✅ S3 client initialized (bucket: {AWS_S3_BUCKET}, region: {AWS_S3_REGION})")
-    except Exception as e:
-        logger.error(f"❌ S3 not configured: {e}")
-        s3_client = None
+s3_client = LazyClient("S3", build_s3_client if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY else None)
+if not s3_client.configured:
+    logger.warning("⚠️ AWS credentials not provided - S3 not available")
+
+# Public object URLs — hardcoded for demo: necronet-artifacts-linford in eu-north-1
+if AWS_S3_ENDPOINT:
+    S3_PUBLIC_BASE_URL = f"{AWS_S3_ENDPOINT}/{AWS_S3_BUCKET}"
+else:
+    S3_PUBLIC_BASE_URL = "https://necronet-artifacts-linford.s3.eu-north-1.amazonaws.com"
+
+# Every artifact read / write goes through this backend; endpoints never touch boto3 directly
+if STORAGE_BACKEND not in ("auto", "s3", "local"):
+    logger.warning(f"⚠️ Unknown STORAGE_BACKEND '{STORAGE_BACKEND}' - using auto")
+if s3_client.configured and STORAGE_BACKEND != "local":
+    storage: StorageBackend = S3Storage(s3_client, AWS_S3_BUCKET, STORAGE_PUBLIC_URL or S3_PUBLIC_BASE_URL)
 else:
-    logger.warning("⚠️ AWS credentials not provided - S3 uploads will fail")
+    if STORAGE_BACKEND == "s3":
+        logger.error("❌ STORAGE_BACKEND=s3 but AWS credentials aren't set - falling back to local disk")
+    # Local objects are served by GET /api/storage/{key}
+    storage = LocalStorage(
+        LOCAL_STORAGE_PATH, STORAGE_PUBLIC_URL or "http://localhost:8000/api/storage", fsync=LOCAL_STORAGE_FSYNC,
+    )
+logger.info(f"✅ Storage backend: {storage.name}" + (f" ({LOCAL_STORAGE_PATH})" if storage.name == "local" else ""))
+storage = InstrumentedStorage(storage)  # every call is timed for /metrics
+
+# Mock mode and Supabase-outage fallback: indexed SQLite rows, synced back by artifact_sync_loop
+# Rows are only evicted once Supabase holds them; in mock mode this file is the only copy
+artifact_store = ArtifactStore(
+    ARTIFACT_STORE_PATH, max_rows=ARTIFACT_STORE_MAX_ROWS, remote=supabase.configured and not USE_MOCK_MODE,
+)
+
+# Total counts per filter are cheap to serve stale for a few seconds
+artifact_count_cache = TTLCache(max_entries=64, ttl_seconds=ARTIFACT_COUNT_TTL_SECONDS)
+
+# Polling clients hit this instead of Supabase; writes in this process invalidate it,
+# the short TTL bounds staleness for writes made by other workers
+artifact_cache: CacheBackend = TTLCache(max_entries=ARTIFACT_CACHE_ENTRIES, ttl_seconds=ARTIFACT_CACHE_TTL_SECONDS)
+list_cache_generation = 0  # bumped on every write so cached list pages are never reused
+
+# Shared assets (spacer gifs, common CSS) resolve to one stored object without a DB round trip each time
+asset_cache: CacheBackend = TTLCache(max_entries=ASSET_CACHE_ENTRIES, ttl_seconds=ASSET_CACHE_TTL_SECONDS)
+
+# Artifact updates and migration stages are pushed to SSE subscribers from here
+event_broker = EventBroker(queue_size=SSE_QUEUE_SIZE)
+
+# Blocking boto3 / supabase-py calls run here, never on the event loop
+# The "queue" and "local" pools have a single thread so SQLite job-queue / artifact-store access
+# stays serialized; "html" runs the pure-Python HTML tokenizer so big pages don't stall request handling
+io_executor = IOExecutor({
+    "storage": STORAGE_IO_WORKERS, "db": DB_IO_WORKERS, "queue": 1, "local": 1, "html": HTML_REWRITE_WORKERS,
+})
+
+# Identical narration scripts are synthesized once (memory LRU + stored objects)
+narration_cache = NarrationCache(max_entries=NARRATION_CACHE_ENTRIES)
+
+# The same URL is handed out until shortly before it expires, so browsers and CDNs can cache the object
+presigned_urls = PresignedUrlCache(
+    storage.presign,
+    ttl_seconds=PRESIGNED_URL_TTL_SECONDS,
+    refresh_margin=PRESIGNED_URL_TTL_SECONDS // 5,
+    max_entries=PRESIGNED_URL_CACHE_ENTRIES,
+)
+
+# Image decoding / encoding is CPU-bound — it runs in worker processes, not threads
+image_processor = ImageProcessor(
+    workers=IMAGE_PROCESS_WORKERS,
+    widths=IMAGE_THUMBNAIL_WIDTHS,
+    formats=IMAGE_FORMATS,
+    quality=IMAGE_QUALITY,
+    max_pixels=IMAGE_MAX_PIXELS,
+)
+
+# ElevenLabs calls are queued here so bursts don't trigger 429s
+tts_dispatcher = TTSDispatcher(
+    rate_per_second=TTS_RATE_PER_SECOND,
+    burst=TTS_BURST,
+    max_concurrency=TTS_MAX_CONCURRENCY,
+    max_retries=TTS_MAX_RETRIES,
+)
+
+# App-lifetime HTTP connection pool (created in lifespan, or lazily on first use)
+http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared pooled HTTP client — reuses TLS connections across calls."""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
+    return http_client
+
+
+# Components that must be warm before /ready reports 200 (TTS is reported but doesn't gate traffic).
+# The DB only has to have tried: while Supabase is unreachable, writes go to the local store and sync later.
+readiness = Readiness(required={"db", "storage"}, degradable=frozenset({"db"}))
+
+
+async def warm_db() -> str:
+    """Open the local store, build the Supabase client off the event loop and make a 1-row read."""
+    await io_executor.run("local", artifact_store.open)  # loads rows still waiting for the sync
+    if USE_MOCK_MODE or not supabase:
+        return "mock"
+    try:
+        await io_executor.run("db", supabase.get)
+    except Exception:
+        return "mock"  # construction failed; DB functions fall back to the local store
+    await run_query("warm_up", supabase.table("artifacts").select("artifact_id").limit(1))
+    return "connected"
+
+
+async def warm_storage() -> str:
+    """Build the storage client and make one round trip (S3 HEAD / local stat)."""
+    if s3_client.configured and storage.name == "s3":
+        await io_executor.run("storage", s3_client.get)
+    await io_executor.run("storage", storage.exists, "warmup/probe")
+    return storage.name
+
+
+async def warm_tts() -> str:
+    """Open a pooled connection to ElevenLabs (voice lookup; no characters billed)."""
+    result = await test_elevenlabs_connection()
+    if result["status"] == "error":
+        raise RuntimeError(result["error"])
+    return result["status"]
+
+
+async def warm_up() -> None:
+    """Warm every component concurrently; migration workers start after the DB's first attempt."""
+    async def start_workers() -> None:
+        await readiness.wait_attempt("db")  # a failed attempt leaves the local store in charge
+        await migration_workers.start()
+
+    await asyncio.gather(
+        readiness.warm("db", warm_db),
+        readiness.warm("storage", warm_storage),
+        readiness.warm("tts", warm_tts),
+        start_workers(),
+    )
+    elapsed = readiness.ready_at - IMPORT_STARTED if readiness.ready_at else time.perf_counter() - IMPORT_STARTED
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        logger.warning(f"⏱️ Ready {elapsed:.2f}s after import began — over the {STARTUP_BUDGET_SECONDS:.1f}s budget")
+    else:
+        logger.info(f"⏱️ Ready {elapsed:.2f}s after import began (budget {STARTUP_BUDGET_SECONDS:.1f}s)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """App startup / shutdown hooks. Startup doesn't wait on external services — see /ready."""
+    get_http_client()
+    tts_dispatcher.start()
+    status_writes.start()
+    warm_up_task = asyncio.create_task(warm_up())
+    sync_task = asyncio.create_task(artifact_sync_loop())
+    yield
+    for task in (warm_up_task, sync_task):
+        task.cancel()
+    await asyncio.gather(warm_up_task, sync_task, return_exceptions=True)
+    await migration_workers.stop()
+    await status_writes.stop()  # final states land in Supabase, or the local store for the sync below
+    if write_behind() and artifact_store.pending_count():
+        try:
+            await sync_artifact_store()
+        except Exception as e:
+            logger.warning(f"⚠️ {artifact_store.pending_count()} local artifact writes left for the next start: {e}")
+    artifact_store.close()
+    await tts_dispatcher.stop()
+    if http_client is not None:
+        await http_client.aclose()
+    image_processor.shutdown()
+    io_executor.shutdown()
 
-# In-memory storage for mock mode
-mock_artifacts: dict[str, dict] = {}
 
 # FastAPI app
 app = FastAPI(
     title="NecroNet",
     version="1.0.0",
-    description="🎃 Resurrecting Dead Tech — Artifact Ingestion API"
+    description="🎃 Resurrecting Dead Tech — Artifact Ingestion API",
+    lifespan=lifespan,
+)
+
+# Upload admission control — innermost, so shed uploads still get CORS headers and show up in /metrics.
+# A batch is one admission sized by its whole body; single uploads are capped at MAX_UPLOAD_BYTES (+ multipart framing)
+upload_admission = AdmissionController(
+    max_concurrent=UPLOAD_MAX_CONCURRENT,
+    max_bytes=UPLOAD_MAX_INFLIGHT_BYTES,
+    client_max_concurrent=UPLOAD_CLIENT_MAX_CONCURRENT,
+    client_max_bytes=UPLOAD_CLIENT_MAX_INFLIGHT_BYTES,
+    queue_size=UPLOAD_QUEUE_SIZE,
+    queue_timeout=UPLOAD_QUEUE_TIMEOUT_SECONDS,
+    retry_after=UPLOAD_RETRY_AFTER_SECONDS,
+    max_backlog=MIGRATION_MAX_BACKLOG,
+    backlog=lambda: migration_backlog(),  # defined with the job queue below
+)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=upload_admission,
+    routes={
+        "/api/artifacts/upload": MAX_UPLOAD_BYTES + 64 * 1024 if MAX_UPLOAD_BYTES else None,
+        "/api/artifacts/batch": None,
+    },
+    client_header=UPLOAD_CLIENT_HEADER,
+    trusted_hops=UPLOAD_TRUSTED_PROXY_HOPS,
 )
 
 # CORS
@@ -118,8 +471,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Accept-Ranges", "Content-Range", "Content-Length", "Retry-After"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # ============================================================================
 # PYDANTIC MODELS
 # ============================================================================
@@ -144,6 +501,9 @@ class ArtifactResponse(BaseModel):
     error_message: Optional[str] = None
     original_url: Optional[str] = None
     description: Optional[str] = None
+    content_hash: Optional[str] = None
+    parent_artifact_id: Optional[str] = None
+    metadata: Optional[dict] = None
 
 class MigrationPlan(BaseModel):
     artifact_id: str
@@ -159,10 +519,14 @@ class HealthStatus(BaseModel):
     tts: str
     timestamp: str
 
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+ARTIFACT_TYPES = ("flash", "html", "image", "archive", "other")
+
+
 def detect_artifact_type(filename: str, content_type: str) -> str:
     """Detect artifact type from filename and MIME type."""
     ext = Path(filename).suffix.lower()
@@ -172,49 +536,27 @@ def detect_artifact_type(filename: str, content_type: str) -> str:
         return "html"
     elif ext in [".png", ".jpg", ".jpeg", ".gif", ".webp"] or "image" in content_type.lower():
         return "image"
-    elif ext in [".zip", ".tar", ".gz"]:
+    elif ext in [".zip", ".tar", ".gz"] or filename.lower().endswith(TAR_SUFFIXES):
         return "archive"
     return "other"
 
 
-def get_s3_public_url(bucket: str, key: str) -> str:
-    """Generate public S3 URL for an object.
-    
-    Hardcoded for demo: necronet-artifacts-linford in eu-north-1
-    """
-    # Hardcode for demo to ensure correct URL
-    demo_bucket = "necronet-artifacts-linford"
-    demo_region = "eu-north-1"
-    
-    if AWS_S3_ENDPOINT:
-        return f"{AWS_S3_ENDPOINT}/{bucket}/{key}"
-    
-    # Use hardcoded values for demo
-    return f"https://{demo_bucket}.s3.{demo_region}.amazonaws.com/{key}"
+def parse_concurrency(default: int, overrides: str) -> dict[str, int]:
+    """Per-artifact-type worker counts from a default and "type=n,type=n" overrides."""
+    concurrency = {artifact_type: default for artifact_type in ARTIFACT_TYPES}
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        artifact_type, _, value = item.partition("=")
+        try:
+            concurrency[artifact_type.strip()] = int(value)
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring bad MIGRATION_CONCURRENCY_OVERRIDES entry: {item}")
+    return concurrency
 
 
-def upload_to_s3(file_bytes: bytes, bucket: str, key: str, content_type: str = "application/octet-stream") -> str:
-    """Upload file to S3 and return public URL.
-    
-    Note: No ACL is set - bucket policy controls public access.
-    """
-    if not s3_client:
-        logger.error("❌ S3 client not initialized - cannot upload")
-        raise Exception("S3 not configured")
-    
-    try:
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=file_bytes,
-            ContentType=content_type,
-        )
-        url = get_s3_public_url(bucket, key)
-        logger.info(f"✅ Uploaded to S3: {url}")
-        return url
-    except Exception as e:
-        logger.error(f"❌ S3 upload failed: {e}")
-        raise
+def job_payload() -> Optional[dict]:
+    """Migration job payload carrying the current trace context, so the migration joins its upload's trace."""
+    carrier = trace_carrier()
+    return {"trace": carrier} if carrier else None
 
 
 def generate_migration_plan(artifact_type: str, artifact_id: str = "") -> MigrationPlan:
@@ -225,19 +567,36 @@ def generate_migration_plan(artifact_type: str, artifact_id: str = "") -> Migrat
     plans = {
         "flash": MigrationPlan(
             artifact_id=artifact_id, artifact_type="flash", strategy="ruffle_embed",
-            steps=["1. Validate .swf", "2. Generate Ruffle embed", "3. Create exhibit", "4. Test playback", "5. Generate narration"],
+            steps=[
+                "1. Parse SWF header", "2. Recompress uncompressed movies", "3. Precompute Ruffle config",
+                "4. Create exhibit", "5. Generate narration",
+            ],
             estimated_duration_seconds=45,
         ),
         "html": MigrationPlan(
             artifact_id=artifact_id, artifact_type="html", strategy="html_sanitize",
-            steps=["1. Sanitize HTML", "2. Apply CSS fallback", "3. Refactor styles", "4. Add a11y", "5. Generate narration"],
+            steps=[
+                "1. Stream document", "2. Strip scripts & handlers", "3. Resolve sibling assets",
+                "4. Store sanitized page", "5. Generate narration",
+            ],
             estimated_duration_seconds=30,
         ),
         "image": MigrationPlan(
             artifact_id=artifact_id, artifact_type="image", strategy="image_optimize",
-            steps=["1. Optimize image", "2. Generate thumbnail", "3. Extract metadata", "4. Create entry", "5. Generate narration"],
+            steps=[
+                "1. Decode original", "2. Encode WebP/AVIF", "3. Generate thumbnails", "4. Extract metadata",
+                "5. Generate narration",
+            ],
             estimated_duration_seconds=20,
         ),
+        "archive": MigrationPlan(
+            artifact_id=artifact_id, artifact_type="archive", strategy="archive_explode",
+            steps=[
+                "1. Read archive index", "2. Stream members", "3. Create child artifacts", "4. Queue member migrations",
+                "5. Generate narration",
+            ],
+            estimated_duration_seconds=60,
+        ),
     }
     return plans.get(artifact_type, MigrationPlan(
         artifact_id=artifact_id, artifact_type=artifact_type, strategy="generic",
@@ -249,60 +608,390 @@ def generate_migration_plan(artifact_type: str, artifact_id: str = "") -> Migrat
 # DATABASE FUNCTIONS
 # ============================================================================
 
+def with_postgrest_params(query, **params):
+    """Set raw PostgREST query params on a supabase-py query.
+
+    The pinned postgrest-py (0.11) has no or_() / offset(), sends one `order` param
+    per order() call and treats range()'s end as exclusive, so multi-column order,
+    or-filters and offset pages are set directly.
+    """
+    for key, value in params.items():
+        query.params = query.params.set(key, str(value))
+    return query
+
+
+async def run_query(operation: str, query):
+    """Execute a supabase-py query on the DB pool, timed per operation for /metrics."""
+    with observe(DB_SECONDS, DB_ERRORS, operation=operation):
+        return await io_executor.run("db", query.execute)
+
+
+def invalidate_artifact_cache(artifact_id: str) -> None:
+    """Drop cached copies of an artifact (and its dedup lookup) and every cached list page / count."""
+    global list_cache_generation
+    artifact_cache.delete(("artifact", artifact_id))
+    # The dedup lookup caches the canonical's row; a stale status would re-run its migration
+    content_hash = asset_cache.get(("hash_of", artifact_id))
+    if content_hash is not None:
+        asset_cache.delete(("hash", content_hash))
+    list_cache_generation += 1
+    artifact_count_cache.clear()
+
+
+def write_behind() -> bool:
+    """Local writes are queued for Supabase unless there is no Supabase to sync to."""
+    return bool(supabase) and not USE_MOCK_MODE
+
+
 async def store_artifact(artifact_data: dict) -> dict:
-    """Store artifact in Supabase or mock storage."""
+    """Store artifact in Supabase, or the local store (synced later) if it's unreachable."""
     if supabase and not USE_MOCK_MODE:
         try:
-            result = supabase.table("artifacts").insert(artifact_data).execute()
+            result = await run_query("store_artifact", supabase.table("artifacts").insert(artifact_data))
+            invalidate_artifact_cache(artifact_data["artifact_id"])
             logger.info(f"✅ Artifact stored in Supabase: {artifact_data['artifact_id']}")
             return result.data[0] if result.data else artifact_data
         except Exception as e:
             logger.error(f"❌ Supabase insert failed: {e}")
     
-    mock_artifacts[artifact_data["artifact_id"]] = artifact_data
-    logger.info(f"✅ Artifact stored in mock DB: {artifact_data['artifact_id']}")
+    await io_executor.run("local", artifact_store.put, artifact_data, write_behind())
+    logger.info(f"✅ Artifact stored in local DB: {artifact_data['artifact_id']}")
     return artifact_data
 
 
-async def get_artifact_from_db(artifact_id: str) -> Optional[dict]:
-    """Get artifact from Supabase or mock storage."""
+async def store_artifacts_bulk(rows: list[dict], upsert: bool = False) -> list[dict]:
+    """Insert many artifacts with one PostgREST call per BULK_INSERT_CHUNK rows.
+
+    `upsert` replaces rows with the same artifact_id (idempotent re-runs).
+    """
+    if not rows:
+        return []
     if supabase and not USE_MOCK_MODE:
         try:
-            result = supabase.table("artifacts").select("*").eq("artifact_id", artifact_id).execute()
+            stored = []
+            for i in range(0, len(rows), BULK_INSERT_CHUNK):
+                chunk = rows[i:i + BULK_INSERT_CHUNK]
+                table = supabase.table("artifacts")
+                query = table.upsert(chunk, on_conflict="artifact_id") if upsert else table.insert(chunk)
+                result = await run_query("store_artifacts_bulk", query)
+                stored.extend(result.data or chunk)
+            for row in rows:
+                invalidate_artifact_cache(row["artifact_id"])
+            logger.info(f"✅ {len(rows)} artifacts stored in Supabase (bulk)")
+            return stored
+        except Exception as e:
+            logger.error(f"❌ Supabase bulk insert failed: {e}")
+
+    await io_executor.run("local", artifact_store.put_many, rows, write_behind())
+    logger.info(f"✅ {len(rows)} artifacts stored in local DB")
+    return rows
+
+
+async def get_artifact_from_db(artifact_id: str) -> Optional[dict]:
+    """Get an artifact, with updates still buffered in the write batcher applied."""
+    artifact = await fetch_artifact_row(artifact_id)
+    pending = status_writes.pending(artifact_id)
+    return {**artifact, **pending} if artifact is not None and pending else artifact
+
+
+async def fetch_artifact_row(artifact_id: str) -> Optional[dict]:
+    """Get artifact from Supabase (through the read cache) or the local store."""
+    if supabase and not USE_MOCK_MODE and not await io_executor.run("local", artifact_store.is_pending, artifact_id):
+        cached = artifact_cache.get(("artifact", artifact_id))
+        if cached is not None:
+            return cached
+        try:
+            result = await run_query(
+                "get_artifact", supabase.table("artifacts").select("*").eq("artifact_id", artifact_id),
+            )
             if result.data:
+                artifact_cache.set(("artifact", artifact_id), result.data[0])
                 return result.data[0]
         except Exception as e:
             logger.error(f"❌ Supabase fetch failed: {e}")
-    return mock_artifacts.get(artifact_id)
+    return await io_executor.run("local", artifact_store.get, artifact_id)
+
 
+async def find_artifact_by_hash(content_hash: str) -> Optional[dict]:
+    """Find the oldest non-failed artifact with identical content, with buffered updates applied (dedup lookup)."""
+    artifact = await find_artifact_row_by_hash(content_hash)
+    pending = status_writes.pending(artifact["artifact_id"]) if artifact is not None else None
+    return {**artifact, **pending} if pending else artifact
 
-async def update_artifact_in_db(artifact_id: str, updates: dict) -> None:
-    """Update artifact in Supabase or mock storage."""
+
+async def find_artifact_row_by_hash(content_hash: str) -> Optional[dict]:
+    """Dedup lookup in Supabase (through the asset cache) or the local store."""
     if supabase and not USE_MOCK_MODE:
+        cached = asset_cache.get(("hash", content_hash))
+        if cached is not None:
+            return cached
         try:
-            supabase.table("artifacts").update(updates).eq("artifact_id", artifact_id).execute()
-            logger.info(f"✅ Artifact updated in Supabase: {artifact_id}")
-            return
+            query = (
+                supabase.table("artifacts").select("*").eq("content_hash", content_hash)
+                .neq("status", "failed").order("created_at").limit(1)
+            )
+            result = await run_query("find_artifact_by_hash", query)
+            if result.data:
+                asset_cache.set(("hash", content_hash), result.data[0])
+                asset_cache.set(("hash_of", result.data[0]["artifact_id"]), content_hash)
+                return result.data[0]
         except Exception as e:
-            logger.error(f"❌ Supabase update failed: {e}")
-    
-    if artifact_id in mock_artifacts:
-        mock_artifacts[artifact_id].update(updates)
-        logger.info(f"✅ Artifact updated in mock DB: {artifact_id}")
+            logger.error(f"❌ Supabase hash lookup failed: {e}")
 
+    return await io_executor.run("local", artifact_store.find_by_hash, content_hash)
 
-async def list_artifacts_from_db(limit: int = 50, offset: int = 0) -> list[dict]:
-    """List artifacts from Supabase or mock storage."""
+
+async def get_archive_members(parent_id: str) -> dict[str, dict]:
+    """Member path → {artifact_id, artifact_type, storage_key} for an exploded archive (cached)."""
+    cached = asset_cache.get(("members", parent_id))
+    if cached is not None:
+        return cached
+
+    members: dict[str, dict] = {}
+    columns = "artifact_id,artifact_type,storage_key,metadata"
     if supabase and not USE_MOCK_MODE:
         try:
-            result = supabase.table("artifacts").select("*").order("created_at", desc=True).range(offset, offset + limit - 1).execute()
+            page_size = 1000  # PostgREST's default max rows per request
+            fetched = 0
+            while True:
+                query = with_postgrest_params(
+                    supabase.table("artifacts").select(columns).eq("parent_artifact_id", parent_id),
+                    order="artifact_id", limit=page_size, offset=fetched,
+                )
+                result = await run_query("get_archive_members", query)
+                fetched += len(result.data or [])
+                for row in result.data or []:
+                    members[(row.get("metadata") or {}).get("member_path", "")] = row
+                if len(result.data or []) < page_size:
+                    break
+            asset_cache.set(("members", parent_id), members)
+            return members
+        except Exception as e:
+            logger.error(f"❌ Supabase member lookup failed: {e}")
+            members = {}
+
+    for row in await io_executor.run("local", artifact_store.children, parent_id):
+        members[(row.get("metadata") or {}).get("member_path", "")] = row
+    return members
+
+
+async def update_artifact_in_db(artifact_id: str, updates: dict, wait: bool = True) -> None:
+    """Announce an artifact update to SSE subscribers and queue it on the write batcher.
+
+    Updates to the same artifact within DB_WRITE_WINDOW_SECONDS merge into one write.
+    `wait=False` returns before the write (intermediate progress only).
+    """
+    event_broker.publish(artifact_id, "update", {"artifact_id": artifact_id, **updates})
+    await status_writes.update(artifact_id, updates, wait=wait)
+
+
+async def write_artifact_updates(batch: dict[str, dict]) -> None:
+    """Flush coalesced updates — one PATCH per distinct payload — or locally while Supabase is unreachable.
+
+    Rows still waiting for the artifact-store sync are updated locally so the sync pushes the latest state.
+    """
+    local: dict[str, dict] = {}
+    if supabase and not USE_MOCK_MODE:
+        # e.g. every migration that started in the window shares {"status": "migrating"}
+        groups: dict[str, tuple[dict, list[str]]] = {}
+        pending = await io_executor.run("local", artifact_store.pending_among, list(batch))
+        for artifact_id, updates in batch.items():
+            if artifact_id in pending:
+                local[artifact_id] = updates
+            else:
+                group_key = json.dumps(updates, sort_keys=True, default=str)
+                groups.setdefault(group_key, (updates, []))[1].append(artifact_id)
+
+        async def patch(updates: dict, artifact_ids: list[str]) -> None:
+            for i in range(0, len(artifact_ids), 100):  # ids go in the URL (in.(...)), so keep it short
+                chunk = artifact_ids[i:i + 100]
+                try:
+                    query = supabase.table("artifacts").update(updates)
+                    query = query.eq("artifact_id", chunk[0]) if len(chunk) == 1 else query.in_("artifact_id", chunk)
+                    await run_query("update_artifact", query)
+                    for artifact_id in chunk:
+                        invalidate_artifact_cache(artifact_id)
+                except Exception as e:
+                    logger.error(f"❌ Supabase update failed: {e}")
+                    local.update((artifact_id, updates) for artifact_id in chunk)
+
+        await asyncio.gather(*(patch(updates, artifact_ids) for updates, artifact_ids in groups.values()))
+        if groups:
+            logger.info(f"✅ {len(batch) - len(local)} artifact updates written to Supabase ({len(groups)} distinct)")
+    else:
+        local = batch
+
+    if local:
+        await io_executor.run("local", artifact_store.update_many, local, write_behind())
+        for artifact_id in local:
+            invalidate_artifact_cache(artifact_id)
+        logger.info(f"✅ {len(local)} artifact updates written to local DB")
+
+
+def is_constraint_violation(error: Exception) -> bool:
+    """PostgREST error for a row Postgres rejected (class 23: foreign key, unique, not null...)."""
+    return str(getattr(error, "code", None) or "").startswith("23")
+
+
+async def write_migration_logs(rows: list[dict]) -> list[dict]:
+    """Bulk-insert migration_logs audit rows; returns the rows held for a later flush.
+
+    Rows for artifacts still waiting in the local store are held — their foreign key
+    would fail until the sync inserts the artifact. A chunk Postgres rejects is
+    retried row by row and the offending rows are dropped, so one bad row can't
+    keep the rest out.
+    """
+    pending = await io_executor.run("local", artifact_store.pending_among, list({row["artifact_id"] for row in rows}))
+    held = [row for row in rows if row["artifact_id"] in pending]
+    ready = [row for row in rows if row["artifact_id"] not in pending]
+    for i in range(0, len(ready), BULK_INSERT_CHUNK):
+        chunk = ready[i:i + BULK_INSERT_CHUNK]
+        try:
+            await run_query("insert_migration_logs", supabase.table("migration_logs").insert(chunk))
+        except Exception as e:
+            if not is_constraint_violation(e):
+                raise
+            for row in chunk:
+                try:
+                    await run_query("insert_migration_logs", supabase.table("migration_logs").insert(row))
+                except Exception as row_error:
+                    if not is_constraint_violation(row_error):
+                        raise
+                    logger.warning(f"⚠️ Dropped {row['event']} log row for {row['artifact_id']}: {row_error}")
+    return held
+
+
+def log_migration_event(artifact_id: str, event: str, **details) -> None:
+    """Queue a migration_logs row ("upload", "migrate_start", "migrate_complete", "error").
+
+    Skipped without Supabase — there's no local audit table.
+    """
+    if not write_behind():
+        return
+    status_writes.log({
+        "artifact_id": artifact_id, "event": event, "details": details, "created_at": datetime.utcnow().isoformat(),
+    })
+
+
+async def list_artifacts_from_db(
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[tuple[str, str]] = None,
+    status: Optional[str] = None,
+    artifact_type: Optional[str] = None,
+) -> list[dict]:
+    """List artifacts newest-first from Supabase or the local store.
+
+    With a (created_at, artifact_id) cursor this is a keyset page, so deep pages
+    cost the same as the first one; `offset` is kept for older clients.
+    """
+    if supabase and not USE_MOCK_MODE:
+        cache_key = ("list", list_cache_generation, limit, offset, cursor, status, artifact_type)
+        cached = artifact_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            query = supabase.table("artifacts").select("*")
+            if status:
+                query = query.eq("status", status)
+            if artifact_type:
+                query = query.eq("artifact_type", artifact_type)
+            params = {"order": "created_at.desc,artifact_id.desc", "limit": limit}
+            if cursor:
+                created_at, artifact_id = cursor
+                params["or"] = (
+                    f'(created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",artifact_id.lt.{artifact_id}))'
+                )
+            else:
+                params["offset"] = offset
+            query = with_postgrest_params(query, **params)
+            result = await run_query("list_artifacts", query)
+            artifact_cache.set(cache_key, result.data or [])
             return result.data or []
         except Exception as e:
             logger.error(f"❌ Supabase list failed: {e}")
-    
-    artifacts = list(mock_artifacts.values())
-    artifacts.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    return artifacts[offset:offset + limit]
+
+    return await io_executor.run(
+        "local", artifact_store.page, limit, cursor=cursor, offset=offset, status=status, artifact_type=artifact_type,
+    )
+
+
+async def count_artifacts(status: Optional[str] = None, artifact_type: Optional[str] = None) -> int:
+    """Total artifacts matching the filters (Supabase counts are estimated and cached briefly)."""
+    if supabase and not USE_MOCK_MODE:
+        cache_key = (status, artifact_type)
+        cached = artifact_count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            query = supabase.table("artifacts").select("artifact_id", count=ARTIFACT_COUNT_MODE)
+            if status:
+                query = query.eq("status", status)
+            if artifact_type:
+                query = query.eq("artifact_type", artifact_type)
+            result = await run_query("count_artifacts", query.limit(1))
+            if result.count is not None:
+                artifact_count_cache.set(cache_key, result.count)
+                return result.count
+        except Exception as e:
+            logger.error(f"❌ Supabase count failed: {e}")
+
+    return await io_executor.run("local", artifact_store.count, status, artifact_type)
+
+
+async def sync_artifact_store() -> int:
+    """Push rows / updates written locally during a Supabase outage; returns how many were synced."""
+    synced = 0
+    while True:
+        rows, patches = await io_executor.run("local", artifact_store.pending, BULK_INSERT_CHUNK)
+        if not rows and not patches:
+            break
+        # PostgREST bulk upserts take the column list from the rows, so send same-shaped rows together
+        shapes: dict[tuple, list[dict]] = {}
+        for row, _ in rows:
+            shapes.setdefault(tuple(sorted(row)), []).append(row)
+        for chunk in shapes.values():
+            await run_query("sync_artifacts", supabase.table("artifacts").upsert(chunk, on_conflict="artifact_id"))
+        for artifact_id, updates, _ in patches:
+            await run_query(
+                "sync_artifacts", supabase.table("artifacts").update(updates).eq("artifact_id", artifact_id),
+            )
+        await io_executor.run(
+            "local", artifact_store.mark_synced,
+            [(row["artifact_id"], version) for row, version in rows],
+            [(artifact_id, version) for artifact_id, _, version in patches],
+        )
+        for artifact_id in [row["artifact_id"] for row, _ in rows] + [artifact_id for artifact_id, _, _ in patches]:
+            invalidate_artifact_cache(artifact_id)
+        synced += len(rows) + len(patches)
+        if len(rows) < BULK_INSERT_CHUNK and len(patches) < BULK_INSERT_CHUNK:
+            break
+    if synced:
+        pending = await io_executor.run("local", artifact_store.pending_count)
+        logger.info(f"🔁 Synced {synced} local artifact writes to Supabase ({pending} pending)")
+    return synced
+
+
+async def artifact_sync_loop() -> None:
+    """Write-behind: retry pushing local writes to Supabase every ARTIFACT_SYNC_INTERVAL_SECONDS."""
+    await readiness.wait_attempt("db")
+    while True:
+        if write_behind():
+            try:
+                await sync_artifact_store()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                pending = await io_executor.run("local", artifact_store.pending_count)
+                logger.warning(f"⚠️ Artifact sync failed ({pending} pending): {e}")
+        await asyncio.sleep(ARTIFACT_SYNC_INTERVAL_SECONDS)
+
+
+# Migration progress writes: coalesced per artifact, flushed in bulk, drained on shutdown
+status_writes = WriteBatcher(
+    write_artifact_updates, write_migration_logs, window_seconds=DB_WRITE_WINDOW_SECONDS, max_batch=BULK_INSERT_CHUNK,
+)
 
 
 # ============================================================================
@@ -313,71 +1002,104 @@ async def generate_ghost_narration(artifact_id: str, artifact_name: str, artifac
     """Generate ghost narration using ElevenLabs TTS API.
     
     Uses eleven_turbo_v2_5 model for low latency and high quality.
-    Uploads generated audio to S3 and returns public URL.
+    Stores generated audio and returns its public URL.
+    Identical scripts are served from the narration cache without an API call.
     """
     logger.info(f"🎤 Generating TTS for {artifact_id}...")
     
     # Check configuration
     if not ELEVENLABS_API_KEY:
         logger.warning(f"⚠️ TTS skipped for {artifact_id}: ELEVENLABS_API_KEY not set")
+        NARRATIONS.labels("skipped").inc()
         return None
     
     if not ELEVENLABS_VOICE_ID:
         logger.warning(f"⚠️ TTS skipped for {artifact_id}: ELEVENLABS_VOICE_ID not set")
+        NARRATIONS.labels("skipped").inc()
         return None
     
-    if not s3_client:
-        logger.warning(f"⚠️ TTS skipped for {artifact_id}: S3 not configured (cannot store audio)")
-        return None
-
     # Create spooky narrator script
     narrator_script = f"""Welcome, visitor, to the NecroNet Museum. 
 Before you stands {artifact_name}, a {artifact_type} artifact from the digital past.
 This relic has been resurrected from the depths of obsolete technology.
 Listen closely as I tell you its tale."""
 
+    # Same script + voice + model + settings → same audio: serve it from the cache
+    cache_key = narration_cache.key_for(
+        narrator_script, ELEVENLABS_VOICE_ID, NARRATION_MODEL_ID, NARRATION_VOICE_SETTINGS,
+    )
+    cached_url = narration_cache.get(cache_key)
+    if cached_url:
+        logger.info(f"♻️ Narration cache hit (memory) for {artifact_id}")
+        NARRATIONS.labels("cache_memory").inc()
+        return cached_url
+
+    audio_key = narration_cache.object_key(cache_key)
     try:
+        if await io_executor.run("storage", storage.exists, audio_key):
+            audio_url = storage.public_url(audio_key)
+            narration_cache.put(cache_key, audio_url)
+            narration_cache.record_storage_hit()
+            logger.info(f"♻️ Narration cache hit (storage) for {artifact_id}")
+            NARRATIONS.labels("cache_storage").inc()
+            return audio_url
+    except Exception as e:
+        logger.warning(f"⚠️ Narration cache lookup failed for {artifact_id}: {e}")
+    narration_cache.record_miss()
+
+    async def synthesize_and_store() -> Optional[str]:
         logger.info(f"🔊 Calling ElevenLabs API for artifact {artifact_id}...")
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"https://api.elevenlabs.io/v1/text-to-speech/{ELEVENLABS_VOICE_ID}",
-                headers={
-                    "xi-api-key": ELEVENLABS_API_KEY,
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "text": narrator_script,
-                    "model_id": "eleven_turbo_v2_5",
-                    "voice_settings": {
-                        "stability": 0.5,
-                        "similarity_boost": 0.75,
-                    },
-                },
-            )
-            
-            logger.info(f"📡 ElevenLabs response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                audio_bytes = response.content
-                logger.info(f"✅ Received {len(audio_bytes)} bytes of audio")
-                
-                # Upload to S3
-                audio_key = f"narrations/{artifact_id}_ghost.mp3"
-                audio_url = upload_to_s3(audio_bytes, AWS_S3_BUCKET, audio_key, "audio/mpeg")
-                logger.info(f"🎃 Ghost narration uploaded: {audio_url}")
-                return audio_url
-            else:
-                error_text = response.text[:500] if response.text else "No error details"
-                logger.error(f"❌ ElevenLabs API error {response.status_code}: {error_text}")
-                return None
-                
+        started = time.perf_counter()
+        response = await get_http_client().post(
+            f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{ELEVENLABS_VOICE_ID}",
+            headers={
+                "xi-api-key": ELEVENLABS_API_KEY,
+                "Content-Type": "application/json",
+            },
+            json={
+                "text": narrator_script,
+                "model_id": NARRATION_MODEL_ID,
+                "voice_settings": NARRATION_VOICE_SETTINGS,
+            },
+            timeout=60.0,
+        )
+
+        TTS_SECONDS.labels(str(response.status_code)).observe(time.perf_counter() - started)
+        logger.info(f"📡 ElevenLabs response status: {response.status_code}")
+
+        if response.status_code == 429:
+            TTS_RETRIES.inc()
+            raise TTSRateLimited(parse_retry_after(response.headers.get("Retry-After")))
+
+        if response.status_code != 200:
+            error_text = response.text[:500] if response.text else "No error details"
+            logger.error(f"❌ ElevenLabs API error {response.status_code}: {error_text}")
+            return None
+
+        audio_bytes = response.content
+        TTS_AUDIO_BYTES.observe(len(audio_bytes))
+        logger.info(f"✅ Received {len(audio_bytes)} bytes of audio")
+
+        # Store under the content-derived cache key
+        await io_executor.run("storage", storage.put, audio_key, audio_bytes, "audio/mpeg")
+        audio_url = storage.public_url(audio_key)
+        narration_cache.put(cache_key, audio_url)
+        logger.info(f"🎃 Ghost narration uploaded: {audio_url}")
+        return audio_url
+
+    try:
+        # Rate-limited and coalesced: concurrent requests for the same script share one call
+        audio_url = await tts_dispatcher.submit(cache_key, synthesize_and_store)
+        NARRATIONS.labels("synthesized" if audio_url else "failed").inc()
+        return audio_url
+    except TTSRateLimited:
+        logger.error(f"❌ ElevenLabs still rate limiting after retries for {artifact_id}")
     except httpx.TimeoutException:
         logger.error(f"❌ ElevenLabs API timeout for {artifact_id}")
-        return None
     except Exception as e:
         logger.error(f"❌ TTS generation failed for {artifact_id}: {type(e).__name__}: {e}")
-        return None
+    NARRATIONS.labels("failed").inc()
+    return None
 
 
 async def test_elevenlabs_connection() -> dict:
@@ -389,26 +1111,146 @@ async def test_elevenlabs_connection() -> dict:
         return {"status": "not_configured", "error": "ELEVENLABS_VOICE_ID not set"}
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Test by fetching voice info
-            response = await client.get(
-                f"https://api.elevenlabs.io/v1/voices/{ELEVENLABS_VOICE_ID}",
-                headers={"xi-api-key": ELEVENLABS_API_KEY},
-            )
-            
-            if response.status_code == 200:
-                voice_data = response.json()
-                return {
-                    "status": "connected",
-                    "voice_name": voice_data.get("name", "Unknown"),
-                    "voice_id": ELEVENLABS_VOICE_ID,
-                }
-            else:
-                return {"status": "error", "error": f"HTTP {response.status_code}: {response.text[:200]}"}
+        # Test by fetching voice info
+        response = await get_http_client().get(
+            f"{ELEVENLABS_API_BASE}/v1/voices/{ELEVENLABS_VOICE_ID}",
+            headers={"xi-api-key": ELEVENLABS_API_KEY},
+            timeout=10.0,
+        )
+
+        if response.status_code == 200:
+            voice_data = response.json()
+            return {
+                "status": "connected",
+                "voice_name": voice_data.get("name", "Unknown"),
+                "voice_id": ELEVENLABS_VOICE_ID,
+            }
+        else:
+            return {"status": "error", "error": f"HTTP {response.status_code}: {response.text[:200]}"}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+# ============================================================================
+# INGESTION
+# ============================================================================
+
+def dedup_check(
+    artifact_id: str, storage_key: str, canonical: dict, seen: Optional[dict[str, dict]] = None,
+) -> Callable[[str], Awaitable[bool]]:
+    """`should_store` callback for stream_upload — content-addressed dedup.
+
+    Checks `seen` (content hash → row for files from the same batch / archive),
+    then the DB. On a hit, fills `canonical` with the existing row and returns False.
+    """
+    async def is_new_content(content_hash: str) -> bool:
+        if seen is not None and content_hash in seen:
+            canonical.update(seen[content_hash])
+            return False
+        existing = await find_artifact_by_hash(content_hash)
+        # Archive children have deterministic ids: on a re-run the hit can be this row from an earlier attempt
+        if existing and existing["artifact_id"] != artifact_id:
+            canonical.update(existing)
+            return False
+        # An identical file from the same batch may have claimed the hash while we were looking it up
+        if seen is not None and content_hash in seen:
+            canonical.update(seen[content_hash])
+            return False
+        if seen is not None:
+            seen[content_hash] = {"artifact_id": artifact_id, "storage_key": storage_key, "status": "uploaded"}
+        return True
+
+    return is_new_content
+
+
+# Metadata the content migrations derive from the bytes alone; duplicates reuse their canonical's.
+# Archive results aren't shared: the member rows belong to the canonical.
+DERIVED_METADATA_KEYS = ("image", "variants", "html", "swf")
+
+
+def derived_metadata(canonical: dict) -> dict:
+    metadata = canonical.get("metadata") or {}
+    return {key: metadata[key] for key in DERIVED_METADATA_KEYS if key in metadata}
+
+
+def apply_duplicate(artifact_data: dict, canonical: dict) -> None:
+    """Point a duplicate's row at the stored object, and the migration result if it's done."""
+    artifact_data["storage_key"] = canonical["storage_key"]
+    artifact_data["metadata"] = {**(artifact_data.get("metadata") or {}), "duplicate_of": canonical["artifact_id"]}
+    if canonical.get("status") == "ready":
+        artifact_data["status"] = "ready"
+        artifact_data["ghost_narration_url"] = canonical.get("ghost_narration_url")
+        artifact_data["metadata"].update(derived_metadata(canonical))
+
+
+async def ingest_upload(file: UploadFile, batch_seen: Optional[dict[str, dict]] = None) -> dict:
+    """Stream one uploaded file to storage and build its artifact row (not yet stored).
+
+    Identical content is deduplicated against the DB and, for batch uploads,
+    against earlier files in the same batch (`batch_seen`: content hash → row).
+    Raises HTTPException for client errors.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="👻 No filename provided")
+
+    # Reject known-oversize uploads before touching the body
+    if MAX_UPLOAD_BYTES and file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"😢 File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit")
+
+    artifact_id = str(uuid.uuid4())
+    artifact_type = detect_artifact_type(file.filename, file.content_type or "")
+    storage_key = original_key(artifact_type, artifact_id, file.filename)
+    created_at = datetime.utcnow().isoformat()
+
+    # Content-addressed dedup: if the same bytes were uploaded before, reuse them
+    canonical: dict = {}
+
+    # Stream to storage in bounded parts — never buffers the whole artifact
+    try:
+        with observe(UPLOAD_SECONDS, artifact_type=artifact_type):
+            streamed = await stream_upload(
+                file, storage, storage_key, file.content_type or "application/octet-stream",
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                part_size=S3_MULTIPART_PART_SIZE,
+                max_concurrency=S3_MULTIPART_CONCURRENCY,
+                max_bytes=MAX_UPLOAD_BYTES,
+                run_sync=io_executor.bind("storage"),
+                should_store=dedup_check(artifact_id, storage_key, canonical, batch_seen),
+            )
+        UPLOAD_BYTES.labels(artifact_type).observe(streamed.size)
+    except EmptyUploadError:
+        raise HTTPException(status_code=400, detail="👻 File is empty")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=f"😢 {e}")
+    except Exception as e:
+        logger.error(f"❌ Storage upload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"😢 Storage upload failed: {e}")
+
+    artifact_data = {
+        "artifact_id": artifact_id,
+        "name": file.filename,
+        "artifact_type": artifact_type,
+        "storage_key": storage_key,
+        "status": "uploaded",
+        "created_at": created_at,
+        "ghost_narration_url": None,
+        "error_message": None,
+        "content_hash": streamed.sha256,
+        # Every row carries the same keys: PostgREST rejects bulk inserts whose rows differ (PGRST102)
+        "parent_artifact_id": None,
+        "metadata": {},
+    }
+
+    if canonical:
+        apply_duplicate(artifact_data, canonical)
+
+    logger.info(
+        f"🎃 Artifact uploaded: {artifact_id} ({artifact_type})"
+        + (f" — duplicate of {canonical['artifact_id']}" if canonical else "")
+    )
+    return artifact_data
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -425,12 +1267,63 @@ async def health_check():
     return {
         "status": "alive",
         "timestamp": datetime.utcnow().isoformat(),
-        "supabase": "connected" if supabase else "not_configured",
-        "s3": "connected" if s3_client else "not_configured",
+        "supabase": supabase.stats()["status"],
+        "s3": s3_client.stats()["status"],
+        "storage": storage.name,
         "tts": "configured" if (ELEVENLABS_API_KEY and ELEVENLABS_VOICE_ID) else "not_configured",
+        "io": io_executor.stats(),
+        "narration_cache": narration_cache.stats(),
+        "artifact_cache": artifact_cache.stats(),
+        "asset_cache": asset_cache.stats(),
+        "events": event_broker.stats(),
+        "artifact_store": await io_executor.run("local", artifact_store.stats),
+        "db_writes": status_writes.stats(),
+        "upload_admission": upload_admission.stats(),
+        "images": image_processor.stats(),
+        "presigned_urls": presigned_urls.stats(),
     }
 
 
+@app.get("/ready")
+async def readiness_probe():
+    """Readiness probe: 200 once the DB and storage clients are warm, 503 before.
+
+    Point load balancers here (and /health at liveness) so new instances only get
+    traffic after their pools are warm. A DB that failed its first warm-up is
+    listed under "degraded" (artifacts go to the local store) and doesn't hold traffic back.
+    """
+    body = {
+        "ready": readiness.ready,
+        "degraded": readiness.degraded,
+        "components": readiness.snapshot(),
+        "clients": {"supabase": supabase.stats(), "s3": s3_client.stats()},
+        "import_ms": round(IMPORT_SECONDS * 1000, 1),
+        "ready_after_ms": round((readiness.ready_at - IMPORT_STARTED) * 1000, 1) if readiness.ready_at else None,
+        "startup_budget_ms": STARTUP_BUDGET_SECONDS * 1000,
+    }
+    if readiness.ready:
+        return JSONResponse(body)
+    return JSONResponse(body, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: storage / DB / TTS / migration-stage histograms, pool and queue gauges."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="👻 Metrics are disabled")
+    try:
+        runtime_metrics.queue_counts = await io_executor.run("queue", migration_queue.stats)
+    except Exception as e:
+        logger.warning(f"⚠️ Migration queue stats unavailable for /metrics: {e}")
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+@app.get("/health/tts/queue")
+async def health_check_tts_queue():
+    """TTS dispatcher queue depth, wait times and rate-limit counters."""
+    return {**tts_dispatcher.stats(), "timestamp": datetime.utcnow().isoformat()}
+
+
 @app.get("/health/tts", response_model=HealthStatus)
 async def health_check_tts():
     """Detailed health check including TTS test."""
@@ -438,53 +1331,40 @@ async def health_check_tts():
     
     return HealthStatus(
         status="alive",
-        supabase="connected" if supabase else "not_configured",
-        s3="connected" if s3_client else "not_configured",
+        supabase=supabase.stats()["status"],
+        s3=s3_client.stats()["status"],
         tts=tts_status.get("status", "unknown") + (f" ({tts_status.get('voice_name', '')})" if tts_status.get("voice_name") else ""),
         timestamp=datetime.utcnow().isoformat(),
     )
 
 
+@app.get("/health/migrations")
+async def health_check_migrations():
+    """Migration queue depth, running jobs and per-stage latency."""
+    return {
+        **migration_workers.stats(),
+        "jobs": await io_executor.run("queue", migration_queue.stats),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
 @app.post("/api/artifacts/upload", response_model=ArtifactResponse)
-async def upload_artifact(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
+async def upload_artifact(file: UploadFile = File(...)):
     """Upload an artifact for resurrection."""
     try:
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="👻 No filename provided")
-
-        file_bytes = await file.read()
-        if len(file_bytes) == 0:
-            raise HTTPException(status_code=400, detail="👻 File is empty")
-
-        artifact_id = str(uuid.uuid4())
-        artifact_type = detect_artifact_type(file.filename, file.content_type or "")
-        s3_key = f"artifacts/{artifact_type}/{artifact_id}/{file.filename}"
-        created_at = datetime.utcnow().isoformat()
-
-        # Upload to S3
-        try:
-            upload_to_s3(file_bytes, AWS_S3_BUCKET, s3_key, file.content_type or "application/octet-stream")
-        except Exception as e:
-            logger.error(f"❌ S3 upload failed: {e}")
-            raise HTTPException(status_code=500, detail=f"😢 Storage upload failed: {e}")
-
-        artifact_data = {
-            "artifact_id": artifact_id,
-            "name": file.filename,
-            "artifact_type": artifact_type,
-            "storage_key": s3_key,
-            "status": "uploaded",
-            "created_at": created_at,
-            "ghost_narration_url": None,
-            "error_message": None,
-        }
-
-        await store_artifact(artifact_data)
-
-        if background_tasks:
-            background_tasks.add_task(orchestrate_migration, artifact_id, file.filename, artifact_type)
-
-        logger.info(f"🎃 Artifact uploaded: {artifact_id} ({artifact_type})")
+        with span("artifact.upload", filename=file.filename) as current:
+            artifact_data = await ingest_upload(file)
+            if current is not None:
+                current.set_attribute("artifact_id", artifact_data["artifact_id"])
+            await store_artifact(artifact_data)
+            log_migration_event(
+                artifact_data["artifact_id"], "upload", artifact_type=artifact_data["artifact_type"],
+                name=artifact_data["name"], status=artifact_data["status"],
+            )
+            if artifact_data["status"] != "ready":
+                await migration_workers.enqueue(
+                    artifact_data["artifact_id"], artifact_data["name"], artifact_data["artifact_type"], job_payload(),
+                )
         return ArtifactResponse(**artifact_data)
 
     except HTTPException:
@@ -494,6 +1374,78 @@ async def upload_artifact(file: UploadFile = File(...), background_tasks: Backgr
         raise HTTPException(status_code=500, detail=f"😢 Upload failed: {e}")
 
 
+@app.post("/api/artifacts/batch")
+async def upload_artifacts_batch(files: list[UploadFile] = File(...)):
+    """Upload many artifacts in one request (e.g. a site dump).
+
+    Files stream to storage in parallel (BATCH_UPLOAD_CONCURRENCY at a time), rows
+    are inserted in bulk and migrations are enqueued in one transaction.
+    Returns a result per file; one bad file doesn't fail the batch.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="👻 No files provided")
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"😢 At most {BATCH_MAX_FILES} files per batch")
+
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    batch_seen: dict[str, dict] = {}
+
+    async def ingest_one(file: UploadFile) -> tuple[Optional[dict], Optional[str]]:
+        async with slots:
+            try:
+                return await ingest_upload(file, batch_seen), None
+            except HTTPException as e:
+                return None, str(e.detail)
+            except Exception as e:
+                logger.error(f"❌ Batch upload failed for {file.filename}: {e}")
+                return None, f"😢 Upload failed: {e}"
+
+    outcomes = await asyncio.gather(*(ingest_one(file) for file in files))
+
+    # In-batch duplicates point at another file's object; drop them if that file failed
+    ingested_ids = {data["artifact_id"] for data, _ in outcomes if data}
+    claimed_ids = {entry["artifact_id"] for entry in batch_seen.values()}
+    for i, (data, _) in enumerate(outcomes):
+        source_id = (data or {}).get("metadata", {}).get("duplicate_of")
+        if source_id in claimed_ids and source_id not in ingested_ids:
+            outcomes[i] = (None, "😢 Upload of identical file in this batch failed")
+
+    rows = [data for data, _ in outcomes if data]
+    try:
+        with span("artifact.batch_upload", files=len(files)):
+            await store_artifacts_bulk(rows)
+            for row in rows:
+                log_migration_event(
+                    row["artifact_id"], "upload",
+                    artifact_type=row["artifact_type"], name=row["name"], status=row["status"],
+                )
+            payload = job_payload()
+            await migration_workers.enqueue_many([
+                (row["artifact_id"], row["name"], row["artifact_type"], payload)
+                for row in rows if row["status"] != "ready"
+            ])
+    except Exception as e:
+        logger.error(f"❌ Batch upload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"😢 Batch upload failed: {e}")
+
+    elapsed = time.perf_counter() - started
+    results = [
+        {"filename": file.filename, "ok": data is not None,
+         "artifact": ArtifactResponse(**data) if data else None, "error": error}
+        for file, (data, error) in zip(files, outcomes)
+    ]
+    logger.info(f"📦 Batch upload: {len(rows)}/{len(files)} files in {elapsed:.2f}s ({len(rows) / elapsed:.1f} files/s)")
+    return {
+        "total": len(files),
+        "succeeded": len(rows),
+        "failed": len(files) - len(rows),
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_second": round(len(rows) / elapsed, 1) if elapsed else None,
+        "results": results,
+    }
+
+
 @app.post("/api/artifacts/migrate", response_model=MigrationPlan)
 async def get_migration_plan(body: ArtifactCreate):
     """Get migration plan for an artifact type."""
@@ -501,49 +1453,761 @@ async def get_migration_plan(body: ArtifactCreate):
 
 
 @app.get("/api/artifacts/{artifact_id}", response_model=ArtifactResponse)
-async def get_artifact(artifact_id: str):
-    """Get artifact by ID."""
+async def get_artifact(artifact_id: str, request: Request, response: Response):
+    """Get artifact by ID.
+
+    Sends an ETag; pollers that echo it in If-None-Match get an empty 304
+    until the artifact changes.
+    """
+    artifact = await get_artifact_from_db(artifact_id)
+    if not artifact:
+        raise HTTPException(status_code=404, detail="👻 Artifact not found")
+    body = ArtifactResponse(**artifact)
+    etag = compute_etag(body.model_dump())
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return body
+
+
+def delivery_key(artifact: dict, variant: str) -> Optional[str]:
+    """Storage key behind a content variant of an artifact, or None if it doesn't have one.
+
+    "original", "sanitized" (HTML pages), "compressed" (Flash movies),
+    "narration", or an image variant name such as "w320.webp".
+    """
+    metadata = artifact.get("metadata") or {}
+    if variant == "original":
+        return artifact["storage_key"]
+    if variant == "sanitized":
+        if artifact.get("artifact_type") != "html" or not (metadata.get("html") or metadata.get("duplicate_of")):
+            return None
+        return served_key(artifact)
+    if variant == "compressed":
+        return (metadata.get("swf") or {}).get("compressed_key")
+    if variant == "narration":
+        # Narrations are stored under their public URL; the key is its path within the bucket
+        url, base = artifact.get("ghost_narration_url") or "", storage.public_url("")
+        return url[len(base):] if url.startswith(base) and len(url) > len(base) else None
+    return ((metadata.get("variants") or {}).get(variant) or {}).get("key")
+
+
+async def iter_object_body(stream: ObjectStream) -> AsyncIterator[bytes]:
+    """Relay an open object in DELIVERY_CHUNK_SIZE pieces.
+
+    Memory-mapped (local) objects go out as zero-copy slices of the map;
+    anything else is read on the storage pool.
+    """
+    try:
+        if stream.mapped:
+            while chunk := stream.body.read_view(DELIVERY_CHUNK_SIZE):
+                yield chunk
+        else:
+            while chunk := await io_executor.run("storage", stream.body.read, DELIVERY_CHUNK_SIZE):
+                yield chunk
+    finally:
+        stream.close()
+
+
+def download_headers(key: str) -> dict:
+    """Headers that keep an uploaded object from running as a page on the API's origin.
+
+    Uploads are untrusted HTML/SVG/SWF; served inline they'd script the API with its
+    credentialed CORS. Subresource loads (<img>, <link>) are unaffected.
+    """
+    filename = quote(key.rsplit("/", 1)[-1])
+    return {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{filename}",
+        "X-Content-Type-Options": "nosniff",
+        "Content-Security-Policy": "sandbox",
+    }
+
+
+async def proxy_object(
+    key: str, request: Request, cache_control: str, etag: Optional[str] = None, inline: bool = False,
+) -> Response:
+    """Stream an object through the API with single-range (206) and If-None-Match (304) support.
+
+    The client's Range goes straight to the storage backend, so a seek costs
+    one ranged read and only the requested bytes pass through this process.
+    Only objects this service derived itself may be `inline`; anything else is
+    sent as a sandboxed download (see download_headers).
+    """
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    byte_range = normalize_range(request.headers.get("range"))
+    try:
+        stream = await io_executor.run("storage", storage.open, key, byte_range)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail="👻 Artifact content not found")
+    except InvalidRange as e:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{e.size}", "Accept-Ranges": "bytes"})
+
+    etag = etag or stream.etag
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        stream.close()
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range and if_range != etag:
+        # The client's partial copy is stale — send the whole current object instead
+        stream.close()
+        stream = await io_executor.run("storage", storage.open, key)
+
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": cache_control, "Content-Length": str(stream.size)}
+    # Sanitized pages still get a script-free sandbox in case a parser quirk slips markup past the rewriter
+    inline_headers = {"X-Content-Type-Options": "nosniff", "Content-Security-Policy": "sandbox"}
+    headers.update(inline_headers if inline else download_headers(key))
+    if etag:
+        headers["ETag"] = etag
+    if stream.content_range:
+        headers["Content-Range"] = stream.content_range
+    return ObjectStreamResponse(
+        iter_object_body(stream), status_code=206 if stream.content_range else 200, headers=headers,
+        media_type=stream.content_type,
+    )
+
+
+@app.get("/api/artifacts/{artifact_id}/content")
+async def get_artifact_content(
+    artifact_id: str,
+    request: Request,
+    variant: str = "original",
+    v: Optional[str] = None,
+    mode: Optional[str] = None,
+):
+    """Serve an artifact's bytes (or a derived copy — see delivery_key) from a private or public bucket.
+
+    `mode=redirect` answers with a 307 to a memoized presigned URL (S3 then
+    handles Range itself); `mode=proxy` streams through the API with Range,
+    ETag and 304 support, and is always used for backends that can't presign
+    (local disk). Defaults to DELIVERY_MODE. URLs carrying
+    `v=<content_hash>` are content-addressed and get an immutable
+    Cache-Control, so .swf and audio files can be seeked and cached at the edge.
+    """
+    mode = (mode or DELIVERY_MODE).lower()
+    if mode not in ("redirect", "proxy"):
+        raise HTTPException(status_code=400, detail="😢 mode must be redirect or proxy")
     artifact = await get_artifact_from_db(artifact_id)
     if not artifact:
         raise HTTPException(status_code=404, detail="👻 Artifact not found")
-    return ArtifactResponse(**artifact)
+    key = delivery_key(artifact, variant)
+    if not key:
+        raise HTTPException(status_code=404, detail=f"👻 No {variant} content for this artifact")
+
+    content_hash = artifact.get("content_hash")
+    # Narration is re-synthesized on re-migration without the original's hash changing, so it's never immutable
+    versioned = bool(v) and v == content_hash and variant != "narration"
+    cache_control = IMMUTABLE_CACHE_CONTROL if versioned else f"public, max-age={DELIVERY_MAX_AGE_SECONDS}"
+
+    if mode == "redirect" and storage.can_presign:
+        url, fresh_for = presigned_urls.get(key, cache_control)
+        # The redirect is cacheable for as long as the signed URL stays valid
+        return Response(status_code=307, headers={"Location": url, "Cache-Control": f"private, max-age={fresh_for}"})
+
+    # Originals are identified by their content hash, so a revalidation needs no storage call at all
+    etag = f'"{content_hash}"' if variant == "original" and content_hash else None
+    return await proxy_object(key, request, cache_control, etag, inline=bool(DERIVED_KEY_RE.fullmatch(key)))
+
+
+@app.get("/api/storage/{key:path}")
+async def get_stored_object(key: str, request: Request):
+    """Serve a stored object by key — the public URL of objects on the local storage backend.
+
+    S3 objects are served by the bucket (or /content), so this is local-only.
+    """
+    if storage.name != "local":
+        raise HTTPException(status_code=404, detail="👻 Not found")
+    try:
+        return await proxy_object(
+            key, request, f"public, max-age={DELIVERY_MAX_AGE_SECONDS}", inline=bool(DERIVED_KEY_RE.fullmatch(key)),
+        )
+    except StorageError as e:
+        raise HTTPException(status_code=400, detail=f"👻 {e}")
+
+
+TERMINAL_STATUSES = ("ready", "failed")
+
+
+@app.get("/api/artifacts/{artifact_id}/events")
+async def artifact_events(artifact_id: str, request: Request):
+    """Server-sent events for one artifact: a snapshot, then updates and stage progress.
+
+    The stream closes once the artifact reaches a terminal status. Heartbeats
+    re-read the artifact so updates made by another worker process still arrive.
+    """
+    # Subscribe before reading the snapshot so no update can slip in between
+    subscription = event_broker.subscribe(artifact_id)
+    artifact = await get_artifact_from_db(artifact_id)
+    if not artifact:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="👻 Artifact not found")
+
+    async def stream():
+        try:
+            snapshot = ArtifactResponse(**artifact).model_dump()
+            yield format_sse("snapshot", snapshot)
+            status = snapshot["status"]
+            while status not in TERMINAL_STATUSES:
+                if await request.is_disconnected():
+                    break
+                message = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    fresh = await get_artifact_from_db(artifact_id)
+                    if fresh and fresh.get("status") != status:
+                        message = {"event": "update", "data": ArtifactResponse(**fresh).model_dump()}
+                    else:
+                        yield ": keep-alive\n\n"
+                        continue
+                yield format_sse(message["event"], message["data"])
+                status = message["data"].get("status", status) if message["event"] == "update" else status
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/api/artifacts")
-async def list_artifacts(limit: int = 50, offset: int = 0):
-    """List all artifacts."""
-    artifacts = await list_artifacts_from_db(limit, offset)
-    return {"artifacts": artifacts, "total": len(artifacts)}
+async def list_artifacts(
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    artifact_type: Optional[str] = None,
+):
+    """List artifacts newest-first.
+
+    Pass `next_cursor` from the previous page as `cursor` for keyset pagination;
+    `status` and `artifact_type` filter server-side.
+    """
+    limit = max(1, min(limit, LIST_MAX_LIMIT))
+    try:
+        keyset = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="👻 Invalid cursor")
+
+    artifacts, total = await asyncio.gather(
+        list_artifacts_from_db(limit, max(0, offset), keyset, status, artifact_type),
+        count_artifacts(status, artifact_type),
+    )
+    next_cursor = None
+    if len(artifacts) == limit:
+        last = artifacts[-1]
+        next_cursor = encode_cursor(last.get("created_at") or "", str(last["artifact_id"]))
+
+    payload = {"artifacts": artifacts, "total": total, "next_cursor": next_cursor}
+    etag = compute_etag(payload)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return payload
 
 
 # ============================================================================
-# BACKGROUND TASKS
+# MIGRATION STRATEGIES
 # ============================================================================
 
-async def orchestrate_migration(artifact_id: str, artifact_name: str, artifact_type: str):
-    """Run migration pipeline in background."""
+async def explode_archive(artifact: dict) -> Optional[dict]:
+    """Stream an archive's members out of storage into child artifacts and queue their migrations.
+
+    Members are never extracted to disk: zips are read through ranged reads, tars
+    and .gz as a single forward stream. Small members are read whole and uploaded
+    ARCHIVE_UPLOAD_CONCURRENCY at a time; large ones stream through multipart.
+    Children keep the archive's relative layout under
+    `artifacts/archive/<parent>/members/`, get deterministic ids (re-runs upsert
+    the same rows) and are deduplicated by content hash. Returns the parent's
+    metadata; None for archives that are themselves members or duplicates.
+    """
+    parent_id = artifact["artifact_id"]
+    metadata = artifact.get("metadata") or {}
+    if artifact.get("parent_artifact_id") or metadata.get("duplicate_of"):
+        return None
+
     try:
-        logger.info(f"🔄 Starting migration for {artifact_id}...")
-        await update_artifact_in_db(artifact_id, {"status": "migrating"})
-        
-        # Simulate processing
-        await asyncio.sleep(3)
-        
-        # Generate narration
-        ghost_url = await generate_ghost_narration(artifact_id, artifact_name, artifact_type)
-        
-        await update_artifact_in_db(artifact_id, {"status": "ready", "ghost_narration_url": ghost_url})
-        logger.info(f"✅ Migration complete: {artifact_id} (narration: {'✅' if ghost_url else '❌'})")
+        kind = archive_kind(artifact["name"])
+    except ArchiveError as e:
+        raise PermanentJobError(str(e)) from e
+    key = artifact["storage_key"]
+    archive_size = (await io_executor.run("storage", storage.head, key)).size
+
+    members = iter_members(
+        kind,
+        open_stream=lambda: storage.open(key).body,
+        open_seekable=lambda: storage.open_seekable(key, archive_size),
+        archive_size=archive_size,
+        limits=ArchiveLimits(ARCHIVE_MAX_MEMBERS, ARCHIVE_MAX_EXPANDED_BYTES, ARCHIVE_MAX_RATIO),
+        gz_member_name=Path(artifact["name"]).stem,
+    )
+    run_storage = io_executor.bind("storage")
+    slots = asyncio.Semaphore(ARCHIVE_UPLOAD_CONCURRENCY)
+    uploads: set[asyncio.Task] = set()
+    errors: list[BaseException] = []
+    seen: dict[str, dict] = {}
+    rows: list[dict] = []
+    queued: list[tuple] = []
+    payload = job_payload()  # children's migrations join the archive's trace
+    totals = {"members": 0, "expanded_bytes": 0, "duplicates": 0, "skipped_empty": 0}
+
+    async def upload_member(path: str, source: BlockingSource) -> None:
+        child_id = str(uuid.uuid5(uuid.UUID(parent_id), path))
+        child_key = f"artifacts/archive/{parent_id}/members/{path}"
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        canonical: dict = {}
+        try:
+            streamed = await stream_upload(
+                source, storage, child_key, content_type,
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                part_size=S3_MULTIPART_PART_SIZE,
+                max_concurrency=S3_MULTIPART_CONCURRENCY,
+                run_sync=run_storage,
+                should_store=dedup_check(child_id, child_key, canonical, seen),
+            )
+        except EmptyUploadError:
+            totals["skipped_empty"] += 1
+            return
+        row = {
+            "artifact_id": child_id,
+            "name": path,
+            "artifact_type": detect_artifact_type(path, content_type),
+            "storage_key": child_key,
+            "status": "uploaded",
+            "created_at": datetime.utcnow().isoformat(),
+            "ghost_narration_url": None,
+            "error_message": None,
+            "content_hash": streamed.sha256,
+            "parent_artifact_id": parent_id,
+            "metadata": {"member_path": path, "size": streamed.size},
+        }
+        if canonical:
+            apply_duplicate(row, canonical)
+            totals["duplicates"] += 1
+        totals["members"] += 1
+        totals["expanded_bytes"] += streamed.size
+        rows.append(row)
+
+    async def flush() -> None:
+        batch = rows[:]
+        rows.clear()
+        await store_artifacts_bulk(batch, upsert=True)
+        queued.extend(
+            (row["artifact_id"], row["name"], row["artifact_type"], payload)
+            for row in batch if row["status"] != "ready"
+        )
+
+    def reap(task: asyncio.Task) -> None:
+        uploads.discard(task)
+        slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    try:
+        while True:
+            member = await run_storage(next, members, None)
+            if member is None:
+                break
+            if 0 <= member.size <= S3_MULTIPART_PART_SIZE:
+                # Small member: buffer it (bounded by the slots) so the archive stream moves on
+                await slots.acquire()
+                try:
+                    data = await run_storage(member.stream.read)
+                except BaseException:
+                    slots.release()
+                    raise
+                task = asyncio.create_task(upload_member(member.path, BlockingSource(io.BytesIO(data))))
+                uploads.add(task)
+                task.add_done_callback(reap)
+            else:
+                # Large (or unknown-size) member: stream it before reading on
+                await upload_member(member.path, BlockingSource(member.stream, run_storage))
+            if errors:
+                raise errors[0]
+            if len(rows) >= BULK_INSERT_CHUNK:
+                await flush()
+        await asyncio.gather(*uploads, return_exceptions=True)
+        if errors:
+            raise errors[0]
+        await flush()
+        # Queued only once every member row exists, so HTML pages can resolve any sibling
+        asset_cache.delete(("members", parent_id))
+        await migration_workers.enqueue_many(queued)
+    except ArchiveError as e:
+        raise PermanentJobError(str(e)) from e
+    finally:
+        for task in uploads:
+            task.cancel()
+        await run_storage(members.close)
+
+    logger.info(
+        f"📦 Exploded archive {parent_id}: {totals['members']} members, "
+        f"{totals['expanded_bytes'] // 1024} KiB, {totals['duplicates']} duplicates"
+    )
+    return totals
+
+
+async def optimize_image(artifact: dict) -> Optional[dict]:
+    """Decode the original once in the image process pool and store WebP/AVIF variants.
+
+    Variants land at `artifacts/image/<id>/variants/<name>` (full.webp, w320.avif, ...);
+    format, geometry and EXIF go into the artifact's metadata and are stripped from the variants.
+    """
+    artifact_id = artifact["artifact_id"]
+    if not image_processor.available:
+        logger.warning(f"⚠️ Image variants skipped for {artifact_id}: Pillow (with WebP/AVIF) not installed")
+        return None
+
+    head = await io_executor.run("storage", storage.head, artifact["storage_key"])
+    if head.size > IMAGE_MAX_BYTES:
+        logger.warning(f"⚠️ Image variants skipped for {artifact_id}: original is {head.size} bytes")
+        return {"image": {"skipped": f"original exceeds {IMAGE_MAX_BYTES} bytes"}}
+
+    data = await io_executor.run("storage", storage.get, artifact["storage_key"])
+    try:
+        processed = await image_processor.process(data)
+    except ImageDecodeError as e:
+        raise PermanentJobError(str(e)) from e
+
+    prefix = f"artifacts/image/{artifact_id}/variants/"
+    await asyncio.gather(*(
+        io_executor.run(
+            "storage", storage.put, prefix + variant.name, variant.data, variant.content_type,
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+        )
+        for variant in processed.variants
+    ))
+    logger.info(
+        f"🖼️ Image variants for {artifact_id}: {len(processed.variants)} files "
+        f"from a {len(data) // 1024} KiB original"
+    )
+    return {
+        "image": processed.metadata,
+        "variants": {
+            variant.name: {
+                "key": prefix + variant.name, "width": variant.width, "height": variant.height,
+                "bytes": len(variant.data),
+            }
+            for variant in processed.variants
+        },
+    }
+
+
+def sanitized_key(artifact_id: str) -> str:
+    return f"artifacts/html/{artifact_id}/sanitized.html"
+
+
+# Names the pipeline writes next to an original; an upload may not take one of them
+DERIVED_OBJECT_NAMES = {"sanitized.html", "compressed.swf", "variants"}
+
+# Objects this service generated itself (sanitized pages, re-encoded images, narration) — safe to render inline
+UUID_PATTERN = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+DERIVED_KEY_RE = re.compile(
+    rf"artifacts/html/{UUID_PATTERN}/sanitized\.html"
+    rf"|artifacts/image/{UUID_PATTERN}/variants/[^/]+"
+    rf"|{re.escape(narration_cache.prefix)}[^/]+\.mp3"
+)
+
+
+def original_key(artifact_type: str, artifact_id: str, filename: str) -> str:
+    """Storage key for an upload: the client's filename reduced to a safe basename."""
+    name = safe_filename(filename)
+    if name.lower() in DERIVED_OBJECT_NAMES:
+        name = f"original-{name}"
+    return f"artifacts/{artifact_type}/{artifact_id}/{name}"
+
+
+def served_key(artifact: dict) -> str:
+    """Storage key browsers should load for an artifact (the sanitized copy for HTML pages).
+
+    Duplicate pages link to the canonical page's copy — ready-by-copy duplicates never get their own.
+    """
+    if artifact.get("artifact_type") != "html":
+        return artifact["storage_key"]
+    return sanitized_key((artifact.get("metadata") or {}).get("duplicate_of") or artifact["artifact_id"])
+
+
+async def sanitize_html(artifact: dict) -> Optional[dict]:
+    """Stream an HTML page through the sanitizer into `artifacts/html/<id>/sanitized.html`.
+
+    Scripts and event handlers are stripped; relative URLs that point at members
+    of the same archive are rewritten to those members' stored objects (shared
+    assets resolve to a single deduplicated object). The page is never held in
+    memory: stored chunks are decoded, rewritten and re-uploaded as they arrive.
+    """
+    artifact_id = artifact["artifact_id"]
+    parent_id = artifact.get("parent_artifact_id")
+    members = await get_archive_members(parent_id) if parent_id else {}
+    base_path = (artifact.get("metadata") or {}).get("member_path") or artifact["name"]
+
+    def resolve(url: str) -> Optional[str]:
+        target = resolve_member_path(base_path, url)
+        member = members.get(target[0]) if target else None
+        if member is None:
+            return None
+        return storage.public_url(served_key(member)) + target[1]
+
+    original = await io_executor.run("storage", storage.open, artifact["storage_key"])
+    body = original.body
+    rewriter = HTMLRewriter(resolve)
+    source = RewriteStream(
+        lambda: io_executor.run("storage", body.read, UPLOAD_CHUNK_SIZE), rewriter, run_sync=io_executor.bind("html"),
+    )
+    key = sanitized_key(artifact_id)
+    try:
+        streamed = await stream_upload(
+            source, storage, key, "text/html; charset=utf-8",
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            part_size=S3_MULTIPART_PART_SIZE,
+            max_concurrency=S3_MULTIPART_CONCURRENCY,
+            run_sync=io_executor.bind("storage"),
+        )
+    except EmptyUploadError as e:
+        raise PermanentJobError("HTML page is empty after sanitizing") from e
+    finally:
+        body.close()
+
+    logger.info(
+        f"🧹 Sanitized {artifact_id}: {source.bytes_in // 1024} KiB → {streamed.size // 1024} KiB, "
+        f"{rewriter.stats['scripts_removed']} scripts removed, {rewriter.stats['urls_rewritten']} URLs rewritten"
+    )
+    return {"html": {
+        "sanitized_key": key, "charset": source.charset, "bytes_in": source.bytes_in, "bytes_out": streamed.size,
+        **rewriter.stats,
+    }}
+
+
+async def inspect_swf(artifact: dict) -> Optional[dict]:
+    """Parse a Flash movie's header from the first few KiB so the player can size itself up front.
+
+    Only a ranged prefix is downloaded, and compressed (CWS/ZWS) movies are
+    decompressed just far enough for the stage RECT, frame rate / count and the
+    leading FileAttributes / SetBackgroundColor tags. Uncompressed (FWS) movies
+    also get a zlib-compressed copy at `artifacts/flash/<id>/compressed.swf`
+    when SWF_RECOMPRESS is on and it actually saves bytes.
+    """
+    key = artifact["storage_key"]
+    prefix_size = SWF_PREFIX_BYTES
+    while True:
+        prefix = await io_executor.run("storage", storage.get_range, key, 0, prefix_size - 1)
+        try:
+            header = parse_swf_header(prefix)
+            break
+        except SwfTruncated as e:
+            # Huge embedded metadata can push the header past the first read; grow the prefix a few times
+            if len(prefix) < prefix_size or prefix_size >= 64 * SWF_PREFIX_BYTES:
+                raise PermanentJobError(f"Truncated SWF: {e}") from e
+            prefix_size *= 8
+        except SwfError as e:
+            raise PermanentJobError(str(e)) from e
+
+    info = header.as_dict()
+    if header.compression == "none" and SWF_RECOMPRESS:
+        info.update(await recompress_swf(artifact))
+    logger.info(
+        f"⚡ SWF {artifact['artifact_id']}: v{header.version} {header.compression}, "
+        f"{header.width}x{header.height} @ {header.frame_rate:g} fps, {header.frame_count} frames"
+    )
+    return {"swf": info}
+
 
+async def recompress_swf(artifact: dict) -> dict:
+    """Stream an FWS movie through zlib into a CWS copy; dropped again if it doesn't shrink."""
+    target = f"artifacts/flash/{artifact['artifact_id']}/compressed.swf"
+    run_storage = io_executor.bind("storage")
+    original = await run_storage(storage.open, artifact["storage_key"])
+    body = original.body
+    source = CompressingSwfStream(
+        lambda: run_storage(body.read, UPLOAD_CHUNK_SIZE), level=SWF_RECOMPRESS_LEVEL, run_sync=run_storage,
+    )
+    try:
+        streamed = await stream_upload(
+            source, storage, target, "application/x-shockwave-flash",
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            part_size=S3_MULTIPART_PART_SIZE,
+            max_concurrency=S3_MULTIPART_CONCURRENCY,
+            run_sync=run_storage,
+        )
+    finally:
+        body.close()
+
+    original_bytes = original.size
+    if streamed.size >= original_bytes:
+        await run_storage(storage.delete, target)
+        return {"original_bytes": original_bytes, "compressed_key": None}
+    return {"original_bytes": original_bytes, "compressed_key": target, "compressed_bytes": streamed.size}
+
+
+# Strategy → handler run in the migration's "process" stage; returns metadata for the artifact
+STRATEGY_HANDLERS: dict[str, Callable[[dict], Awaitable[Optional[dict]]]] = {
+    "archive_explode": explode_archive,
+    "image_optimize": optimize_image,
+    "html_sanitize": sanitize_html,
+    "ruffle_embed": inspect_swf,
+}
+
+
+# ============================================================================
+# BACKGROUND TASKS
+# ============================================================================
+
+@contextmanager
+def migration_stage(artifact_id: str, strategy: str, stages: list[str], stage: str):
+    """Time a pipeline stage and announce it to the artifact's event subscribers."""
+    event_broker.publish(artifact_id, "stage", {
+        "artifact_id": artifact_id,
+        "strategy": strategy,
+        "stage": stage,
+        "step": stages.index(stage) + 1,
+        "total": len(stages),
+    })
+    with (
+        migration_workers.metrics.time(f"{strategy}.{stage}"),
+        observe(MIGRATION_STAGE_SECONDS, MIGRATION_STAGE_ERRORS, strategy=strategy, stage=stage),
+        span(f"migration.{stage}", artifact_id=artifact_id, strategy=strategy),
+    ):
+        yield
+
+
+async def follow_canonical(artifact: dict, strategy: str) -> bool:
+    """Finish a duplicate from its canonical's migration instead of running the pipeline (and TTS) again.
+
+    Raises JobDeferred while the canonical is still migrating; returns False when
+    the duplicate should migrate on its own (canonical failed, gone, or too slow).
+    """
+    artifact_id = artifact["artifact_id"]
+    canonical_id = artifact["metadata"]["duplicate_of"]
+    canonical = await get_artifact_from_db(canonical_id)
+    status = (canonical or {}).get("status")
+    if status == "ready":
+        await update_artifact_in_db(artifact_id, {
+            "status": "ready",
+            "ghost_narration_url": canonical.get("ghost_narration_url"),
+            "metadata": {**artifact["metadata"], **derived_metadata(canonical)},
+        })
+        log_migration_event(artifact_id, "migrate_complete", strategy=strategy, duplicate_of=canonical_id)
+        logger.info(f"✅ Migration complete: {artifact_id} (linked to {canonical_id})")
+        return True
+    if status in ("uploaded", "migrating"):
+        try:
+            created = datetime.fromisoformat(artifact["created_at"])
+            if created.tzinfo is not None:  # PostgREST returns timestamptz with an offset
+                created = created.astimezone(timezone.utc).replace(tzinfo=None)
+            waited = (datetime.utcnow() - created).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            waited = float("inf")
+        if waited < MIGRATION_DUPLICATE_WAIT_SECONDS:
+            raise JobDeferred(f"waiting for canonical {canonical_id} ({status})", DUPLICATE_RECHECK_SECONDS)
+    logger.warning(f"⚠️ Canonical {canonical_id} is {status or 'missing'}; migrating duplicate {artifact_id} itself")
+    return False
+
+
+async def orchestrate_migration(artifact_id: str, artifact_name: str, artifact_type: str, attempt: int = 1):
+    """Run the migration pipeline for one artifact, timing each stage.
+
+    Raises on failure so the job queue can retry with backoff.
+    """
+    plan = generate_migration_plan(artifact_type, artifact_id)
+    artifact = await get_artifact_from_db(artifact_id)
+    if artifact is None:
+        raise PermanentJobError(f"Artifact {artifact_id} not found")
+
+    unlinked = None
+    if (artifact.get("metadata") or {}).get("duplicate_of"):
+        if await follow_canonical(artifact, plan.strategy):
+            return
+        # Canonical failed or never finished: migrate this copy on its own
+        unlinked = artifact["metadata"] = {k: v for k, v in artifact["metadata"].items() if k != "duplicate_of"}
+
+    handler = STRATEGY_HANDLERS.get(plan.strategy)
+    # Archive members are narrated through their parent, not one TTS call per file
+    narrate = not artifact.get("parent_artifact_id")
+    stages = ["start"] + (["process"] if handler else []) + (["narrate"] if narrate else []) + ["finalize"]
+    logger.info(f"🔄 Starting migration for {artifact_id} ({plan.strategy})...")
+    started = time.perf_counter()
+
+    try:
+        with migration_stage(artifact_id, plan.strategy, stages, "start"):
+            # Progress only; coalesces with the finalize write
+            await update_artifact_in_db(artifact_id, {"status": "migrating"}, wait=False)
+            log_migration_event(artifact_id, "migrate_start", strategy=plan.strategy)
+
+        updates: dict = {"status": "ready"}
+        if unlinked is not None:
+            updates["metadata"] = unlinked
+        if handler:
+            with migration_stage(artifact_id, plan.strategy, stages, "process"):
+                result = await handler(artifact)
+            if result:
+                updates["metadata"] = {**(artifact.get("metadata") or {}), **result}
+
+        ghost_url = None
+        if narrate:
+            with migration_stage(artifact_id, plan.strategy, stages, "narrate"):
+                ghost_url = await generate_ghost_narration(artifact_id, artifact_name, artifact_type)
+            updates["ghost_narration_url"] = ghost_url
+
+        with migration_stage(artifact_id, plan.strategy, stages, "finalize"):
+            await update_artifact_in_db(artifact_id, updates)
+            log_migration_event(
+                artifact_id, "migrate_complete", strategy=plan.strategy,
+                duration_ms=round((time.perf_counter() - started) * 1000), narrated=ghost_url is not None,
+            )
     except Exception as e:
-        logger.error(f"❌ Migration failed for {artifact_id}: {e}")
-        await update_artifact_in_db(artifact_id, {"status": "failed", "error_message": str(e)})
+        log_migration_event(artifact_id, "error", strategy=plan.strategy, attempt=attempt, error=str(e)[:500])
+        raise
+    logger.info(f"✅ Migration complete: {artifact_id} (narration: {'✅' if ghost_url else '❌'})")
+
+
+async def run_migration_job(job: Job):
+    """Job-queue handler for a single migration attempt (a child span of the upload that queued it)."""
+    with span("migration", carrier=job.payload.get("trace"), artifact_id=job.artifact_id, attempt=job.attempts):
+        await orchestrate_migration(job.artifact_id, job.artifact_name, job.artifact_type, attempt=job.attempts)
+
+
+async def mark_migration_failed(job: Job, error: str):
+    """Called once a job has exhausted its retries."""
+    await update_artifact_in_db(job.artifact_id, {"status": "failed", "error_message": error})
+
+
+migration_queue = JobQueue(
+    MIGRATION_QUEUE_PATH,
+    lease_seconds=MIGRATION_LEASE_SECONDS,
+    max_attempts=MIGRATION_MAX_ATTEMPTS,
+    retention_seconds=MIGRATION_JOB_RETENTION_SECONDS,
+)
+migration_workers = MigrationWorkerPool(
+    migration_queue,
+    run_migration_job,
+    parse_concurrency(MIGRATION_CONCURRENCY, MIGRATION_CONCURRENCY_OVERRIDES),
+    run_sync=io_executor.bind("queue"),
+    on_dead=mark_migration_failed,
+)
+
+
+async def migration_backlog() -> int:
+    """Queued migration jobs; upload admission sheds new uploads past MIGRATION_MAX_BACKLOG."""
+    counts = await io_executor.run("queue", migration_queue.stats)
+    return sum(counts.get("queued", {}).values())
+
+
+runtime_metrics = RuntimeCollector(io_executor, tts_dispatcher, migration_workers, upload_admission)
+METRICS_REGISTRY.register(runtime_metrics)
 
 
 # ============================================================================
 # ENTRY POINT
 # ============================================================================
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+logger.info(f"⏱️ Backend module imported in {IMPORT_SECONDS * 1000:.0f} ms")
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,3 @@
+"""
+NecroNet backend services — building blocks wired together by main.py
+"""
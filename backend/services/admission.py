@@ -0,0 +1,371 @@
+"""
+Upload admission control — global + per-client limits on concurrent uploads and in-flight bytes
+Runs as ASGI middleware, so oversized or over-limit uploads are turned away from their headers
+before the multipart body is read; everything else on the API is untouched.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SHED_REASONS = (
+    "too_large",
+    "client_concurrency",
+    "client_bytes",
+    "queue_full",
+    "queue_timeout",
+    "backlog",
+)
+
+
+class AdmissionRejected(Exception):
+    """An upload was shed; carries the HTTP status, reason label and Retry-After."""
+
+    def __init__(
+        self, status: int, reason: str, detail: str, retry_after: Optional[float] = None
+    ):
+        super().__init__(detail)
+        self.status = status
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Counts in-flight uploads and declared bytes, globally and per client.
+
+    - Declared size over the route's `max_request_bytes` → 413 straight away.
+    - A client over its own concurrency / byte limit → 429 straight away (only that client backs off).
+    - Global limits full → wait in a bounded FIFO queue for up to `queue_timeout`;
+      a full queue or a timeout → 503. Uploads are admitted in arrival order, so a
+      waiting large upload holds back newer small ones instead of being starved by them.
+    - Migration backlog over `max_backlog` → 503 (uploads would only deepen the queue).
+
+    Uploads without a Content-Length are charged the route's cap (or a client's
+    whole byte share). A single upload larger than a byte limit is still admitted
+    when nothing else is in flight.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_bytes: int = 1024 * 1024 * 1024,
+        client_max_concurrent: int = 4,
+        client_max_bytes: int = 256 * 1024 * 1024,
+        queue_size: int = 64,
+        queue_timeout: float = 5.0,
+        retry_after: float = 2.0,
+        max_backlog: int = 0,
+        backlog: Optional[Callable[[], Awaitable[int]]] = None,
+        backlog_ttl: float = 1.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_bytes = max_bytes
+        self.client_max_concurrent = client_max_concurrent
+        self.client_max_bytes = client_max_bytes
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.max_backlog = max_backlog
+        self.backlog = backlog
+        self.backlog_ttl = backlog_ttl
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self._waiters: deque[object] = (
+            deque()
+        )  # tickets of queued uploads, oldest first
+        self._clients: dict[str, list[int]] = {}  # client → [uploads, bytes]
+        self._condition: Optional[asyncio.Condition] = None
+        self._backlog_value = 0
+        self._backlog_checked = 0.0
+        self.admitted = 0
+        self.shed = {reason: 0 for reason in SHED_REASONS}
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _reject(
+        self, status: int, reason: str, detail: str, retry_after: Optional[float] = None
+    ) -> AdmissionRejected:
+        self.shed[reason] += 1
+        return AdmissionRejected(status, reason, detail, retry_after)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _fits(self, size: int) -> bool:
+        if self.in_flight == 0:
+            return True
+        return (
+            self.in_flight < self.max_concurrent
+            and self.in_flight_bytes + size <= self.max_bytes
+        )
+
+    async def _migration_backlog(self) -> int:
+        now = time.monotonic()
+        if now - self._backlog_checked >= self.backlog_ttl:
+            self._backlog_checked = now
+            try:
+                self._backlog_value = await self.backlog()
+            except Exception as e:
+                logger.warning(f"⚠️ Migration backlog check failed: {e}")
+        return self._backlog_value
+
+    async def acquire(
+        self,
+        client: str,
+        declared_bytes: Optional[int],
+        max_request_bytes: Optional[int] = None,
+    ) -> int:
+        """Admit one upload (waiting for global capacity if needed); returns the bytes charged.
+
+        Raises AdmissionRejected when the upload is shed.
+        """
+        if (
+            max_request_bytes
+            and declared_bytes is not None
+            and declared_bytes > max_request_bytes
+        ):
+            raise self._reject(
+                413,
+                "too_large",
+                f"😢 Upload exceeds the {max_request_bytes // (1024 * 1024)} MB limit",
+            )
+        size = (
+            declared_bytes
+            if declared_bytes is not None
+            else (max_request_bytes or self.client_max_bytes)
+        )
+
+        if (
+            self.max_backlog
+            and self.backlog is not None
+            and await self._migration_backlog() >= self.max_backlog
+        ):
+            # the backlog drains at migration speed, so ask for a longer pause than a busy queue does
+            raise self._reject(
+                503,
+                "backlog",
+                "😢 Migration queue is full, try again shortly",
+                self.retry_after * 5,
+            )
+
+        # The client's share is reserved before queueing, so its queued uploads count against it too
+        entry = self._clients.setdefault(client, [0, 0])
+        if entry[0] >= self.client_max_concurrent:
+            raise self._reject(
+                429,
+                "client_concurrency",
+                f"😢 At most {self.client_max_concurrent} concurrent uploads per client",
+                self.retry_after,
+            )
+        if entry[0] and entry[1] + size > self.client_max_bytes:
+            raise self._reject(
+                429,
+                "client_bytes",
+                "😢 Too many bytes in flight for this client",
+                self.retry_after,
+            )
+        entry[0] += 1
+        entry[1] += size
+
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        started = time.perf_counter()
+        try:
+            async with self._condition:
+                if self._waiters or not self._fits(size):
+                    if len(self._waiters) >= self.queue_size:
+                        raise self._reject(
+                            503,
+                            "queue_full",
+                            "😢 Upload queue is full, try again shortly",
+                            self.retry_after,
+                        )
+                    ticket = object()
+                    self._waiters.append(ticket)
+                    try:
+                        await asyncio.wait_for(
+                            self._condition.wait_for(
+                                lambda: self._waiters[0] is ticket and self._fits(size)
+                            ),
+                            self.queue_timeout,
+                        )
+                    except asyncio.TimeoutError:
+                        raise self._reject(
+                            503,
+                            "queue_timeout",
+                            "😢 Server is busy, try again shortly",
+                            self.retry_after,
+                        )
+                    finally:
+                        self._waiters.remove(ticket)
+                        self._condition.notify_all()  # whoever is at the head now gets to check
+                self.in_flight += 1
+                self.in_flight_bytes += size
+        except BaseException:
+            self._release_client(client, size)
+            raise
+        waited = time.perf_counter() - started
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return size
+
+    def _release_client(self, client: str, size: int) -> None:
+        entry = self._clients[client]
+        entry[0] -= 1
+        entry[1] -= size
+        if entry[0] == 0:
+            del self._clients[client]
+
+    async def release(self, client: str, size: int) -> None:
+        self._release_client(client, size)
+        async with self._condition:
+            self.in_flight -= 1
+            self.in_flight_bytes -= size
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "in_flight_mb": round(self.in_flight_bytes / (1024 * 1024), 1),
+            "waiting": self.waiting,
+            "clients": len(self._clients),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "avg_wait_ms": (
+                round(self.total_wait_seconds / self.admitted * 1000, 2)
+                if self.admitted
+                else 0.0
+            ),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "limits": {
+                "max_concurrent": self.max_concurrent,
+                "max_mb": self.max_bytes // (1024 * 1024),
+                "client_max_concurrent": self.client_max_concurrent,
+                "client_max_mb": self.client_max_bytes // (1024 * 1024),
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying `controller` to upload routes (any method but GET/HEAD/OPTIONS).
+
+    `routes` maps each path to its per-request byte cap (None for no cap). The
+    slot is held until the response has been sent, which covers multipart
+    parsing and streaming the upload to storage.
+
+    Clients are keyed by peer address, or by `client_header` when set. For
+    list headers like X-Forwarded-For, only the entry `trusted_hops` from the
+    right is used: that's the one your own proxies appended, while everything
+    to its left is whatever the client chose to send.
+
+    A refused body is discarded up to `drain_bytes` / `drain_seconds` before the
+    error is sent, so small uploads see the 413/429/503 instead of a connection
+    reset; anything bigger or slower is cut off. Clients sending
+    `Expect: 100-continue` are refused before they send a body at all.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        controller: AdmissionController,
+        routes: dict[str, Optional[int]],
+        client_header: str = "",
+        trusted_hops: int = 1,
+        drain_bytes: int = 1024 * 1024,
+        drain_seconds: float = 1.0,
+    ):
+        self.app = app
+        self.controller = controller
+        self.routes = routes
+        self.client_header = client_header.lower().encode("latin-1")
+        self.trusted_hops = max(1, trusted_hops)
+        self.drain_bytes = drain_bytes
+        self.drain_seconds = drain_seconds
+
+    def _client(self, scope: dict, headers: dict[bytes, bytes]) -> str:
+        if self.client_header and self.client_header in headers:
+            hops = [
+                hop.strip()
+                for hop in headers[self.client_header].decode("latin-1").split(",")
+            ]
+            if len(hops) >= self.trusted_hops and hops[-self.trusted_hops]:
+                return hops[-self.trusted_hops]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _drain(self, receive: Any) -> None:
+        drained = 0
+
+        async def read() -> None:
+            nonlocal drained
+            while drained <= self.drain_bytes:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                drained += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    return
+
+        try:
+            await asyncio.wait_for(read(), self.drain_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in self.routes
+            or scope["method"] in ("GET", "HEAD", "OPTIONS")
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        client = self._client(scope, headers)
+        declared = headers.get(b"content-length")
+        try:
+            size = await self.controller.acquire(
+                client,
+                int(declared) if declared and declared.isdigit() else None,
+                self.routes[scope["path"]],
+            )
+        except AdmissionRejected as e:
+            if headers.get(b"expect", b"").lower() != b"100-continue":
+                await self._drain(receive)
+            # Connection: close — the refused body is never read, so the connection can't be reused
+            response_headers = [
+                (b"content-type", b"application/json"),
+                (b"connection", b"close"),
+            ]
+            if e.retry_after is not None:
+                response_headers.append(
+                    (
+                        b"retry-after",
+                        str(max(1, round(e.retry_after))).encode("latin-1"),
+                    )
+                )
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": e.status,
+                    "headers": response_headers,
+                }
+            )
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": json.dumps({"detail": e.detail}).encode("utf-8"),
+                }
+            )
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.controller.release(client, size)
@@ -0,0 +1,186 @@
+"""
+Streaming archive reader — walks .zip / .tar(.gz|.bz2|.xz) / .gz members straight from storage
+Nothing is extracted to disk; zip central directories are read with ranged reads, tars as one stream.
+Member count, expanded size and compression ratio are capped to defuse archive bombs.
+"""
+
+import gzip
+import io
+import logging
+import posixpath
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class ArchiveError(Exception):
+    """The archive can't be read."""
+
+
+class ArchiveLimitError(ArchiveError):
+    """The archive exceeds a configured safety limit."""
+
+
+@dataclass
+class ArchiveLimits:
+    max_members: int = 5000
+    max_total_bytes: int = 1024 * 1024 * 1024
+    max_ratio: float = 100.0  # expanded bytes / archive bytes
+
+
+@dataclass
+class ArchiveMember:
+    """One regular file inside an archive. `stream` must be consumed before the next member."""
+
+    path: str
+    size: int
+    stream: BinaryIO
+
+
+def safe_member_path(name: str) -> Optional[str]:
+    """Normalize a member name; None for directories or paths escaping the archive root."""
+    path = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if (
+        not path
+        or path == "."
+        or path.startswith("../")
+        or path == ".."
+        or name.endswith("/")
+    ):
+        return None
+    return path
+
+
+def archive_kind(filename: str) -> str:
+    """ "zip", "tar" or "gz" from the file name."""
+    lower = filename.lower()
+    if lower.endswith(".zip"):
+        return "zip"
+    if lower.endswith(TAR_SUFFIXES):
+        return "tar"
+    if lower.endswith(".gz"):
+        return "gz"
+    raise ArchiveError(f"Unsupported archive type: {filename}")
+
+
+class _Budget:
+    """Tracks member count / expanded bytes against the limits while members stream."""
+
+    def __init__(self, limits: ArchiveLimits, archive_size: int):
+        self.limits = limits
+        self.max_bytes = min(
+            limits.max_total_bytes, int(max(archive_size, 1) * limits.max_ratio)
+        )
+        self.members = 0
+        self.expanded = 0
+
+    def add_member(self, declared_size: int) -> None:
+        self.members += 1
+        if self.members > self.limits.max_members:
+            raise ArchiveLimitError(
+                f"Archive has more than {self.limits.max_members} members"
+            )
+        self.consume(declared_size, declared=True)
+
+    def consume(self, n: int, declared: bool = False) -> None:
+        total = self.expanded + n
+        if total > self.max_bytes:
+            raise ArchiveLimitError(
+                f"Archive expands past {self.max_bytes} bytes "
+                f"(limit {self.limits.max_total_bytes} bytes or {self.limits.max_ratio:g}x compression ratio)"
+            )
+        if not declared:
+            self.expanded = total
+
+
+class _MeteredStream(io.RawIOBase):
+    """Counts bytes actually read from a member so lying headers can't bypass the budget."""
+
+    def __init__(self, raw: BinaryIO, budget: _Budget):
+        self.raw = raw
+        self.budget = budget
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.raw.read(n)
+        self.budget.consume(len(data))
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def iter_members(
+    kind: str,
+    open_stream: Callable[[], BinaryIO],
+    open_seekable: Callable[[], BinaryIO],
+    archive_size: int,
+    limits: ArchiveLimits,
+    gz_member_name: str = "",
+) -> Iterator[ArchiveMember]:
+    """Yield regular-file members one at a time (synchronous; run it off the event loop).
+
+    `open_stream` returns a forward-only stream of the archive (tar / gz);
+    `open_seekable` a seekable one (zip).
+    """
+    budget = _Budget(limits, archive_size)
+
+    if kind == "zip":
+        try:
+            archive = zipfile.ZipFile(open_seekable())
+        except zipfile.BadZipFile as e:
+            raise ArchiveError(f"Bad zip file: {e}") from e
+        with archive:
+            for info in archive.infolist():
+                path = safe_member_path(info.filename)
+                if path is None or info.is_dir():
+                    continue
+                if (
+                    info.compress_size
+                    and info.file_size / info.compress_size > limits.max_ratio
+                ):
+                    raise ArchiveLimitError(
+                        f"Member {path} exceeds the {limits.max_ratio:g}x compression ratio limit"
+                    )
+                budget.add_member(info.file_size)
+                with archive.open(info) as raw:
+                    yield ArchiveMember(
+                        path, info.file_size, _MeteredStream(raw, budget)
+                    )
+        return
+
+    if kind in ("tar", "gz"):
+        try:
+            with tarfile.open(fileobj=open_stream(), mode="r|*") as archive:
+                for info in archive:
+                    path = safe_member_path(info.name)
+                    if path is None or not info.isfile():
+                        continue
+                    budget.add_member(info.size)
+                    raw = archive.extractfile(info)
+                    if raw is not None:
+                        yield ArchiveMember(
+                            path, info.size, _MeteredStream(raw, budget)
+                        )
+            return
+        except tarfile.ReadError as e:
+            if kind == "tar" or budget.members:
+                raise ArchiveError(f"Bad tar file: {e}") from e
+
+        # A plain .gz holds exactly one compressed file
+        budget.add_member(0)
+        stream = gzip.GzipFile(fileobj=open_stream(), mode="rb")
+        path = safe_member_path(gz_member_name) or "member"
+        yield ArchiveMember(path, -1, _MeteredStream(stream, budget))
+        return
+
+    raise ArchiveError(f"Unsupported archive kind: {kind}")
@@ -0,0 +1,27 @@
+"""
+Keyset cursors for artifact listing
+Pages are addressed by the (created_at, artifact_id) of their last item, so deep pages cost the same as the first
+"""
+
+import base64
+import json
+
+SortKey = tuple[str, str]  # (created_at, artifact_id)
+
+
+def encode_cursor(created_at: str, artifact_id: str) -> str:
+    """Opaque keyset cursor for the last item of a page."""
+    raw = json.dumps([created_at, artifact_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, artifact_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(created_at, str) or not isinstance(artifact_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created_at, artifact_id
@@ -0,0 +1,400 @@
+"""
+Local artifact store — SQLite (WAL) fallback for the Supabase artifacts table
+Serves mock mode and Supabase outages with indexed queries; rows written while Supabase
+is down are kept dirty and pushed by the write-behind sync once it recovers.
+All state lives in the file, so worker processes on one host can share it.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SortKey = tuple[str, str]  # (created_at, artifact_id)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    artifact_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT '',
+    status TEXT,
+    artifact_type TEXT,
+    content_hash TEXT,
+    parent_artifact_id TEXT,
+    data TEXT NOT NULL,               -- the full row as JSON
+    dirty INTEGER NOT NULL DEFAULT 0, -- written locally, not yet in Supabase
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts(created_at, artifact_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_status ON artifacts(status, created_at, artifact_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_type ON artifacts(artifact_type, created_at, artifact_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_status_type ON artifacts(status, artifact_type, created_at, artifact_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_hash ON artifacts(content_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_parent ON artifacts(parent_artifact_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_evict ON artifacts(dirty, created_at, artifact_id);
+
+-- Updates to rows that only exist in Supabase, made while it was unreachable
+CREATE TABLE IF NOT EXISTS artifact_patches (
+    artifact_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Row count kept by triggers, so the eviction check is one lookup whichever process wrote
+CREATE TABLE IF NOT EXISTS artifact_count (id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL);
+INSERT OR IGNORE INTO artifact_count (id, n) SELECT 0, COUNT(*) FROM artifacts;
+CREATE TRIGGER IF NOT EXISTS artifacts_count_insert AFTER INSERT ON artifacts
+    BEGIN UPDATE artifact_count SET n = n + 1 WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS artifacts_count_delete AFTER DELETE ON artifacts
+    BEGIN UPDATE artifact_count SET n = n - 1 WHERE id = 0; END;
+"""
+
+_INDEXED = (
+    "created_at",
+    "status",
+    "artifact_type",
+    "content_hash",
+    "parent_artifact_id",
+)
+
+
+class ArtifactStore:
+    """Artifact rows in a local SQLite file, indexed for the API's queries.
+
+    Methods are synchronous and thread-safe; call them through an I/O executor
+    from async code. The connection is opened lazily (or by `open()`).
+
+    Memory is bounded by SQLite's page cache (`cache_kib`). With a `remote`
+    (Supabase) copy the file is bounded by `max_rows` — past it the oldest clean
+    rows, which Supabase already has, are evicted. Dirty rows are never evicted,
+    and nothing is without a remote: in mock mode this file is the only copy.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_rows: int = 100_000,
+        cache_kib: int = 8192,
+        remote: bool = True,
+    ):
+        self.path = path
+        self.max_rows = max_rows
+        self.remote = remote
+        self.cache_kib = cache_kib
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.synced = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None, timeout=30
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            logger.info(
+                f"✅ Local artifact store opened: {self.path} "
+                f"({self._row_count(conn)} rows, {self._pending_count(conn)} pending sync)"
+            )
+        return self._conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """Serialized write transaction on the shared connection."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            yield self._connect()
+
+    def open(self) -> None:
+        """Open the file now (creates the schema before the first request needs it)."""
+        with self._lock:
+            self._connect()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Writes --------------------------------------------------------------
+
+    def _upsert(self, conn: sqlite3.Connection, row: dict, dirty: bool) -> None:
+        conn.execute(
+            "INSERT INTO artifacts (artifact_id, created_at, status, artifact_type, content_hash, parent_artifact_id,"
+            " data, dirty) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(artifact_id) DO UPDATE SET created_at = excluded.created_at, status = excluded.status,"
+            " artifact_type = excluded.artifact_type, content_hash = excluded.content_hash,"
+            " parent_artifact_id = excluded.parent_artifact_id, data = excluded.data,"
+            " dirty = MAX(dirty, excluded.dirty), version = version + 1",
+            (
+                row["artifact_id"],
+                row.get("created_at") or "",
+                *(row.get(column) for column in _INDEXED[1:]),
+                json.dumps(row, default=str),
+                int(dirty),
+            ),
+        )
+
+    def put(self, row: dict, dirty: bool = False) -> None:
+        """Insert or replace a row; `dirty` queues it for the Supabase sync."""
+        self.put_many([row], dirty)
+
+    def put_many(self, rows: list[dict], dirty: bool = False) -> None:
+        """Insert or replace rows in one transaction."""
+        with self._tx() as conn:
+            for row in rows:
+                self._upsert(conn, row, dirty)
+            self._evict(conn)
+
+    def update(
+        self, artifact_id: str, updates: dict, dirty: bool = False
+    ) -> Optional[dict]:
+        """Merge `updates` into a row; returns the updated row, or None if it isn't stored here.
+
+        With `dirty`, an update to a row this store doesn't have is kept as a patch
+        and applied to Supabase by the sync.
+        """
+        with self._tx() as conn:
+            return self._update(conn, artifact_id, updates, dirty)
+
+    def update_many(self, updates: dict[str, dict], dirty: bool = False) -> int:
+        """`update()` for many rows in one transaction; returns how many rows were stored here."""
+        with self._tx() as conn:
+            return sum(
+                self._update(conn, artifact_id, changes, dirty) is not None
+                for artifact_id, changes in updates.items()
+            )
+
+    def _update(
+        self, conn: sqlite3.Connection, artifact_id: str, updates: dict, dirty: bool
+    ) -> Optional[dict]:
+        found = conn.execute(
+            "SELECT data FROM artifacts WHERE artifact_id = ?", (artifact_id,)
+        ).fetchone()
+        if found is None:
+            if dirty:
+                patch = conn.execute(
+                    "SELECT data FROM artifact_patches WHERE artifact_id = ?",
+                    (artifact_id,),
+                ).fetchone()
+                merged = {**(json.loads(patch[0]) if patch else {}), **updates}
+                conn.execute(
+                    "INSERT INTO artifact_patches (artifact_id, data) VALUES (?, ?)"
+                    " ON CONFLICT(artifact_id) DO UPDATE SET data = excluded.data, version = version + 1",
+                    (artifact_id, json.dumps(merged, default=str)),
+                )
+            return None
+        row = {**json.loads(found[0]), **updates}
+        self._upsert(conn, row, dirty)
+        return row
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop the oldest synced rows once over max_rows (down to 90%, so eviction is batched)."""
+        if not self.remote:
+            return
+        rows = self._row_count(conn)
+        if rows <= self.max_rows:
+            return
+        excess = rows - int(self.max_rows * 0.9)
+        deleted = conn.execute(
+            "DELETE FROM artifacts WHERE artifact_id IN"
+            " (SELECT artifact_id FROM artifacts WHERE dirty = 0 ORDER BY created_at, artifact_id LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self.evicted += deleted
+        if deleted < excess:
+            logger.warning(
+                f"⚠️ Local artifact store over {self.max_rows} rows: {self._pending_count(conn)} still waiting for sync"
+            )
+
+    # --- Reads ---------------------------------------------------------------
+
+    @staticmethod
+    def _rows_of(cursor: sqlite3.Cursor) -> list[dict]:
+        return [json.loads(data) for (data,) in cursor]
+
+    @staticmethod
+    def _row_count(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT n FROM artifact_count WHERE id = 0").fetchone()[0]
+
+    @staticmethod
+    def _pending_count(conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT (SELECT COUNT(*) FROM artifacts WHERE dirty = 1) + (SELECT COUNT(*) FROM artifact_patches)"
+        ).fetchone()[0]
+
+    def is_pending(self, artifact_id: str) -> bool:
+        """True if the row (or a patch for it) hasn't reached Supabase yet."""
+        return bool(self.pending_among([artifact_id]))
+
+    def pending_among(self, artifact_ids: list[str]) -> set[str]:
+        """The ids whose row or patch hasn't reached Supabase yet (primary-key lookups)."""
+        found: set[str] = set()
+        with self._read() as conn:
+            for i in range(
+                0, len(artifact_ids), 500
+            ):  # stay under SQLite's bound-parameter limit
+                chunk = artifact_ids[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(
+                    row[0]
+                    for row in conn.execute(
+                        f"SELECT artifact_id FROM artifacts WHERE dirty = 1 AND artifact_id IN ({marks})"
+                        f" UNION SELECT artifact_id FROM artifact_patches WHERE artifact_id IN ({marks})",
+                        chunk * 2,
+                    )
+                )
+        return found
+
+    def pending_count(self) -> int:
+        """Dirty rows plus patches still waiting for the sync."""
+        with self._read() as conn:
+            return self._pending_count(conn)
+
+    def get(self, artifact_id: str) -> Optional[dict]:
+        with self._read() as conn:
+            found = conn.execute(
+                "SELECT data FROM artifacts WHERE artifact_id = ?", (artifact_id,)
+            ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def find_by_hash(self, content_hash: str) -> Optional[dict]:
+        """Oldest non-failed row with this content hash."""
+        with self._read() as conn:
+            found = conn.execute(
+                "SELECT data FROM artifacts WHERE content_hash = ? AND status IS NOT 'failed'"
+                " ORDER BY created_at LIMIT 1",
+                (content_hash,),
+            ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def children(self, parent_id: str) -> list[dict]:
+        with self._read() as conn:
+            return self._rows_of(
+                conn.execute(
+                    "SELECT data FROM artifacts WHERE parent_artifact_id = ?",
+                    (parent_id,),
+                )
+            )
+
+    @staticmethod
+    def _filters(
+        status: Optional[str], artifact_type: Optional[str]
+    ) -> tuple[list[str], list]:
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if artifact_type:
+            clauses.append("artifact_type = ?")
+            params.append(artifact_type)
+        return clauses, params
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[SortKey] = None,
+        offset: int = 0,
+        status: Optional[str] = None,
+        artifact_type: Optional[str] = None,
+    ) -> list[dict]:
+        """Rows newest-first: after `cursor` if given, else skipping `offset`."""
+        clauses, params = self._filters(status, artifact_type)
+        if cursor is not None:
+            clauses.append("(created_at, artifact_id) < (?, ?)")
+            params.extend(cursor)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.extend([limit, 0 if cursor is not None else offset])
+        with self._read() as conn:
+            return self._rows_of(
+                conn.execute(
+                    f"SELECT data FROM artifacts{where} ORDER BY created_at DESC, artifact_id DESC LIMIT ? OFFSET ?",
+                    params,
+                )
+            )
+
+    def count(
+        self, status: Optional[str] = None, artifact_type: Optional[str] = None
+    ) -> int:
+        clauses, params = self._filters(status, artifact_type)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._read() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM artifacts{where}", params
+            ).fetchone()[0]
+
+    # --- Write-behind sync ----------------------------------------------------
+
+    def pending(
+        self, limit: int
+    ) -> tuple[list[tuple[dict, int]], list[tuple[str, dict, int]]]:
+        """Up to `limit` dirty rows as (row, version) and patches as (artifact_id, updates, version)."""
+        with self._read() as conn:
+            rows = [
+                (json.loads(data), version)
+                for data, version in conn.execute(
+                    "SELECT data, version FROM artifacts WHERE dirty = 1 ORDER BY created_at LIMIT ?",
+                    (limit,),
+                )
+            ]
+            patches = [
+                (artifact_id, json.loads(data), version)
+                for artifact_id, data, version in conn.execute(
+                    "SELECT artifact_id, data, version FROM artifact_patches LIMIT ?",
+                    (limit,),
+                )
+            ]
+        return rows, patches
+
+    def mark_synced(
+        self, rows: list[tuple[str, int]], patches: list[tuple[str, int]]
+    ) -> None:
+        """Drop rows / patches now in Supabase — unless they changed since `pending()` read them.
+
+        Synced rows aren't kept: later updates go straight to Supabase, so a local
+        copy would go stale and could be pushed back over newer data.
+        """
+        with self._tx() as conn:
+            for artifact_id, version in rows:
+                self.synced += conn.execute(
+                    "DELETE FROM artifacts WHERE artifact_id = ? AND version = ?",
+                    (artifact_id, version),
+                ).rowcount
+            for artifact_id, version in patches:
+                self.synced += conn.execute(
+                    "DELETE FROM artifact_patches WHERE artifact_id = ? AND version = ?",
+                    (artifact_id, version),
+                ).rowcount
+
+    def stats(self) -> dict:
+        with self._read() as conn:
+            rows, pending = self._row_count(conn), self._pending_count(conn)
+        return {
+            "path": self.path,
+            "rows": rows,
+            "max_rows": self.max_rows if self.remote else None,
+            "pending_sync": pending,
+            "synced": self.synced,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,186 @@
+"""
+Lazy SDK clients + background warm-up for fast cold starts
+supabase-py and boto3 are imported and built on first use (or by the warm-up task), not at import;
+Readiness tracks which components are warm for the /ready probe.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyClient:
+    """Builds a client on first use and proxies attribute access to it.
+
+    Falsy when unconfigured (no factory) or once construction has failed, so
+    `if client:` keeps meaning "use this backend". Construction happens once,
+    under a lock, so a request racing the warm-up waits for it instead of
+    building a second client.
+    """
+
+    def __init__(self, name: str, factory: Optional[Callable[[], Any]]):
+        self._name = name
+        self._factory = factory
+        self._client: Any = None
+        self._error: Optional[Exception] = None
+        self._build_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return self._factory is not None
+
+    @property
+    def built(self) -> bool:
+        return self._client is not None
+
+    def get(self) -> Any:
+        """The client, built now if needed; raises if unconfigured or construction failed."""
+        if self._client is not None:
+            return self._client
+        if self._factory is None:
+            raise RuntimeError(f"{self._name} client is not configured")
+        with self._lock:
+            if self._client is None:
+                if self._error is not None:
+                    raise self._error
+                started = time.perf_counter()
+                try:
+                    self._client = self._factory()
+                except Exception as e:
+                    self._error = e
+                    logger.error(f"❌ {self._name} client construction failed: {e}")
+                    raise
+                self._build_seconds = time.perf_counter() - started
+                logger.info(
+                    f"✅ {self._name} client ready in {self._build_seconds * 1000:.0f} ms"
+                )
+        return self._client
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get(), attr)
+
+    def __bool__(self) -> bool:
+        return self._factory is not None and self._error is None
+
+    def stats(self) -> dict:
+        if not self.configured:
+            status = "not_configured"
+        elif self._error is not None:
+            status = "failed"
+        else:
+            status = "connected" if self.built else "pending"
+        return {
+            "status": status,
+            "build_ms": (
+                round(self._build_seconds * 1000, 1)
+                if self._build_seconds is not None
+                else None
+            ),
+            "error": str(self._error) if self._error else None,
+        }
+
+
+class Readiness:
+    """Background warm-up of named components; ready once every required one has warmed.
+
+    A warm-up function returns a short state (e.g. "connected", "mock", "local").
+    Required components that raise are retried with backoff; optional ones get one try.
+    Required components listed in `degradable` have a fallback: once their first
+    attempt fails they're reported "degraded" and stop gating readiness while
+    the retries go on.
+    """
+
+    def __init__(
+        self,
+        required: set[str],
+        degradable: frozenset[str] = frozenset(),
+        retry_initial: float = 1.0,
+        retry_max: float = 30.0,
+    ):
+        self.required = required
+        self.degradable = degradable
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._components: dict[str, dict] = {}
+        self._events: dict[str, asyncio.Event] = {}
+        self._attempted: dict[str, asyncio.Event] = {}
+        self.ready_at: Optional[float] = None
+
+    def _event(self, name: str) -> asyncio.Event:
+        return self._events.setdefault(name, asyncio.Event())
+
+    def _attempt_event(self, name: str) -> asyncio.Event:
+        return self._attempted.setdefault(name, asyncio.Event())
+
+    def _note_ready(self) -> None:
+        if self.ready_at is None and self.ready:
+            self.ready_at = time.perf_counter()
+
+    async def warm(self, name: str, warm_up: Callable[[], Awaitable[str]]) -> None:
+        """Run `warm_up` for `name` until it succeeds (required) or once (optional)."""
+        entry = self._components.setdefault(
+            name, {"state": "warming", "ms": None, "attempts": 0, "error": None}
+        )
+        delay = self.retry_initial
+        while True:
+            entry["attempts"] += 1
+            started = time.perf_counter()
+            try:
+                entry["state"] = await warm_up()
+                entry["error"] = None
+                entry["ms"] = round((time.perf_counter() - started) * 1000, 1)
+                logger.info(
+                    f"🔥 {name} warm ({entry['state']}) in {entry['ms']:.0f} ms"
+                )
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+                if name not in self.required:
+                    entry["state"] = "unavailable"
+                    logger.warning(f"⚠️ {name} warm-up failed: {entry['error']}")
+                    break
+                entry["state"] = "degraded" if name in self.degradable else "retrying"
+                logger.warning(
+                    f"⚠️ {name} warm-up failed, retrying in {delay:.0f}s: {entry['error']}"
+                )
+                self._attempt_event(name).set()
+                self._note_ready()
+                await asyncio.sleep(delay)
+                delay = min(self.retry_max, delay * 2)
+        self._attempt_event(name).set()
+        self._event(name).set()
+        self._note_ready()
+
+    async def wait(self, name: str) -> None:
+        """Block until `name` has finished warming."""
+        await self._event(name).wait()
+
+    async def wait_attempt(self, name: str) -> None:
+        """Block until `name` has warmed or failed its first attempt (its fallback is in use)."""
+        await self._attempt_event(name).wait()
+
+    @property
+    def ready(self) -> bool:
+        return all(
+            self._components.get(name, {}).get("state")
+            not in (None, "warming", "retrying")
+            for name in self.required
+        )
+
+    @property
+    def degraded(self) -> list[str]:
+        return sorted(
+            name
+            for name, entry in self._components.items()
+            if entry["state"] == "degraded"
+        )
+
+    def snapshot(self) -> dict:
+        return {name: dict(entry) for name, entry in self._components.items()}
@@ -0,0 +1,109 @@
+"""
+Artifact delivery helpers — memoized presigned URLs and HTTP Range parsing for the content endpoint
+Reusing one presigned URL per object until it nears expiry keeps URLs stable, so browsers and CDNs can cache them.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from starlette.responses import StreamingResponse
+from starlette.types import Send
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+def normalize_range(header: Optional[str]) -> Optional[str]:
+    """Canonical "bytes=a-b" / "bytes=a-" / "bytes=-n" for a single-range header.
+
+    None when there's no header or it can't be honoured (multi-range or malformed),
+    in which case the full object is served, as RFC 9110 allows.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header)
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+
+class PresignedUrlCache:
+    """Memoizes presigned GET URLs until `refresh_margin` seconds before they expire.
+
+    `sign(key, ttl_seconds, cache_control)` produces the URL (e.g. boto3's
+    generate_presigned_url); entries are LRU-bounded and safe to use from threads.
+    """
+
+    def __init__(
+        self,
+        sign: Callable[[str, int, Optional[str]], str],
+        ttl_seconds: int = 3600,
+        refresh_margin: int = 300,
+        max_entries: int = 4096,
+    ):
+        self.sign = sign
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = min(refresh_margin, ttl_seconds // 2)
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[Hashable, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.signed = 0
+
+    def get(self, key: str, cache_control: Optional[str] = None) -> tuple[str, int]:
+        """(url, seconds of validity left before it'll be re-signed)."""
+        now = time.time()
+        cache_key = (key, cache_control)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[1] - self.refresh_margin > now:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[0], int(entry[1] - self.refresh_margin - now)
+
+        url = self.sign(key, self.ttl_seconds, cache_control)
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self.signed += 1
+            self._entries[cache_key] = (url, expires_at)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return url, int(self.ttl_seconds - self.refresh_margin)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "signed": self.signed,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class ObjectStreamResponse(StreamingResponse):
+    """StreamingResponse that hands bytes-like chunks to the server as they are.
+
+    Memory-mapped objects are relayed as memoryview slices; the stock class
+    would try to encode them, and a bytes() copy would defeat the mapping.
+    """
+
+    async def stream_response(self, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        async for chunk in self.body_iterator:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,84 @@
+"""
+In-process pub/sub for artifact events — feeds the SSE endpoint
+Each subscriber gets a bounded queue; slow consumers lose their oldest events, never block publishers
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One subscriber's view of a topic."""
+
+    def __init__(self, broker: "EventBroker", topic: str, queue_size: int):
+        self.broker = broker
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if `timeout` elapses first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Topic → subscribers fan-out. Publishing is synchronous and O(subscribers)."""
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self._topics: dict[str, set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic, self.queue_size)
+        self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._topics.get(subscription.topic)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._topics[subscription.topic]
+
+    def publish(self, topic: str, event: str, data: Any) -> int:
+        """Send an event to every subscriber of `topic`; returns how many received it."""
+        self.published += 1
+        subscribers = self._topics.get(topic)
+        if not subscribers:
+            return 0
+        message = {"event": event, "data": data}
+        for subscription in subscribers:
+            queue = subscription.queue
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+            self.delivered += 1
+        return len(subscribers)
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self._topics),
+            "subscribers": sum(len(s) for s in self._topics.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,123 @@
+"""
+Dedicated I/O executor — keeps blocking boto3 / supabase-py calls off the event loop
+One bounded thread pool per backend so a slow S3 PUT can't starve DB reads
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class _BackendStats:
+    """Counters for one backend pool (mutated from worker threads under a lock)."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        done = self.completed + self.errors
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "errors": self.errors,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_wait_ms": (
+                round(self.total_wait_seconds / done * 1000, 2) if done else 0.0
+            ),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
+
+
+class IOExecutor:
+    """Bounded thread pools for blocking I/O, keyed by backend name (e.g. "storage", "db")."""
+
+    def __init__(self, limits: dict[str, int]):
+        self._pools = {
+            name: ThreadPoolExecutor(
+                max_workers=max(1, workers), thread_name_prefix=f"io-{name}"
+            )
+            for name, workers in limits.items()
+        }
+        self._stats = {
+            name: _BackendStats(max(1, workers)) for name, workers in limits.items()
+        }
+        self._lock = threading.Lock()
+
+    async def run(
+        self, backend: str, fn: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Run `fn(*args, **kwargs)` on the backend's pool and await the result."""
+        pool = self._pools[backend]
+        stats = self._stats[backend]
+        submitted = time.perf_counter()
+        ctx = contextvars.copy_context()
+
+        with self._lock:
+            stats.queued += 1
+            stats.max_queue_depth = max(stats.max_queue_depth, stats.queued)
+
+        def call() -> Any:
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                stats.queued -= 1
+                stats.in_flight += 1
+                stats.total_wait_seconds += waited
+                stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+            ok = False
+            try:
+                result = ctx.run(functools.partial(fn, *args, **kwargs))
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    stats.in_flight -= 1
+                    if ok:
+                        stats.completed += 1
+                    else:
+                        stats.errors += 1
+
+        def dequeue_if_cancelled(future: Future) -> None:
+            # cancelled before `call` started (awaiter cancelled, or shutdown(cancel_futures=True))
+            if future.cancelled():
+                with self._lock:
+                    stats.queued -= 1
+
+        try:
+            future = pool.submit(call)
+        except RuntimeError:  # pool already shut down
+            with self._lock:
+                stats.queued -= 1
+            raise
+        future.add_done_callback(dequeue_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def bind(self, backend: str) -> Callable[..., Any]:
+        """Return an awaitable `run_sync(fn, *args, **kwargs)` bound to one backend."""
+        return functools.partial(self.run, backend)
+
+    def stats(self) -> dict:
+        """Per-backend pool stats (queue depth, in-flight, wait times)."""
+        with self._lock:
+            return {name: s.snapshot() for name, s in self._stats.items()}
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running calls to finish."""
+        for name, pool in self._pools.items():
+            pool.shutdown(wait=True, cancel_futures=True)
+            logger.info(f"🧹 I/O pool '{name}' shut down")
@@ -0,0 +1,424 @@
+"""
+Streaming HTML sanitizer / rewriter — legacy pages in, safe pages with resolved asset URLs out
+Documents are tokenized incrementally (html.parser feed mode). Memory is bounded by the chunk size plus
+one unfinished tag or <style> block; the bodies of dropped <script>s and of oversized comments are
+discarded as they stream in instead of being buffered to their closing tag.
+"""
+
+import codecs
+import html
+import posixpath
+import re
+from html.parser import HTMLParser
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import unquote, urlsplit
+
+# Resolves a URL found in the document; None leaves it untouched
+UrlResolver = Callable[[str], Optional[str]]
+
+URL_ATTRIBUTES = {
+    "href",
+    "src",
+    "background",
+    "action",
+    "formaction",
+    "poster",
+    "data",
+    "lowsrc",
+    "dynsrc",
+    "longdesc",
+    "codebase",
+    "cite",
+}
+DROP_WITH_CONTENT = {"script"}
+DROP_TAG_KEEP_CONTENT = {
+    "noscript"
+}  # scripts are gone, so the fallback content should show
+DROP_TAGS = {"base"}  # would redirect every rewritten relative URL
+FOREIGN_TAGS = {
+    "svg",
+    "math",
+}  # browsers parse <style> inside these as markup, not raw text
+UNSAFE_SCHEMES = ("javascript:", "vbscript:", "livescript:")
+FLASH_PARAM_NAMES = {"movie", "src", "url", "base"}
+URL_MEMO_ENTRIES = (
+    4096  # legacy pages repeat the same few asset URLs thousands of times
+)
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""", re.IGNORECASE)
+# Browsers drop tab / CR / LF anywhere in a URL and leading C0 controls and spaces before the scheme
+URL_IGNORED_RE = re.compile(r"[\t\r\n]")
+URL_LEADING = "".join(chr(c) for c in range(0x21))
+CSS_CDO_CDC_RE = re.compile(
+    r"<!--|-->"
+)  # no-ops in a stylesheet; legacy pages wrap CSS in them
+CSS_COMMENT_RE = re.compile(r"/\*.*?(\*/|$)", re.DOTALL)
+CSS_ESCAPE_RE = re.compile(r"\\([0-9a-fA-F]{1,6})[ \t\r\n\f]?|\\(.)", re.DOTALL)
+UNSAFE_CSS_RE = re.compile(
+    r"expression\s*\(|behaviou?r\s*:|-moz-binding\s*:|(?:java|vb|live)script\s*:",
+    re.IGNORECASE,
+)
+MAX_PENDING_CHARS = (
+    64 * 1024
+)  # unparsed input allowed to pile up inside a dropped <script> or a comment
+SKIPPED_TAIL_CHARS = (
+    64  # kept so a "</script>" / "-->" split across chunks is still found
+)
+CHARSET_RE = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*['"]?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE
+)
+
+
+def resolve_member_path(base_path: str, url: str) -> Optional[tuple[str, str]]:
+    """Map a relative (or root-relative) URL in the page at `base_path` to an archive member path.
+
+    Returns (member_path, "?query#fragment" suffix), or None for absolute / special URLs.
+    """
+    url = url.strip()
+    if not url or url.startswith(("#", "data:", "mailto:", "//")):
+        return None
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    raw_path = unquote(parts.path)
+    if raw_path.startswith("/"):
+        joined = raw_path.lstrip("/")
+    else:
+        joined = posixpath.join(posixpath.dirname(base_path), raw_path)
+    path = posixpath.normpath(joined)
+    if path.startswith("..") or path == ".":
+        return None
+    suffix = (f"?{parts.query}" if parts.query else "") + (
+        f"#{parts.fragment}" if parts.fragment else ""
+    )
+    return path, suffix
+
+
+def is_unsafe_url(value: str) -> bool:
+    """True for javascript:/vbscript:/livescript: URLs, however they're obfuscated (entities, tabs, controls)."""
+    normalized = (
+        URL_IGNORED_RE.sub("", html.unescape(value)).lstrip(URL_LEADING).lower()
+    )
+    return normalized.startswith(UNSAFE_SCHEMES)
+
+
+def _css_unescape(match: re.Match) -> str:
+    if match.group(1):
+        codepoint = int(match.group(1), 16)
+        return chr(codepoint) if 0 < codepoint <= 0x10FFFF else "\ufffd"
+    return match.group(2)
+
+
+def normalize_css(css: str) -> str:
+    """CSS with comments removed and escapes decoded — what the browser's tokenizer sees."""
+    return CSS_ESCAPE_RE.sub(_css_unescape, CSS_COMMENT_RE.sub("", css))
+
+
+def is_unsafe_css(css: str) -> bool:
+    """True for CSS that can run script: IE expression(), behavior / -moz-binding, script URLs."""
+    return UNSAFE_CSS_RE.search(normalize_css(css)) is not None
+
+
+def sniff_charset(head: bytes, default: str = "utf-8") -> str:
+    """Charset from a BOM or <meta charset> in the first bytes; falls back to `default`."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    match = CHARSET_RE.search(head[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return default
+
+
+class HTMLRewriter(HTMLParser):
+    """Incremental sanitizer: feed() text chunks, collect the rewritten output as it's produced.
+
+    Removes <script> elements, on* event handlers, javascript: URLs, IE CSS
+    expressions, conditional comments and <base>; rewrites URLs in attributes,
+    srcset, inline styles, <style> blocks and Flash <param>s through `resolve`;
+    declares the (re-encoded) document as UTF-8.
+    """
+
+    def __init__(self, resolve: Optional[UrlResolver] = None):
+        super().__init__(convert_charrefs=False)
+        self.resolve = resolve or (lambda url: None)
+        self._out: list[str] = []
+        self._skip_depth = 0
+        self._style: Optional[list[str]] = None
+        self._foreign_depth = 0
+        self._memo: dict[str, tuple[str, bool]] = {}
+        self._comment_trimmed = False
+        self.stats = {
+            "scripts_removed": 0,
+            "handlers_removed": 0,
+            "unsafe_urls_removed": 0,
+            "urls_rewritten": 0,
+            "urls_unresolved": 0,
+        }
+
+    # -- public API -------------------------------------------------------
+
+    def feed(self, data: str) -> str:
+        """Tokenize another chunk; returns the output it completed."""
+        super().feed(data)
+        self._trim_skipped()
+        return self._drain()
+
+    def close(self) -> str:
+        super().close()
+        if self._style is not None:
+            self._out.append(self._clean_style_block("".join(self._style)))
+            self._style = None
+        return self._drain()
+
+    # -- rewriting helpers -----------------------------------------------
+
+    def _trim_skipped(self) -> None:
+        # html.parser keeps everything after an unclosed <script> / <!-- in rawdata until it closes;
+        # that content is dropped anyway, so only keep enough of the tail to spot the close
+        if len(self.rawdata) <= MAX_PENDING_CHARS:
+            return
+        if self.cdata_elem == "script":
+            self.rawdata = self.rawdata[-SKIPPED_TAIL_CHARS:]
+        elif self.rawdata.startswith("<!--"):
+            self._comment_trimmed = True
+            self.rawdata = "<!--" + self.rawdata[-SKIPPED_TAIL_CHARS:]
+
+    def _drain(self) -> str:
+        out = "".join(self._out)
+        self._out.clear()
+        return out
+
+    def _rewrite_url(self, url: str) -> str:
+        memo = self._memo.get(url)
+        if memo is None:
+            resolved = self.resolve(url)
+            if resolved is not None:
+                memo = (resolved, True)
+            else:
+                memo = (
+                    (url, False)
+                    if resolve_member_path("", url) is not None
+                    else (url, None)
+                )
+            if len(self._memo) >= URL_MEMO_ENTRIES:
+                self._memo.clear()
+            self._memo[url] = memo
+        rewritten, found = memo
+        if found:
+            self.stats["urls_rewritten"] += 1
+        elif found is False:
+            self.stats["urls_unresolved"] += 1
+        return rewritten
+
+    def _rewrite_srcset(self, value: str) -> str:
+        candidates = []
+        for candidate in value.split(","):
+            url, _, descriptor = candidate.strip().partition(" ")
+            if url:
+                candidates.append(f"{self._rewrite_url(url)} {descriptor}".strip())
+        return ", ".join(candidates)
+
+    def _rewrite_css(self, css: str) -> str:
+        return CSS_URL_RE.sub(
+            lambda m: f"url({m.group(1)}{self._rewrite_url(m.group(2))}{m.group(1)})",
+            css,
+        )
+
+    def _clean_style_block(self, css: str) -> str:
+        if is_unsafe_css(css):
+            # Neutralize on the normalized text (escapes can't smuggle the keywords back in)
+            css, removed = UNSAFE_CSS_RE.subn("invalid ", normalize_css(css))
+            self.stats["unsafe_urls_removed"] += removed
+        # Always keep "<" escaped: inside <svg>/<math> the browser parses the block as markup, and
+        # decoded escapes must not close the <style> element early
+        css = CSS_CDO_CDC_RE.sub("", css).replace("<", "\\3c ")
+        return self._rewrite_css(css)
+
+    def _clean_attrs(
+        self, tag: str, attrs: list[tuple[str, Optional[str]]]
+    ) -> list[tuple[str, Optional[str]]]:
+        cleaned = []
+        param_name = next((v.lower() for k, v in attrs if k == "name" and v), "")
+        for name, value in attrs:
+            if name.startswith("on"):
+                self.stats["handlers_removed"] += 1
+                continue
+            if name == "srcdoc":
+                continue
+            if tag == "meta" and (
+                name == "charset"
+                or (name == "content" and "charset=" in (value or "").lower())
+            ):
+                # Output is always re-encoded as UTF-8
+                value = (
+                    "utf-8"
+                    if name == "charset"
+                    else re.sub(r"(?i)charset=[^;]*", "charset=utf-8", value)
+                )
+            if value is None:
+                cleaned.append((name, value))
+                continue
+            if is_unsafe_url(value):
+                self.stats["unsafe_urls_removed"] += 1
+                continue
+            if name == "style":
+                if is_unsafe_css(value):
+                    self.stats["unsafe_urls_removed"] += 1
+                    continue
+                value = self._rewrite_css(value)
+            elif name in URL_ATTRIBUTES or (
+                tag == "param" and name == "value" and param_name in FLASH_PARAM_NAMES
+            ):
+                value = self._rewrite_url(value)
+            elif name == "srcset":
+                value = self._rewrite_srcset(value)
+            cleaned.append((name, value))
+        return cleaned
+
+    def _emit_tag(
+        self, tag: str, attrs: list[tuple[str, Optional[str]]], self_closing: bool
+    ) -> None:
+        original = self.get_starttag_text() or ""
+        cleaned = self._clean_attrs(tag, attrs)
+        if cleaned == attrs and original:
+            self._out.append(original)  # untouched tags keep their exact bytes
+            return
+        rendered = "".join(
+            (
+                f" {name}"
+                if value is None
+                else f' {name}="{html.escape(value, quote=True)}"'
+            )
+            for name, value in cleaned
+        )
+        self._out.append(f"<{tag}{rendered}{' /' if self_closing else ''}>")
+
+    # -- tokenizer callbacks ---------------------------------------------
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in DROP_WITH_CONTENT:
+            self._skip_depth += 1
+            self.stats["scripts_removed"] += 1
+            return
+        if self._skip_depth or tag in DROP_TAG_KEEP_CONTENT or tag in DROP_TAGS:
+            return
+        self._emit_tag(tag, attrs, self_closing=False)
+        if tag == "style":
+            self._style = []
+        elif tag in FOREIGN_TAGS:
+            self._foreign_depth += 1
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        if (
+            self._skip_depth
+            or tag in DROP_WITH_CONTENT
+            or tag in DROP_TAG_KEEP_CONTENT
+            or tag in DROP_TAGS
+        ):
+            return
+        self._emit_tag(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in DROP_WITH_CONTENT:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self._skip_depth or tag in DROP_TAG_KEEP_CONTENT or tag in DROP_TAGS:
+            return
+        if tag == "style" and self._style is not None:
+            self._out.append(self._clean_style_block("".join(self._style)))
+            self._style = None
+        elif tag in FOREIGN_TAGS:
+            self._foreign_depth = max(0, self._foreign_depth - 1)
+        self._out.append(f"</{tag}>")
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        if self._style is not None:
+            self._style.append(data)  # url() may straddle chunks; rewritten at </style>
+            return
+        self._out.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        if not self._skip_depth:
+            self.handle_data(f"&{name};")
+
+    def handle_charref(self, name: str) -> None:
+        if not self._skip_depth:
+            self.handle_data(f"&#{name};")
+
+    def handle_comment(self, data: str) -> None:
+        # IE conditional comments can carry markup (and scripts) — drop them; so are comments trimmed mid-stream
+        if self._comment_trimmed:
+            self._comment_trimmed = False
+            return
+        if self._skip_depth or data.lstrip().lower().startswith("[if"):
+            return
+        if "<" in data or "--!>" in data or data.startswith((">", "->")):
+            return  # browsers end these early ("--!>", "<!-->"), so the "comment" could hide live markup
+        self._out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl: str) -> None:
+        self._out.append(f"<!{decl}>")
+
+    def handle_pi(self, data: str) -> None:
+        self._out.append(f"<?{data}>")
+
+    def unknown_decl(self, data: str) -> None:
+        # Only SVG/MathML honour CDATA sections; in HTML they're bogus comments ending at the first ">"
+        if not self._skip_depth and self._foreign_depth and data.startswith("CDATA["):
+            self._out.append(html.escape(data[len("CDATA[") :], quote=False))
+
+
+class RewriteStream:
+    """Async `read(n)` source: pulls raw bytes, decodes, rewrites and re-encodes as UTF-8 on demand.
+
+    Plugs straight into stream_upload, so a page is rewritten while it uploads.
+    Tokenizing is CPU-bound pure Python, so each chunk is processed through
+    `run_sync` (a worker thread) rather than on the event loop.
+    """
+
+    def __init__(
+        self,
+        read_chunk: Callable[[], Awaitable[bytes]],
+        rewriter: HTMLRewriter,
+        run_sync: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.read_chunk = read_chunk
+        self.rewriter = rewriter
+        self.run_sync = run_sync
+        self.charset: Optional[str] = None
+        self.bytes_in = 0
+        self._decoder = None
+        self._buffer = bytearray()
+        self._eof = False
+
+    def _process(self, chunk: bytes) -> bytes:
+        if self._decoder is None:
+            self.charset = sniff_charset(chunk)
+            self._decoder = codecs.getincrementaldecoder(self.charset)(errors="replace")
+        if chunk:
+            return self.rewriter.feed(self._decoder.decode(chunk)).encode("utf-8")
+        return (
+            self.rewriter.feed(self._decoder.decode(b"", final=True))
+            + self.rewriter.close()
+        ).encode("utf-8")
+
+    async def read(self, n: int = -1) -> bytes:
+        while not self._eof and (n < 0 or len(self._buffer) < n):
+            chunk = await self.read_chunk()
+            self.bytes_in += len(chunk)
+            self._eof = not chunk
+            if self.run_sync is None:
+                self._buffer += self._process(chunk)
+            else:
+                self._buffer += await self.run_sync(self._process, chunk)
+        size = len(self._buffer) if n < 0 else n
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
@@ -0,0 +1,262 @@
+"""
+Image migration — decode once, emit WebP/AVIF full-size + thumbnail variants
+Pillow work runs in a process pool so CPU-bound encoding never blocks the API event loop
+"""
+
+import asyncio
+import functools
+import io
+import logging
+import multiprocessing
+import numbers
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+try:
+    from PIL import (
+        ExifTags,
+        Image,
+        ImageOps,
+        ImageSequence,
+        UnidentifiedImageError,
+        features,
+    )
+except (
+    ImportError
+):  # Pillow is optional; image migrations skip the variant stage without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# format name → (Pillow encoder, MIME type)
+FORMATS = {"webp": ("WEBP", "image/webp"), "avif": ("AVIF", "image/avif")}
+MAX_ANIMATED_FRAMES = 300
+
+
+class ImageDecodeError(Exception):
+    """The original can't be decoded (corrupt, unsupported or a decompression bomb)."""
+
+
+@dataclass
+class ImageVariant:
+    name: str  # e.g. "w320.webp", "full.avif"
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+
+
+@dataclass
+class ProcessedImage:
+    metadata: dict
+    variants: list[ImageVariant]
+
+
+def supported_formats(requested: list[str]) -> list[str]:
+    """Requested output formats this Pillow build can encode."""
+    if Image is None:
+        return []
+    return [fmt for fmt in requested if fmt in FORMATS and features.check(fmt)]
+
+
+def _json_value(value: Any) -> Any:
+    """EXIF values as JSON-safe scalars (None for anything binary or structured)."""
+    if isinstance(value, bytes):
+        return None
+    if isinstance(value, str):
+        return value.strip("\x00").strip()[:256] or None
+    if isinstance(value, bool) or isinstance(value, int):
+        return value
+    if isinstance(value, numbers.Real):  # includes IFDRational
+        return round(float(value), 6)
+    return None
+
+
+def extract_metadata(img: Any) -> dict:
+    """Format, geometry and EXIF of the original — stored in the DB, stripped from every variant."""
+    metadata = {
+        "format": img.format,
+        "mode": img.mode,
+        "width": img.width,
+        "height": img.height,
+        "frames": getattr(img, "n_frames", 1),
+        "animated": bool(getattr(img, "is_animated", False)),
+        "has_icc_profile": bool(img.info.get("icc_profile")),
+    }
+    # Top-level and Exif sub-IFD tags; IFD pointers and GPS (location) are dropped
+    raw = img.getexif()
+    pointers = {ifd.value for ifd in ExifTags.IFD}
+    exif = {}
+    for tag_id, value in [*raw.items(), *raw.get_ifd(ExifTags.IFD.Exif).items()]:
+        name = ExifTags.TAGS.get(tag_id)
+        value = _json_value(value)
+        if name and value is not None and tag_id not in pointers:
+            exif[name] = value
+    if exif:
+        metadata["exif"] = exif
+    return metadata
+
+
+def _has_alpha(img: Any) -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or (
+        img.mode == "P" and "transparency" in img.info
+    )
+
+
+def _encode(
+    frames: list, fmt: str, quality: int, durations: Optional[list[int]] = None
+) -> bytes:
+    encoder = FORMATS[fmt][0]
+    out = io.BytesIO()
+    options: dict = {"quality": quality}
+    if fmt == "webp":
+        options["method"] = 4
+    if len(frames) > 1:
+        options.update(
+            save_all=True, append_images=frames[1:], duration=durations, loop=0
+        )
+    frames[0].save(out, encoder, **options)
+    return out.getvalue()
+
+
+def process_image(
+    data: bytes, widths: list[int], formats: list[str], quality: int, max_pixels: int
+) -> ProcessedImage:
+    """Decode `data` once and encode every variant. Runs in a worker process."""
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        img = Image.open(io.BytesIO(data))
+        metadata = extract_metadata(img)
+        mode = "RGBA" if _has_alpha(img) else "RGB"
+
+        # Animated GIFs keep their animation in the full-size WebP; thumbnails use the first frame.
+        # All frames are held decoded at once, so their total pixels share the max_pixels budget
+        # (longer or larger animations fall back to the first frame).
+        frames, durations = [], None
+        total_pixels = img.width * img.height * metadata["frames"]
+        if (
+            metadata["animated"]
+            and metadata["frames"] <= MAX_ANIMATED_FRAMES
+            and total_pixels <= max_pixels
+        ):
+            durations = []
+            for frame in ImageSequence.Iterator(img):
+                frames.append(frame.convert("RGBA"))
+                durations.append(frame.info.get("duration", 100))
+            img.seek(0)
+        base = ImageOps.exif_transpose(img).convert(mode)
+    except UnidentifiedImageError:
+        raise ImageDecodeError("Unreadable image: unrecognized format") from None
+    except (Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ImageDecodeError(f"Unreadable image: {e}") from None
+
+    sizes = [("full", base)]
+    for width in sorted(set(widths)):
+        if width < base.width:
+            height = max(1, round(base.height * width / base.width))
+            sizes.append(
+                (
+                    f"w{width}",
+                    base.resize(
+                        (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+                    ),
+                )
+            )
+
+    variants = []
+    for fmt in formats:
+        for name, image in sizes:
+            if name == "full" and len(frames) > 1 and fmt == "webp":
+                encoded = _encode(frames, fmt, quality, durations)
+            else:
+                encoded = _encode([image], fmt, quality)
+            variants.append(
+                ImageVariant(
+                    f"{name}.{fmt}", encoded, FORMATS[fmt][1], image.width, image.height
+                )
+            )
+    return ProcessedImage(metadata, variants)
+
+
+class ImageProcessor:
+    """Runs process_image in a lazily started process pool and keeps timing counters."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        widths: Optional[list[int]] = None,
+        formats: Optional[list[str]] = None,
+        quality: int = 80,
+        max_pixels: int = 50_000_000,
+        max_tasks_per_child: int = 200,
+    ):
+        self.workers = max(1, workers)
+        self.widths = widths or [160, 320, 640]
+        self.formats = supported_formats(formats or ["webp", "avif"])
+        self.quality = quality
+        self.max_pixels = max_pixels
+        self.max_tasks_per_child = max_tasks_per_child
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.processed = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    @property
+    def available(self) -> bool:
+        return bool(self.formats)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the API process has live threads (I/O pools, event loop)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        return self._pool
+
+    async def process(self, data: bytes) -> ProcessedImage:
+        """Decode and encode all variants off the event loop. Raises ImageDecodeError."""
+        loop = asyncio.get_running_loop()
+        job = functools.partial(
+            process_image,
+            data,
+            self.widths,
+            self.formats,
+            self.quality,
+            self.max_pixels,
+        )
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self._get_pool(), job)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.processed += 1
+        self.total_seconds += time.perf_counter() - started
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "workers": self.workers,
+            "formats": self.formats,
+            "widths": self.widths,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "errors": self.errors,
+            "avg_seconds": (
+                round(self.total_seconds / self.processed, 3) if self.processed else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
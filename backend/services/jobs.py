@@ -0,0 +1,604 @@
+"""
+Durable migration job queue — SQLite-backed queue + per-type async worker pool
+Jobs survive restarts: leases expire and orphaned jobs are re-queued on startup;
+finished jobs are pruned once they're older than the retention window
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+RunSync = Callable[..., Awaitable[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS migration_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    artifact_id TEXT NOT NULL,
+    artifact_name TEXT NOT NULL,
+    artifact_type TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, done, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON migration_jobs(status, artifact_type, run_after);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON migration_jobs(status, lease_until);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON migration_jobs(status, updated_at);
+"""
+PRUNE_BATCH = (
+    1000  # rows deleted per transaction, so pruning never holds the write lock for long
+)
+
+
+class PermanentJobError(Exception):
+    """Raise from a handler when retrying can't help; the job goes straight to dead."""
+
+
+class JobDeferred(Exception):
+    """Raise from a handler to run the job again after `delay` seconds without counting an attempt."""
+
+    def __init__(self, reason: str, delay: float):
+        super().__init__(reason)
+        self.delay = delay
+
+
+@dataclass
+class Job:
+    """A claimed migration job."""
+
+    id: int
+    artifact_id: str
+    artifact_name: str
+    artifact_type: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    created_at: float
+
+    @property
+    def final_attempt(self) -> bool:
+        return self.attempts >= self.max_attempts
+
+
+class JobQueue:
+    """Persistent job queue on a local SQLite file (WAL mode).
+
+    All methods are synchronous and thread-safe; call them through an I/O
+    executor from async code. The connection is opened lazily on first use.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        retention_seconds: float = 86400.0,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention_seconds = retention_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """Serialized write transaction on the shared connection."""
+        with self._lock:
+            if self._conn is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = sqlite3.connect(
+                    self.path, check_same_thread=False, isolation_level=None, timeout=30
+                )
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+                self._conn = conn
+                logger.info(f"✅ Migration job queue opened: {self.path}")
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(
+        self,
+        artifact_id: str,
+        artifact_name: str,
+        artifact_type: str,
+        payload: Optional[dict] = None,
+    ) -> int:
+        """Add a job; returns its id."""
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "INSERT INTO migration_jobs (artifact_id, artifact_name, artifact_type, payload, max_attempts,"
+                " run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    artifact_id,
+                    artifact_name,
+                    artifact_type,
+                    json.dumps(payload or {}),
+                    self.max_attempts,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+            return cur.lastrowid
+
+    def enqueue_many(self, jobs: list[tuple[str, str, str, Optional[dict]]]) -> int:
+        """Add (artifact_id, artifact_name, artifact_type, payload) jobs in one transaction."""
+        now = time.time()
+        with self._tx() as conn:
+            conn.executemany(
+                "INSERT INTO migration_jobs (artifact_id, artifact_name, artifact_type, payload, max_attempts,"
+                " run_after, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        artifact_id,
+                        name,
+                        artifact_type,
+                        json.dumps(payload or {}),
+                        self.max_attempts,
+                        now,
+                        now,
+                        now,
+                    )
+                    for artifact_id, name, artifact_type, payload in jobs
+                ],
+            )
+        return len(jobs)
+
+    def claim(self, artifact_type: str, owner: str) -> Optional[Job]:
+        """Lease the next due job of `artifact_type`, or return None."""
+        now = time.time()
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT * FROM migration_jobs WHERE status = 'queued' AND artifact_type = ? AND run_after <= ?"
+                " ORDER BY run_after, id LIMIT 1",
+                (artifact_type, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE migration_jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,"
+                " lease_until = ?, updated_at = ? WHERE id = ?",
+                (owner, now + self.lease_seconds, now, row["id"]),
+            )
+        return Job(
+            id=row["id"],
+            artifact_id=row["artifact_id"],
+            artifact_name=row["artifact_name"],
+            artifact_type=row["artifact_type"],
+            payload=json.loads(row["payload"] or "{}"),
+            attempts=row["attempts"] + 1,
+            max_attempts=row["max_attempts"],
+            created_at=row["created_at"],
+        )
+
+    def heartbeat(self, job_id: int, owner: str) -> bool:
+        """Extend a running job's lease; False if the lease was lost."""
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE migration_jobs SET lease_until = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (now + self.lease_seconds, now, job_id, owner),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE migration_jobs SET status = 'done', lease_owner = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def fail(self, job: Job, error: str, retryable: bool = True) -> bool:
+        """Record a failed attempt. Re-queues with exponential backoff; returns True if retried."""
+        now = time.time()
+        retry = retryable and not job.final_attempt
+        delay = min(self.backoff_max, self.backoff_base**job.attempts)
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE migration_jobs SET status = ?, run_after = ?, last_error = ?, lease_owner = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE id = ?",
+                ("queued" if retry else "dead", now + delay, error[:2000], now, job.id),
+            )
+        return retry
+
+    def release(self, job_id: int, delay: float = 0.0) -> None:
+        """Hand a running job back to the queue without counting the attempt (shutdown, deferral)."""
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE migration_jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), lease_owner = NULL,"
+                " lease_until = NULL, run_after = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now + delay, now, job_id),
+            )
+
+    def recover_orphans(self) -> tuple[int, list[Job]]:
+        """Re-queue running jobs whose lease expired (their worker died or restarted).
+
+        The lost run already counted as an attempt when it was claimed, so a job that
+        keeps killing its worker goes dead once it is out of attempts instead of looping.
+        Returns (re-queued count, jobs moved to dead).
+        """
+        now = time.time()
+        with self._tx() as conn:
+            dead = conn.execute(
+                "SELECT * FROM migration_jobs"
+                " WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                (now,),
+            ).fetchall()
+            conn.execute(
+                "UPDATE migration_jobs SET status = 'dead', last_error = 'lease expired (worker died)',"
+                " lease_owner = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            cur = conn.execute(
+                "UPDATE migration_jobs SET status = 'queued', lease_owner = NULL, lease_until = NULL,"
+                " run_after = ?, updated_at = ? WHERE status = 'running' AND lease_until < ?",
+                (now, now, now),
+            )
+            return cur.rowcount, [
+                Job(
+                    id=row["id"],
+                    artifact_id=row["artifact_id"],
+                    artifact_name=row["artifact_name"],
+                    artifact_type=row["artifact_type"],
+                    payload=json.loads(row["payload"] or "{}"),
+                    attempts=row["attempts"],
+                    max_attempts=row["max_attempts"],
+                    created_at=row["created_at"],
+                )
+                for row in dead
+            ]
+
+    def prune_finished(self) -> int:
+        """Delete `done` jobs finished more than retention_seconds ago; returns the number deleted.
+
+        Dead jobs are kept for inspection. Deletes run in PRUNE_BATCH-row transactions.
+        """
+        cutoff = time.time() - self.retention_seconds
+        pruned = 0
+        while True:
+            with self._tx() as conn:
+                deleted = conn.execute(
+                    "DELETE FROM migration_jobs WHERE id IN (SELECT id FROM migration_jobs"
+                    " WHERE status = 'done' AND updated_at < ? LIMIT ?)",
+                    (cutoff, PRUNE_BATCH),
+                ).rowcount
+            pruned += deleted
+            if deleted < PRUNE_BATCH:
+                return pruned
+
+    def stats(self) -> dict:
+        """Job counts by status and type."""
+        with self._tx() as conn:
+            rows = conn.execute(
+                "SELECT status, artifact_type, COUNT(*) AS n FROM migration_jobs"
+                " WHERE status IN ('queued', 'running', 'dead') GROUP BY status, artifact_type"
+            ).fetchall()
+        counts: dict[str, dict[str, int]] = {}
+        for row in rows:
+            counts.setdefault(row["status"], {})[row["artifact_type"]] = row["n"]
+        return counts
+
+
+class StageMetrics:
+    """Rolling throughput / latency stats per pipeline stage (in-process)."""
+
+    def __init__(self, window: int = 512):
+        self._window = window
+        self._stages: dict[str, dict] = {}
+
+    def record(self, stage: str, seconds: float, ok: bool = True) -> None:
+        entry = self._stages.setdefault(
+            stage,
+            {
+                "count": 0,
+                "errors": 0,
+                "total_seconds": 0.0,
+                "samples": deque(maxlen=self._window),
+            },
+        )
+        entry["count"] += 1
+        entry["total_seconds"] += seconds
+        entry["samples"].append(seconds)
+        if not ok:
+            entry["errors"] += 1
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Context manager recording the wrapped block's duration."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(stage, time.perf_counter() - started, ok)
+
+    def snapshot(self) -> dict:
+        out = {}
+        for stage, entry in sorted(self._stages.items()):
+            samples = sorted(entry["samples"])
+            out[stage] = {
+                "count": entry["count"],
+                "errors": entry["errors"],
+                "avg_ms": round(entry["total_seconds"] / entry["count"] * 1000, 2),
+                "p50_ms": round(statistics.median(samples) * 1000, 2),
+                "p95_ms": round(
+                    samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2
+                ),
+            }
+        return out
+
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class MigrationWorkerPool:
+    """Async workers draining a JobQueue, with a concurrency limit per artifact type."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        concurrency: dict[str, int],
+        run_sync: RunSync,
+        on_dead: Optional[Callable[[Job, str], Awaitable[None]]] = None,
+        poll_interval: float = 1.0,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.run_sync = run_sync
+        self.on_dead = on_dead
+        self.poll_interval = poll_interval
+        self.metrics = StageMetrics()
+        self.outcomes: dict[tuple[str, str], int] = (
+            {}
+        )  # (artifact_type, done|retried|deferred|dead) → attempts
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}:"
+        self._wakeups: dict[str, asyncio.Event] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, int] = {}
+        self._stopping = False
+
+    async def start(self) -> int:
+        """Recover orphaned jobs, prune old finished ones and spawn workers. Returns the number of recovered jobs."""
+        recovered = await self._recover_orphans("orphaned")
+        await self._prune()
+        self._stopping = False
+        for artifact_type, workers in self.concurrency.items():
+            self._wakeups[artifact_type] = asyncio.Event()
+            self._running[artifact_type] = 0
+            for n in range(max(1, workers)):
+                owner = f"{self.owner_prefix}{artifact_type}-{n}"
+                self._tasks.append(
+                    asyncio.create_task(self._worker(artifact_type, owner))
+                )
+        self._tasks.append(asyncio.create_task(self._reaper()))
+        logger.info(f"🔄 Migration workers started: {self.concurrency}")
+        return recovered
+
+    async def stop(self) -> None:
+        """Cancel workers; in-flight jobs are released back to the queue."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("🧹 Migration workers stopped")
+
+    def notify(self, artifact_type: str) -> None:
+        """Wake idle workers for `artifact_type` after an enqueue."""
+        event = self._wakeups.get(artifact_type)
+        if event:
+            event.set()
+
+    async def enqueue(
+        self,
+        artifact_id: str,
+        artifact_name: str,
+        artifact_type: str,
+        payload: Optional[dict] = None,
+    ) -> int:
+        job_id = await self.run_sync(
+            self.queue.enqueue, artifact_id, artifact_name, artifact_type, payload
+        )
+        self.notify(artifact_type)
+        return job_id
+
+    async def enqueue_many(
+        self, jobs: list[tuple[str, str, str, Optional[dict]]]
+    ) -> int:
+        if not jobs:
+            return 0
+        count = await self.run_sync(self.queue.enqueue_many, jobs)
+        for artifact_type in {job[2] for job in jobs}:
+            self.notify(artifact_type)
+        return count
+
+    @property
+    def running(self) -> dict[str, int]:
+        """In-flight jobs per artifact type."""
+        return dict(self._running)
+
+    def stats(self) -> dict:
+        return {"running": self.running, "stages": self.metrics.snapshot()}
+
+    async def _worker(self, artifact_type: str, owner: str) -> None:
+        wakeup = self._wakeups[artifact_type]
+        while not self._stopping:
+            try:
+                job = await self.run_sync(self.queue.claim, artifact_type, owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Job claim failed ({artifact_type}): {e}")
+                job = None
+            if job is None:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run_job(job, owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # never let one job take its worker down
+                logger.error(
+                    f"❌ Migration worker error on job {job.id} ({job.artifact_id}): {e}"
+                )
+
+    async def _run_job(self, job: Job, owner: str) -> None:
+        self._running[job.artifact_type] = self._running.get(job.artifact_type, 0) + 1
+        self.metrics.record(
+            f"{job.artifact_type}.queue_wait", max(0.0, time.time() - job.created_at)
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(job, owner))
+        started = time.perf_counter()
+        try:
+            await self.handler(job)
+        except asyncio.CancelledError:
+            await asyncio.shield(self.run_sync(self.queue.release, job.id))
+            raise
+        except JobDeferred as e:
+            self._count(job.artifact_type, "deferred")
+            logger.info(f"⏸️ Migration of {job.artifact_id} deferred {e.delay:g}s: {e}")
+            await self._settle(
+                job, "defer", self.run_sync(self.queue.release, job.id, e.delay)
+            )
+        except Exception as e:
+            self.metrics.record(
+                f"{job.artifact_type}.job", time.perf_counter() - started, ok=False
+            )
+            error = f"{type(e).__name__}: {e}"
+            retried = await self._settle(
+                job,
+                "fail",
+                self.run_sync(
+                    self.queue.fail, job, error, not isinstance(e, PermanentJobError)
+                ),
+            )
+            if retried is None:
+                return
+            self._count(job.artifact_type, "retried" if retried else "dead")
+            if retried:
+                logger.warning(
+                    f"⚠️ Migration attempt {job.attempts}/{job.max_attempts} failed for {job.artifact_id}: {error}"
+                )
+            else:
+                logger.error(
+                    f"❌ Migration gave up after {job.attempts} attempt(s) for {job.artifact_id}: {error}"
+                )
+                if self.on_dead:
+                    await self._settle(job, "dead-letter", self.on_dead(job, error))
+        else:
+            self.metrics.record(
+                f"{job.artifact_type}.job", time.perf_counter() - started
+            )
+            self._count(job.artifact_type, "done")
+            await self._settle(
+                job, "complete", self.run_sync(self.queue.complete, job.id)
+            )
+        finally:
+            heartbeat.cancel()
+            self._running[job.artifact_type] -= 1
+
+    async def _settle(self, job: Job, action: str, call: Awaitable[Any]) -> Any:
+        """Await a bookkeeping call for `job`; on error log it and return None.
+
+        The job stays `running` and its lease expires, so the reaper re-queues it.
+        """
+        try:
+            return await call
+        except Exception as e:
+            logger.error(
+                f"❌ Migration job {job.id} {action} failed ({job.artifact_id}), lease will expire: {e}"
+            )
+            return None
+
+    def _count(self, artifact_type: str, outcome: str) -> None:
+        key = (artifact_type, outcome)
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    async def _heartbeat(self, job: Job, owner: str) -> None:
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.run_sync(self.queue.heartbeat, job.id, owner):
+                    logger.warning(
+                        f"⚠️ Lost lease on migration job {job.id} ({job.artifact_id})"
+                    )
+                    return
+            except Exception as e:
+                logger.error(f"❌ Heartbeat failed for job {job.id}: {e}")
+
+    async def _reaper(self) -> None:
+        """Periodically re-queue jobs whose worker died without releasing them, and prune finished ones."""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds)
+            try:
+                if await self._recover_orphans("expired"):
+                    for event in self._wakeups.values():
+                        event.set()
+            except Exception as e:
+                logger.error(f"❌ Orphan recovery failed: {e}")
+            await self._prune()
+
+    async def _prune(self) -> None:
+        try:
+            pruned = await self.run_sync(self.queue.prune_finished)
+        except Exception as e:
+            logger.error(f"❌ Pruning finished migration jobs failed: {e}")
+            return
+        if pruned:
+            logger.info(f"🧹 Pruned {pruned} finished migration job(s)")
+
+    async def _recover_orphans(self, label: str) -> int:
+        recovered, dead = await self.run_sync(self.queue.recover_orphans)
+        if recovered:
+            logger.warning(f"⚠️ Re-queued {recovered} {label} migration job(s)")
+        for job in dead:
+            self._count(job.artifact_type, "dead")
+            error = f"lease expired on attempt {job.attempts}/{job.max_attempts} (worker died)"
+            logger.error(f"❌ Migration gave up on {job.artifact_id}: {error}")
+            if self.on_dead:
+                await self._settle(job, "dead-letter", self.on_dead(job, error))
+        return recovered
@@ -0,0 +1,437 @@
+"""
+Prometheus metrics + optional OpenTelemetry spans for the request and migration hot paths
+Latency/bytes histograms are recorded where the work happens; pool, dispatcher and queue
+gauges are read from the existing stats() snapshots at scrape time.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.gc_collector import GCCollector
+from prometheus_client.platform_collector import PlatformCollector
+from prometheus_client.process_collector import ProcessCollector
+
+try:
+    from opentelemetry import propagate, trace
+except ImportError:  # OpenTelemetry is optional; spans are no-ops without it
+    propagate = trace = None
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",  # re-exported: the scrape endpoint's Content-Type goes with render()
+    "REGISTRY",
+    "HTTP_REQUEST_SECONDS",
+    "HTTP_IN_FLIGHT",
+    "STORAGE_SECONDS",
+    "STORAGE_BYTES",
+    "STORAGE_ERRORS",
+    "UPLOAD_SECONDS",
+    "UPLOAD_BYTES",
+    "DB_SECONDS",
+    "DB_ERRORS",
+    "TTS_SECONDS",
+    "TTS_AUDIO_BYTES",
+    "TTS_RETRIES",
+    "NARRATIONS",
+    "MIGRATION_STAGE_SECONDS",
+    "MIGRATION_STAGE_ERRORS",
+    "observe",
+    "InstrumentedStorage",
+    "RuntimeCollector",
+    "render",
+    "tracing_enabled",
+    "span",
+    "trace_carrier",
+    "MetricsMiddleware",
+]
+
+# Own registry, so importing main twice (e.g. as __main__ and main) can't register duplicates
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
+GCCollector(registry=REGISTRY)
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+BYTES_BUCKETS = tuple(
+    float(4**n * 1024) for n in range(10)
+)  # 1 KiB … 256 GiB in ×4 steps
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "necronet_http_request_seconds",
+    "API request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "necronet_http_requests_in_flight", "API requests being served", registry=REGISTRY
+)
+
+STORAGE_SECONDS = Histogram(
+    "necronet_storage_operation_seconds",
+    "Object storage call latency",
+    ["backend", "operation"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+STORAGE_BYTES = Histogram(
+    "necronet_storage_operation_bytes",
+    "Bytes moved per object storage call",
+    ["backend", "operation"],
+    buckets=BYTES_BUCKETS,
+    registry=REGISTRY,
+)
+STORAGE_ERRORS = Counter(
+    "necronet_storage_errors_total",
+    "Failed object storage calls",
+    ["backend", "operation"],
+    registry=REGISTRY,
+)
+
+UPLOAD_SECONDS = Histogram(
+    "necronet_upload_seconds",
+    "Streaming an upload into storage, end to end",
+    ["artifact_type"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+UPLOAD_BYTES = Histogram(
+    "necronet_upload_bytes",
+    "Uploaded artifact sizes",
+    ["artifact_type"],
+    buckets=BYTES_BUCKETS,
+    registry=REGISTRY,
+)
+
+DB_SECONDS = Histogram(
+    "necronet_db_query_seconds",
+    "Supabase query latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+DB_ERRORS = Counter(
+    "necronet_db_errors_total",
+    "Failed Supabase queries",
+    ["operation"],
+    registry=REGISTRY,
+)
+
+TTS_SECONDS = Histogram(
+    "necronet_tts_request_seconds",
+    "ElevenLabs text-to-speech call latency",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+TTS_AUDIO_BYTES = Histogram(
+    "necronet_tts_audio_bytes",
+    "Synthesized narration sizes",
+    buckets=BYTES_BUCKETS,
+    registry=REGISTRY,
+)
+TTS_RETRIES = Counter(
+    "necronet_tts_retries_total",
+    "TTS calls answered 429 and retried",
+    registry=REGISTRY,
+)
+NARRATIONS = Counter(
+    "necronet_narrations_total",
+    "generate_ghost_narration outcomes",
+    ["outcome"],
+    registry=REGISTRY,
+)
+
+MIGRATION_STAGE_SECONDS = Histogram(
+    "necronet_migration_stage_seconds",
+    "Migration pipeline stage latency",
+    ["strategy", "stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+MIGRATION_STAGE_ERRORS = Counter(
+    "necronet_migration_stage_errors_total",
+    "Migration stages that raised",
+    ["strategy", "stage"],
+    registry=REGISTRY,
+)
+
+
+@contextmanager
+def observe(
+    histogram: Histogram, errors: Optional[Counter] = None, **labels: str
+) -> Iterator[None]:
+    """Time the block into `histogram`; count it in `errors` if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if errors is not None:
+            errors.labels(**labels).inc()
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+
+class InstrumentedStorage:
+    """StorageBackend wrapper recording latency, bytes and errors for every call."""
+
+    _TIMED = {
+        "put",
+        "get",
+        "get_range",
+        "open",
+        "head",
+        "exists",
+        "delete",
+        "presign",
+        "create_multipart_upload",
+        "upload_part",
+        "complete_multipart_upload",
+        "abort_multipart_upload",
+    }
+
+    def __init__(self, inner: Any):
+        self.inner = inner
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.inner, name)
+        if name not in self._TIMED:
+            return attr
+        backend = self.inner.name
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with observe(
+                STORAGE_SECONDS, STORAGE_ERRORS, backend=backend, operation=name
+            ):
+                result = attr(*args, **kwargs)
+            size = _bytes_moved(name, args, kwargs, result)
+            if size is not None:
+                STORAGE_BYTES.labels(backend=backend, operation=name).observe(size)
+            return result
+
+        return timed
+
+
+def _bytes_moved(
+    operation: str, args: tuple, kwargs: dict, result: Any
+) -> Optional[int]:
+    if operation == "put":
+        data = args[1] if len(args) > 1 else kwargs.get("data")
+    elif operation == "upload_part":
+        data = args[3] if len(args) > 3 else kwargs.get("data")
+    elif operation in ("get", "get_range"):
+        data = result
+    elif operation == "open":
+        return getattr(result, "size", None)
+    else:
+        return None
+    return len(data) if data is not None else None
+
+
+class RuntimeCollector:
+    """Exports in-process stats snapshots (I/O pools, TTS dispatcher, migrations, upload admission) at scrape time.
+
+    `queue_counts` is refreshed by the /metrics handler (the job queue lives in SQLite
+    and is read on the I/O pool, not from the scrape).
+    """
+
+    def __init__(
+        self,
+        io_executor: Any,
+        tts_dispatcher: Any,
+        migration_workers: Any,
+        admission: Any = None,
+    ):
+        self.io_executor = io_executor
+        self.tts_dispatcher = tts_dispatcher
+        self.migration_workers = migration_workers
+        self.admission = admission
+        self.queue_counts: dict[str, dict[str, int]] = {}
+
+    def collect(self) -> Iterator[Any]:
+        pool_depth = GaugeMetricFamily(
+            "necronet_io_pool_queue_depth",
+            "Calls waiting for an I/O pool thread",
+            labels=["pool"],
+        )
+        pool_busy = GaugeMetricFamily(
+            "necronet_io_pool_in_flight",
+            "Calls running on an I/O pool",
+            labels=["pool"],
+        )
+        pool_errors = CounterMetricFamily(
+            "necronet_io_pool_errors",
+            "Calls that raised on an I/O pool",
+            labels=["pool"],
+        )
+        for pool, stats in self.io_executor.stats().items():
+            pool_depth.add_metric([pool], stats["queue_depth"])
+            pool_busy.add_metric([pool], stats["in_flight"])
+            pool_errors.add_metric([pool], stats["errors"])
+        yield from (pool_depth, pool_busy, pool_errors)
+
+        tts = self.tts_dispatcher.stats()
+        yield GaugeMetricFamily(
+            "necronet_tts_queue_depth",
+            "TTS jobs waiting for the dispatcher",
+            value=tts["queue_depth"],
+        )
+        yield GaugeMetricFamily(
+            "necronet_tts_in_flight", "TTS calls in progress", value=tts["in_flight"]
+        )
+        tts_jobs = CounterMetricFamily(
+            "necronet_tts_jobs", "TTS dispatcher jobs by outcome", labels=["outcome"]
+        )
+        for outcome in ("completed", "failed", "coalesced", "rate_limited"):
+            tts_jobs.add_metric([outcome], tts[outcome])
+        yield tts_jobs
+
+        running = GaugeMetricFamily(
+            "necronet_migration_jobs_in_flight",
+            "Migrations running",
+            labels=["artifact_type"],
+        )
+        for artifact_type, count in self.migration_workers.running.items():
+            running.add_metric([artifact_type], count)
+        yield running
+        outcomes = CounterMetricFamily(
+            "necronet_migration_jobs",
+            "Finished migration attempts",
+            labels=["artifact_type", "outcome"],
+        )
+        for (artifact_type, outcome), count in sorted(
+            self.migration_workers.outcomes.items()
+        ):
+            outcomes.add_metric([artifact_type, outcome], count)
+        yield outcomes
+
+        queue = GaugeMetricFamily(
+            "necronet_migration_queue_jobs",
+            "Jobs in the migration queue",
+            labels=["status", "artifact_type"],
+        )
+        for status, by_type in self.queue_counts.items():
+            for artifact_type, count in by_type.items():
+                queue.add_metric([status, artifact_type], count)
+        yield queue
+
+        if self.admission is not None:
+            yield GaugeMetricFamily(
+                "necronet_upload_admission_in_flight",
+                "Uploads admitted and in progress",
+                value=self.admission.in_flight,
+            )
+            yield GaugeMetricFamily(
+                "necronet_upload_admission_in_flight_bytes",
+                "Declared bytes of uploads in progress",
+                value=self.admission.in_flight_bytes,
+            )
+            yield GaugeMetricFamily(
+                "necronet_upload_admission_waiting",
+                "Uploads queued for admission",
+                value=self.admission.waiting,
+            )
+            yield CounterMetricFamily(
+                "necronet_upload_admission_admitted",
+                "Uploads admitted",
+                value=self.admission.admitted,
+            )
+            shed = CounterMetricFamily(
+                "necronet_upload_admission_shed",
+                "Uploads rejected by admission control",
+                labels=["reason"],
+            )
+            for reason, count in self.admission.shed.items():
+                shed.add_metric([reason], count)
+            yield shed
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
+
+
+# --- Tracing ---------------------------------------------------------------
+
+
+def tracing_enabled() -> bool:
+    return trace is not None
+
+
+@contextmanager
+def span(name: str, carrier: Optional[dict] = None, **attributes: Any) -> Iterator[Any]:
+    """Start a span (child of `carrier`'s trace context when given); no-op without OpenTelemetry."""
+    if trace is None:
+        yield None
+        return
+    parent = propagate.extract(carrier) if carrier else None
+    tracer = trace.get_tracer("necronet")
+    clean = {k: v for k, v in attributes.items() if v is not None}
+    with tracer.start_as_current_span(
+        name, context=parent, attributes=clean
+    ) as current:
+        yield current
+
+
+def trace_carrier() -> dict:
+    """W3C trace context of the current span, to stash in a job payload ({} without OpenTelemetry)."""
+    carrier: dict = {}
+    if propagate is not None:
+        propagate.inject(carrier)
+    return carrier
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request through its last body chunk, labelled by route template."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,87 @@
+"""
+Narration audio cache — identical scripts are synthesized once
+Tier 1: in-process LRU of cache key → audio URL
+Tier 2: stored objects whose key is derived from the cache key (survives restarts, shared by workers)
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class NarrationCache:
+    """Two-tier narration cache with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024, prefix: str = "narrations/cache/"):
+        self.max_entries = max(1, max_entries)
+        self.prefix = prefix
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(script: str, voice_id: str, model_id: str, voice_settings: dict) -> str:
+        """Stable hash of everything that affects the synthesized audio."""
+        material = json.dumps(
+            {
+                "script": script,
+                "voice_id": voice_id,
+                "model_id": model_id,
+                "voice_settings": voice_settings,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def object_key(self, cache_key: str) -> str:
+        """Storage key for the cached audio object."""
+        return f"{self.prefix}{cache_key}.mp3"
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """Tier-1 lookup; refreshes LRU position on hit."""
+        with self._lock:
+            url = self._entries.get(cache_key)
+            if url is not None:
+                self._entries.move_to_end(cache_key)
+                self.memory_hits += 1
+            return url
+
+    def put(self, cache_key: str, url: str) -> None:
+        """Remember a URL in tier 1, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[cache_key] = url
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_storage_hit(self) -> None:
+        with self._lock:
+            self.storage_hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.storage_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "storage_hits": self.storage_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (
+                    round((self.memory_hits + self.storage_hits) / lookups, 3)
+                    if lookups
+                    else 0.0
+                ),
+            }
@@ -0,0 +1,8 @@
+"""
+Startup clock — main.py imports this before anything else,
+so the /ready budget covers the time spent importing FastAPI, the SDKs and the services
+"""
+
+import time
+
+IMPORT_STARTED = time.perf_counter()
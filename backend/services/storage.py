@@ -0,0 +1,551 @@
+"""
+Object storage backends — S3 (or compatible) and local disk behind one interface
+Methods block; the API runs them on the "storage" I/O pool. LocalStorage lets the whole
+pipeline run (and be benchmarked) on a single box without cloud credentials.
+"""
+
+import contextlib
+import io
+import mimetypes
+import mmap
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Optional, Protocol
+from urllib.parse import quote
+
+
+class StorageError(Exception):
+    """A storage operation failed."""
+
+
+class ObjectNotFound(StorageError):
+    """No object under that key."""
+
+
+class InvalidRange(StorageError):
+    """The requested byte range starts past the end of the object."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable (object is {size} bytes)")
+        self.size = size
+
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+    etag: Optional[str]
+    content_type: str
+
+
+@dataclass
+class ObjectStream:
+    """An open object, or one byte range of it: read with `body.read(n)`, then close()."""
+
+    body: Any
+    size: int  # bytes this stream will yield
+    total_size: int
+    etag: Optional[str]
+    content_type: str
+    content_range: Optional[str] = None  # "bytes a-b/total" for ranged reads
+    mapped: bool = (
+        False  # body is memory-mapped: read_view(n) gives zero-copy slices, no I/O wait
+    )
+
+    def close(self) -> None:
+        self.body.close()
+
+
+class StorageBackend(Protocol):
+    """Interface every artifact read and write goes through."""
+
+    name: str
+    can_presign: bool
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        content_type: str = "application/octet-stream",
+        cache_control: Optional[str] = None,
+    ) -> None: ...
+
+    def get(self, key: str) -> bytes: ...
+
+    def get_range(self, key: str, start: int, end: int) -> bytes: ...
+
+    def open(self, key: str, byte_range: Optional[str] = None) -> ObjectStream: ...
+
+    def open_seekable(self, key: str, size: int) -> BinaryIO: ...
+
+    def head(self, key: str) -> ObjectInfo: ...
+
+    def exists(self, key: str) -> bool: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def public_url(self, key: str) -> str: ...
+
+    def presign(
+        self, key: str, ttl_seconds: int, cache_control: Optional[str] = None
+    ) -> str: ...
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str: ...
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str: ...
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None: ...
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None: ...
+
+
+RANGE_SPEC_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def resolve_range(byte_range: str, size: int) -> tuple[int, int]:
+    """(start, end) inclusive for a normalized "bytes=a-b" / "bytes=a-" / "bytes=-n" spec.
+
+    Raises InvalidRange when nothing of the object falls inside it.
+    """
+    match = RANGE_SPEC_RE.match(byte_range)
+    if not match:
+        raise ValueError(f"Bad range: {byte_range}")
+    start, end = match.groups()
+    if not start:
+        start_at, end_at = (
+            max(0, size - int(end)),
+            size - 1,
+        )  # suffix range: the last n bytes
+        if int(end) == 0:
+            raise InvalidRange(size)
+    else:
+        start_at = int(start)
+        end_at = min(int(end), size - 1) if end else size - 1
+    if size == 0 or start_at >= size:
+        raise InvalidRange(size)
+    return start_at, end_at
+
+
+class RangeReader(io.RawIOBase):
+    """Seekable read-only file over a stored object using ranged reads with a small read-ahead block."""
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        key: str,
+        size: int,
+        block_size: int = 1024 * 1024,
+    ):
+        self.storage = storage
+        self.key = key
+        self.size = size
+        self.block_size = block_size
+        self._pos = 0
+        self._block_start = 0
+        self._block = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def readinto(self, buffer: Any) -> int:
+        if self._pos >= self.size:
+            return 0
+        wanted = min(len(buffer), self.size - self._pos)
+        offset = self._pos - self._block_start
+        if not (0 <= offset < len(self._block)):
+            # Fetch at least one block so small sequential reads don't each cost a request
+            end = min(self.size, self._pos + max(wanted, self.block_size)) - 1
+            self._block = self.storage.get_range(self.key, self._pos, end)
+            self._block_start = self._pos
+            offset = 0
+        chunk = self._block[offset : offset + wanted]
+        buffer[: len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+
+def _s3_error_code(e: Exception) -> Optional[str]:
+    """botocore ClientError code ("NoSuchKey", "404", "InvalidRange", ...), if any."""
+    return getattr(e, "response", {}).get("Error", {}).get("Code")
+
+
+NOT_FOUND_CODES = ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage:
+    """Objects in one S3 (or S3-compatible) bucket via a boto3 client."""
+
+    name = "s3"
+    can_presign = True
+
+    def __init__(self, client: Any, bucket: str, public_base_url: str):
+        self.client = client
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/")
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        content_type: str = "application/octet-stream",
+        cache_control: Optional[str] = None,
+    ) -> None:
+        extra = {"CacheControl": cache_control} if cache_control else {}
+        self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=data, ContentType=content_type, **extra
+        )
+
+    def get(self, key: str) -> bytes:
+        stream = self.open(key)
+        try:
+            return stream.body.read()
+        finally:
+            stream.close()
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        """Bytes start..end (inclusive); shorter if the object is."""
+        stream = self.open(key, f"bytes={start}-{end}")
+        try:
+            return stream.body.read()
+        finally:
+            stream.close()
+
+    def open(self, key: str, byte_range: Optional[str] = None) -> ObjectStream:
+        """GET the object, or just `byte_range` of it (a normalized single range)."""
+        try:
+            if byte_range:
+                response = self.client.get_object(
+                    Bucket=self.bucket, Key=key, Range=byte_range
+                )
+            else:
+                response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            code = _s3_error_code(e)
+            if code in NOT_FOUND_CODES:
+                raise ObjectNotFound(key) from e
+            if code == "InvalidRange":
+                raise InvalidRange(
+                    int(e.response["Error"].get("ActualObjectSize", 0))
+                ) from e
+            raise
+        content_range = response.get("ContentRange")
+        total = (
+            int(content_range.rsplit("/", 1)[1])
+            if content_range
+            else response["ContentLength"]
+        )
+        return ObjectStream(
+            body=response["Body"],
+            size=response["ContentLength"],
+            total_size=total,
+            etag=response.get("ETag"),
+            content_type=response.get("ContentType") or "application/octet-stream",
+            content_range=content_range,
+        )
+
+    def open_seekable(self, key: str, size: int) -> BinaryIO:
+        return RangeReader(self, key, size)
+
+    def head(self, key: str) -> ObjectInfo:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if _s3_error_code(e) in NOT_FOUND_CODES:
+                raise ObjectNotFound(key) from e
+            raise
+        return ObjectInfo(
+            key,
+            response["ContentLength"],
+            response.get("ETag"),
+            response.get("ContentType") or "application/octet-stream",
+        )
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.head(key)
+            return True
+        except ObjectNotFound:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def public_url(self, key: str) -> str:
+        return f"{self.public_base_url}/{key}"
+
+    def presign(
+        self, key: str, ttl_seconds: int, cache_control: Optional[str] = None
+    ) -> str:
+        """Presigned GET URL (signed locally, no request)."""
+        params = {"Bucket": self.bucket, "Key": key}
+        if cache_control:
+            params["ResponseCacheControl"] = cache_control
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=ttl_seconds
+        )
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        return self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type
+        )["UploadId"]
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return response["ETag"]
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [{"PartNumber": n, "ETag": etag} for n, etag in parts]
+            },
+        )
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self.client.abort_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id
+        )
+
+
+class _MappedReader:
+    """File-like reader over a memory-mapped file; read_view(n) hands out zero-copy slices."""
+
+    def __init__(self, mapped: Optional[mmap.mmap], start: int, end: int):
+        self._mapped = mapped
+        self._view = (
+            memoryview(mapped)[start:end] if mapped is not None else memoryview(b"")
+        )
+        self._pos = 0
+
+    def read_view(self, n: int = -1) -> memoryview:
+        end = len(self._view) if n < 0 else min(len(self._view), self._pos + n)
+        chunk = self._view[self._pos : end]
+        self._pos = end
+        return chunk
+
+    def read(self, n: int = -1) -> bytes:
+        return self.read_view(n).tobytes()
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mapped is not None:
+            try:
+                self._mapped.close()
+            except BufferError:
+                pass  # chunks still queued in a transport; the map goes away when they're freed
+
+
+class LocalStorage:
+    """Objects as files under `root`, keyed by their relative path.
+
+    Writes land in a temp file that is renamed into place, so readers never see
+    a partial object and an overwrite can't tear a read in progress. Reads are
+    memory-mapped; `open()` streams slices of the map without copying.
+    Multipart uploads stage their parts under `root/.multipart/<upload id>/`.
+    Content types are guessed from the key's extension.
+    """
+
+    name = "local"
+    can_presign = False
+
+    def __init__(self, root: str, public_base_url: str, fsync: bool = False):
+        self.root = os.path.abspath(root)
+        self.public_base_url = public_base_url.rstrip("/")
+        self.fsync = fsync
+        self._multipart_root = os.path.join(self.root, ".multipart")
+        os.makedirs(self._multipart_root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Reject ".." outright: normalizing it away would let one key land on another object's path
+        segments = key.replace("\\", "/").split("/")
+        path = posixpath.normpath("/".join(segments).lstrip("/"))
+        if ".." in segments or path in (".", "") or path.startswith(".multipart"):
+            raise StorageError(f"Invalid storage key: {key}")
+        return os.path.join(self.root, *path.split("/"))
+
+    def _upload_dir(self, upload_id: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            raise StorageError(f"Invalid upload id: {upload_id}")
+        return os.path.join(self._multipart_root, upload_id)
+
+    @staticmethod
+    def _etag(st: os.stat_result) -> str:
+        return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+    @staticmethod
+    def _content_type(key: str) -> str:
+        return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+    def _write_atomic(self, path: str, write: Callable[[BinaryIO], None]) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+
+    def _map(self, key: str) -> tuple[Optional[mmap.mmap], os.stat_result]:
+        try:
+            f = open(self._path(key), "rb")
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            raise ObjectNotFound(key) from None
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0:
+                return None, st  # empty files can't be mapped
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), st
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        content_type: str = "application/octet-stream",
+        cache_control: Optional[str] = None,
+    ) -> None:
+        self._write_atomic(self._path(key), lambda f: f.write(data))
+
+    def get(self, key: str) -> bytes:
+        mapped, _ = self._map(key)
+        if mapped is None:
+            return b""
+        with mapped:
+            return mapped[:]
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        """Bytes start..end (inclusive); shorter if the object is."""
+        try:
+            fd = os.open(self._path(key), os.O_RDONLY)
+        except FileNotFoundError:
+            raise ObjectNotFound(key) from None
+        try:
+            return os.pread(fd, end - start + 1, start)
+        finally:
+            os.close(fd)
+
+    def open(self, key: str, byte_range: Optional[str] = None) -> ObjectStream:
+        mapped, st = self._map(key)
+        size = st.st_size
+        start, end, content_range = 0, size - 1, None
+        if byte_range:
+            try:
+                start, end = resolve_range(byte_range, size)
+            except InvalidRange:
+                if mapped is not None:
+                    mapped.close()
+                raise
+            content_range = f"bytes {start}-{end}/{size}"
+        return ObjectStream(
+            body=_MappedReader(mapped, start, end + 1),
+            size=end - start + 1,
+            total_size=size,
+            etag=self._etag(st),
+            content_type=self._content_type(key),
+            content_range=content_range,
+            mapped=True,
+        )
+
+    def open_seekable(self, key: str, size: int) -> BinaryIO:
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(key) from None
+
+    def head(self, key: str) -> ObjectInfo:
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError:
+            raise ObjectNotFound(key) from None
+        return ObjectInfo(key, st.st_size, self._etag(st), self._content_type(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(key))
+
+    def public_url(self, key: str) -> str:
+        return f"{self.public_base_url}/{quote(key)}"
+
+    def presign(
+        self, key: str, ttl_seconds: int, cache_control: Optional[str] = None
+    ) -> str:
+        raise StorageError(
+            "Local storage has no presigned URLs; serve objects through the API"
+        )
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        self._path(key)  # validate before staging anything
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._upload_dir(upload_id))
+        return upload_id
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        with open(
+            os.path.join(self._upload_dir(upload_id), f"{part_number:05d}"), "wb"
+        ) as f:
+            f.write(data)
+        return str(part_number)
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: list[tuple[int, str]]
+    ) -> None:
+        directory = self._upload_dir(upload_id)
+
+        def concatenate(out: BinaryIO) -> None:
+            for part_number, _ in sorted(parts):
+                with open(os.path.join(directory, f"{part_number:05d}"), "rb") as part:
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+
+        self._write_atomic(self._path(key), concatenate)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
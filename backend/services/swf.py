@@ -0,0 +1,219 @@
+"""
+SWF header parsing — stage size, frame rate, frame count and flags from the first few KiB of a .swf
+Compressed movies (CWS = zlib, ZWS = LZMA) are decompressed only as far as the header needs.
+"""
+
+import lzma
+import struct
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+SIGNATURES = {b"FWS": "none", b"CWS": "zlib", b"ZWS": "lzma"}
+HEADER_SIZE = 8  # signature (3) + version (1) + uncompressed file length (4)
+PREFIX_BYTES = (
+    4096  # compressed bytes fetched for parsing; plenty for RECT + the first tags
+)
+DECOMPRESSED_PREFIX = 1024
+
+TAG_END = 0
+TAG_SET_BACKGROUND_COLOR = 9
+TAG_FILE_ATTRIBUTES = 69
+
+
+class SwfError(Exception):
+    """Not a SWF, or the header is corrupt."""
+
+
+class SwfTruncated(SwfError):
+    """The prefix ended before the header did; retry with more bytes."""
+
+
+@dataclass
+class SwfHeader:
+    signature: str
+    compression: str
+    version: int
+    file_length: int  # uncompressed length, including the 8-byte header
+    width: int  # pixels
+    height: int
+    frame_rate: float
+    frame_count: int
+    actionscript3: Optional[bool] = None  # from FileAttributes (SWF 8+)
+    use_network: Optional[bool] = None
+    background_color: Optional[str] = None  # "#rrggbb" from SetBackgroundColor
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def decompress_prefix(data: bytes, limit: int = DECOMPRESSED_PREFIX) -> bytes:
+    """The first `limit` bytes of the movie body (everything after the 8-byte header)."""
+    compression = SIGNATURES.get(data[:3])
+    if compression is None:
+        raise SwfError("Not a SWF file (bad signature)")
+    if compression == "none":
+        return data[HEADER_SIZE : HEADER_SIZE + limit]
+    if compression == "zlib":
+        try:
+            return zlib.decompressobj().decompress(data[HEADER_SIZE:], limit)
+        except zlib.error as e:
+            raise SwfError(f"Corrupt zlib stream: {e}") from e
+
+    # ZWS: compressed length (4) + LZMA properties (5) + raw LZMA1 stream
+    if len(data) < HEADER_SIZE + 9:
+        raise SwfTruncated("LZMA header incomplete")
+    props = data[12]
+    dict_size = struct.unpack_from("<I", data, 13)[0]
+    lc, rest = props % 9, props // 9
+    lp, pb = rest % 5, rest // 5
+    decompressor = lzma.LZMADecompressor(
+        format=lzma.FORMAT_RAW,
+        filters=[
+            {
+                "id": lzma.FILTER_LZMA1,
+                "dict_size": dict_size,
+                "lc": lc,
+                "lp": lp,
+                "pb": pb,
+            }
+        ],
+    )
+    try:
+        return decompressor.decompress(data[17:], limit)
+    except lzma.LZMAError as e:
+        raise SwfError(f"Corrupt LZMA stream: {e}") from e
+
+
+class _BitReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.bit = 0
+
+    def read(self, nbits: int, signed: bool = False) -> int:
+        if (self.bit + nbits + 7) // 8 > len(self.data):
+            raise SwfTruncated("Header RECT incomplete")
+        value = 0
+        for _ in range(nbits):
+            byte = self.data[self.bit // 8]
+            value = (value << 1) | ((byte >> (7 - self.bit % 8)) & 1)
+            self.bit += 1
+        if signed and nbits and value & (1 << (nbits - 1)):
+            value -= 1 << nbits
+        return value
+
+    @property
+    def byte_offset(self) -> int:
+        return (self.bit + 7) // 8
+
+
+def parse_swf_header(prefix: bytes) -> SwfHeader:
+    """Parse the header from the start of a .swf (raw, possibly compressed bytes).
+
+    Raises SwfTruncated if `prefix` is too short, SwfError if it isn't a valid SWF.
+    """
+    if len(prefix) < HEADER_SIZE:
+        raise SwfTruncated("File shorter than the SWF header")
+    signature = prefix[:3]
+    if signature not in SIGNATURES:
+        raise SwfError("Not a SWF file (bad signature)")
+    version = prefix[3]
+    file_length = struct.unpack_from("<I", prefix, 4)[0]
+    body = decompress_prefix(prefix)
+
+    # Frame size RECT in twips: 5-bit field width, then xmin, xmax, ymin, ymax
+    bits = _BitReader(body)
+    nbits = bits.read(5)
+    xmin, xmax, ymin, ymax = (bits.read(nbits, signed=True) for _ in range(4))
+    offset = bits.byte_offset
+    if len(body) < offset + 4:
+        raise SwfTruncated("Frame rate / count missing")
+    rate_fraction, rate_integer, frame_count = struct.unpack_from("<BBH", body, offset)
+    header = SwfHeader(
+        signature=signature.decode("ascii"),
+        compression=SIGNATURES[signature],
+        version=version,
+        file_length=file_length,
+        width=round((xmax - xmin) / 20),
+        height=round((ymax - ymin) / 20),
+        frame_rate=rate_integer + rate_fraction / 256,
+        frame_count=frame_count,
+    )
+    _scan_leading_tags(body, offset + 4, header)
+    return header
+
+
+def _scan_leading_tags(body: bytes, offset: int, header: SwfHeader) -> None:
+    """Pick FileAttributes / SetBackgroundColor out of the first tags that fit in the prefix."""
+    for _ in range(8):
+        if len(body) < offset + 2:
+            return
+        code_and_length = struct.unpack_from("<H", body, offset)[0]
+        code, length = code_and_length >> 6, code_and_length & 0x3F
+        offset += 2
+        if length == 0x3F:
+            if len(body) < offset + 4:
+                return
+            length = struct.unpack_from("<I", body, offset)[0]
+            offset += 4
+        if code == TAG_END or len(body) < offset + length:
+            return
+        if code == TAG_FILE_ATTRIBUTES and length >= 1:
+            flags = body[offset]
+            header.actionscript3 = bool(flags & 0x08)
+            header.use_network = bool(flags & 0x01)
+        elif code == TAG_SET_BACKGROUND_COLOR and length >= 3:
+            header.background_color = "#{:02x}{:02x}{:02x}".format(
+                *body[offset : offset + 3]
+            )
+            return  # the background comes after FileAttributes / Metadata; nothing else needed
+        offset += length
+
+
+class CompressingSwfStream:
+    """Async `read(n)` source turning an uncompressed (FWS) movie into a zlib (CWS) one on the fly.
+
+    The 8-byte header is kept except for the signature; FileLength stays the
+    uncompressed size, as the format requires.
+    """
+
+    def __init__(
+        self,
+        read_chunk: Callable[[], Awaitable[bytes]],
+        level: int = 9,
+        run_sync: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.read_chunk = read_chunk
+        self.run_sync = run_sync
+        self._compressor = zlib.compressobj(level)
+        self._buffer = bytearray()
+        self._header_done = False
+        self._eof = False
+
+    def _compress(self, chunk: bytes) -> bytes:
+        if not chunk:
+            return self._compressor.flush()
+        return self._compressor.compress(chunk)
+
+    async def read(self, n: int = -1) -> bytes:
+        while not self._eof and (n < 0 or len(self._buffer) < n):
+            chunk = await self.read_chunk()
+            if not self._header_done:
+                # Chunks come from the storage reader, always larger than the header
+                if chunk[:3] != b"FWS" or len(chunk) < HEADER_SIZE:
+                    raise SwfError("Only uncompressed (FWS) movies can be recompressed")
+                self._buffer += b"CWS" + chunk[3:HEADER_SIZE]
+                chunk = chunk[HEADER_SIZE:]
+                self._header_done = True
+                if not chunk:
+                    continue
+            self._eof = not chunk
+            self._buffer += (
+                await self.run_sync(self._compress, chunk)
+                if self.run_sync
+                else self._compress(chunk)
+            )
+        size = len(self._buffer) if n < 0 else n
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
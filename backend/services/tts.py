@@ -0,0 +1,211 @@
+"""
+TTS dispatcher — rate-limited, concurrency-capped queue in front of ElevenLabs
+Token bucket + worker pool; identical queued jobs are coalesced; 429 Retry-After pauses the bucket
+"""
+
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+
+class TTSRateLimited(Exception):
+    """The TTS provider answered 429; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Retry-After header → seconds (accepts delta-seconds or an HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Async token bucket; `pause_until` blocks all acquirers (used for Retry-After)."""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = max(rate_per_second, 0.001)
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause_until(self, deadline: float) -> None:
+        self._paused_until = max(self._paused_until, deadline)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class _Pending:
+    __slots__ = ("key", "factory", "future", "submitted", "attempts")
+
+    def __init__(self, key: str, factory: JobFactory, future: asyncio.Future):
+        self.key = key
+        self.factory = factory
+        self.future = future
+        self.submitted = time.perf_counter()
+        self.attempts = 0
+
+
+class TTSDispatcher:
+    """Queue of TTS jobs drained by `max_concurrency` workers under a token bucket.
+
+    `submit(key, factory)` returns the factory's result. Jobs with the same key
+    that are queued or running share one execution. A factory raising
+    TTSRateLimited pauses the whole bucket for Retry-After and is re-queued.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 2.0,
+        burst: int = 4,
+        max_concurrency: int = 2,
+        max_retries: int = 3,
+    ):
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: dict[str, _Pending] = {}
+        self._workers: list[asyncio.Task] = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._started_jobs = 0
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)
+        ]
+        logger.info(
+            f"🎤 TTS dispatcher started ({self.max_concurrency} workers, {self.bucket.rate}/s)"
+        )
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.cancel()
+        self._pending.clear()
+
+    async def submit(self, key: str, factory: JobFactory) -> Any:
+        """Queue a job (or join an identical one) and wait for its result."""
+        if not self._workers:
+            self.start()
+        existing = self._pending.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            return await asyncio.shield(existing.future)
+        pending = _Pending(key, factory, asyncio.get_running_loop().create_future())
+        self._pending[key] = pending
+        self._queue.put_nowait(pending)
+        return await asyncio.shield(pending.future)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "rate_limited": self.rate_limited,
+            "avg_queue_wait_ms": (
+                round(self._total_wait / self._started_jobs * 1000, 2)
+                if self._started_jobs
+                else 0.0
+            ),
+            "max_queue_wait_ms": round(self._max_wait * 1000, 2),
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            pending: _Pending = await self._queue.get()
+            await self.bucket.acquire()
+            if pending.attempts == 0:
+                waited = time.perf_counter() - pending.submitted
+                self._started_jobs += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+            pending.attempts += 1
+            self.in_flight += 1
+            try:
+                result = await pending.factory()
+            except TTSRateLimited as e:
+                self.rate_limited += 1
+                self.bucket.pause_until(time.monotonic() + e.retry_after)
+                if pending.attempts <= self.max_retries:
+                    logger.warning(
+                        f"⚠️ TTS rate limited, retrying in {e.retry_after:.1f}s"
+                    )
+                    self._queue.put_nowait(pending)
+                    continue
+                self._finish(pending, error=e)
+            except asyncio.CancelledError:
+                # cancel (not set_exception) so waiters see CancelledError and nothing is left unretrieved
+                self._pending.pop(pending.key, None)
+                pending.future.cancel()
+                raise
+            except Exception as e:
+                self._finish(pending, error=e)
+            else:
+                self._finish(pending, result=result)
+            finally:
+                self.in_flight -= 1
+
+    def _finish(
+        self,
+        pending: _Pending,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self._pending.pop(pending.key, None)
+        if pending.future.done():
+            return
+        if error is None:
+            self.completed += 1
+            pending.future.set_result(result)
+        else:
+            self.failed += 1
+            pending.future.set_exception(error)
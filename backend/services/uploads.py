@@ -0,0 +1,220 @@
+"""
+Streaming artifact ingest — UploadFile chunks → storage multipart upload
+Never holds more than (max_concurrency + 1) parts of an artifact in memory
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+RunSync = Callable[..., Awaitable[Any]]
+ShouldStore = Callable[[str], Awaitable[bool]]
+
+UNSAFE_FILENAME_CHARS_RE = re.compile(r"[\x00-\x1f\x7f]")
+
+
+class UploadError(Exception):
+    """Base class for ingest errors the API reports to the client."""
+
+
+class EmptyUploadError(UploadError):
+    """The uploaded file contained no bytes."""
+
+
+class UploadTooLargeError(UploadError):
+    """The uploaded file exceeded the configured size limit."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"File exceeds the {limit // (1024 * 1024)} MB upload limit")
+        self.limit = limit
+
+
+@dataclass
+class StreamedUpload:
+    """Outcome of a streamed upload."""
+
+    key: str
+    size: int
+    parts: int
+    sha256: str
+    stored: bool
+    peak_buffered_bytes: int
+    peak_rss_bytes: int
+
+
+class BlockingSource:
+    """Adapts a blocking file object (e.g. an archive member) to the `async read(n)` interface.
+
+    Reads go through `run_sync` when given, otherwise they run inline (fine for in-memory buffers).
+    """
+
+    def __init__(self, raw: Any, run_sync: Optional[RunSync] = None):
+        self.raw = raw
+        self.run_sync = run_sync
+
+    async def read(self, n: int = -1) -> bytes:
+        if self.run_sync is None:
+            return self.raw.read(n)
+        return await self.run_sync(self.raw.read, n)
+
+
+def safe_filename(name: str, default: str = "upload") -> str:
+    """Last path segment of a client-supplied filename, without control characters or leading dots.
+
+    Storage keys are built from it, so "../x" or "a/b" must never become extra path segments.
+    """
+    base = re.split(r"[\\/]", name)[-1]
+    base = UNSAFE_FILENAME_CHARS_RE.sub("", base).strip().lstrip(".")
+    return base or default
+
+
+def peak_rss_bytes() -> int:
+    """Process high-water RSS in bytes (0 where unsupported)."""
+    if resource is None:
+        return 0
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def stream_upload(
+    source: Any,
+    storage: Any,
+    key: str,
+    content_type: str = "application/octet-stream",
+    *,
+    chunk_size: int = 1024 * 1024,
+    part_size: int = 8 * 1024 * 1024,
+    max_concurrency: int = 4,
+    max_bytes: int = 0,
+    run_sync: Optional[RunSync] = None,
+    should_store: Optional[ShouldStore] = None,
+) -> StreamedUpload:
+    """Stream `source` (anything with `async read(n)`) into a storage backend (services.storage).
+
+    Small payloads (< one part) go up as a single put; larger ones use a
+    multipart upload with up to `max_concurrency` parts in flight. Reading the
+    source blocks while all part slots are busy, so memory stays bounded no
+    matter how large the artifact is. Raises EmptyUploadError / UploadTooLargeError
+    without ever materializing the payload.
+
+    The SHA-256 of the payload is computed on the fly. If `should_store` is given
+    it is awaited with the hex digest once the stream ends; returning False skips
+    the put (payloads under one part) or aborts the multipart upload
+    before it is completed, so duplicate content is never committed to storage.
+    """
+    run_sync = run_sync or asyncio.to_thread
+    part_size = max(part_size, S3_MIN_PART_SIZE)
+    slots = asyncio.Semaphore(max(1, max_concurrency))
+
+    buffer = bytearray()
+    digest = hashlib.sha256()
+    size = 0
+    in_flight_bytes = 0
+    peak_buffered = 0
+    upload_id: Optional[str] = None
+    part_tasks: list[asyncio.Task] = []
+
+    async def upload_part(part_number: int, data: bytes) -> tuple[int, str]:
+        nonlocal in_flight_bytes
+        try:
+            return part_number, await run_sync(
+                storage.upload_part, key, upload_id, part_number, data
+            )
+        finally:
+            in_flight_bytes -= len(data)
+            slots.release()
+
+    async def start_part(data: bytes) -> None:
+        nonlocal upload_id, in_flight_bytes, peak_buffered
+        if upload_id is None:
+            upload_id = await run_sync(
+                storage.create_multipart_upload, key, content_type
+            )
+        # Backpressure: wait for a free slot before taking on another part
+        await slots.acquire()
+        in_flight_bytes += len(data)
+        peak_buffered = max(peak_buffered, in_flight_bytes + len(buffer))
+        part_tasks.append(asyncio.create_task(upload_part(len(part_tasks) + 1, data)))
+
+    try:
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            digest.update(chunk)
+            buffer += chunk
+            peak_buffered = max(peak_buffered, in_flight_bytes + len(buffer))
+            while len(buffer) >= part_size:
+                part = bytes(buffer[:part_size])
+                del buffer[:part_size]
+                await start_part(part)
+
+        if size == 0:
+            raise EmptyUploadError("File is empty")
+
+        sha256 = digest.hexdigest()
+        stored = True
+        if should_store is not None and not await should_store(sha256):
+            # Duplicate content: drop what we have instead of committing it
+            stored = False
+            parts = 0
+            for task in part_tasks:
+                task.cancel()
+            await asyncio.gather(*part_tasks, return_exceptions=True)
+            if upload_id is not None:
+                await run_sync(storage.abort_multipart_upload, key, upload_id)
+                upload_id = None
+        elif upload_id is None:
+            await run_sync(storage.put, key, bytes(buffer), content_type)
+            parts = 1
+        else:
+            if buffer:
+                await start_part(bytes(buffer))
+                buffer.clear()
+            completed = await asyncio.gather(*part_tasks)
+            await run_sync(storage.complete_multipart_upload, key, upload_id, completed)
+            parts = len(completed)
+    except BaseException:
+        for task in part_tasks:
+            task.cancel()
+        await asyncio.gather(*part_tasks, return_exceptions=True)
+        if upload_id is not None:
+            try:
+                await run_sync(storage.abort_multipart_upload, key, upload_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not abort multipart upload for {key}: {e}")
+        raise
+
+    result = StreamedUpload(
+        key=key,
+        size=size,
+        parts=parts,
+        sha256=sha256,
+        stored=stored,
+        peak_buffered_bytes=peak_buffered,
+        peak_rss_bytes=peak_rss_bytes(),
+    )
+    if not stored:
+        logger.info(f"♻️ Duplicate content {sha256[:12]}… not stored ({size} bytes)")
+        return result
+    logger.info(
+        f"✅ Streamed {size} bytes to {storage.name} in {parts} part(s): {key} "
+        f"(peak buffer {peak_buffered / 1048576:.1f} MB, process peak RSS {result.peak_rss_bytes / 1048576:.0f} MB)"
+    )
+    return result
@@ -0,0 +1,227 @@
+"""
+Write coalescing for migration progress — artifact status updates and migration_logs rows
+Updates to the same artifact within a short window merge into one write; audit-log rows
+are buffered and inserted in bulk. One flusher runs at a time, so writes land in order.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+FlushUpdates = Callable[[dict[str, dict]], Awaitable[None]]
+FlushLogs = Callable[
+    [list[dict]], Awaitable[Optional[list[dict]]]
+]  # returns rows to hold for a later flush
+
+
+class WriteBatcher:
+    """Coalesces per-artifact updates and buffers log rows, flushed every `window_seconds`.
+
+    `update(..., wait=True)` returns once the artifact's latest state has been
+    written (use it for final states); `wait=False` is fire-and-forget for
+    intermediate progress, which a later update within the window overwrites.
+    A failed flush is retried on the next one: updates merge back under anything
+    newer, log rows are kept up to `max_log_backlog`. `stop()` flushes everything.
+
+    Log rows are best-effort and never hold up updates: rows that fail, or that
+    `flush_logs` hands back to hold (e.g. their artifact isn't in the DB yet),
+    wait `retry_seconds` on their own while updates keep flushing every window.
+    """
+
+    def __init__(
+        self,
+        flush_updates: FlushUpdates,
+        flush_logs: FlushLogs,
+        window_seconds: float = 0.1,
+        max_batch: int = 500,
+        max_log_backlog: int = 10_000,
+        retry_seconds: float = 1.0,
+    ):
+        self.flush_updates = flush_updates
+        self.flush_logs = flush_logs
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.max_log_backlog = max_log_backlog
+        self.retry_seconds = retry_seconds
+        self._updates: dict[str, dict] = {}
+        self._in_flight: dict[str, dict] = {}
+        self._logs: list[dict] = []
+        self._logs_due = 0.0  # monotonic time the log backlog may be retried
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Condition] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.requested = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.logs_written = 0
+        self.logs_dropped = 0
+        self.errors = 0
+
+    def _ensure_primitives(self) -> None:
+        if self._flush_lock is None:
+            self._wakeup, self._full = asyncio.Event(), asyncio.Event()
+            self._flushed, self._flush_lock = asyncio.Condition(), asyncio.Lock()
+
+    def start(self) -> None:
+        self._ensure_primitives()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"📝 Write batcher started ({self.window_seconds * 1000:.0f} ms window)"
+            )
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._updates or self._logs:
+            await self.flush(final=True)
+        if self._updates or self._logs:
+            logger.error(
+                f"❌ {len(self._updates)} artifact updates / {len(self._logs)} log rows not written at shutdown"
+            )
+        else:
+            logger.info("🧹 Write batcher flushed")
+
+    def _signal(self) -> None:
+        self._ensure_primitives()
+        self._wakeup.set()
+        if len(self._updates) >= self.max_batch or (
+            len(self._logs) >= self.max_batch and self._logs_ready()
+        ):
+            self._full.set()
+
+    def _logs_ready(self) -> bool:
+        return time.monotonic() >= self._logs_due
+
+    async def update(self, artifact_id: str, updates: dict, wait: bool = True) -> None:
+        """Merge `updates` into the artifact's pending write; with `wait`, return once it's written."""
+        self.requested += 1
+        pending = self._updates.get(artifact_id)
+        if pending is None:
+            self._updates[artifact_id] = dict(updates)
+        else:
+            pending.update(updates)
+            self.coalesced += 1
+        self._signal()
+        if self._task is None:  # not started (or already stopped): write through
+            await self.flush()
+            return
+        if wait:
+            async with self._flushed:
+                await self._flushed.wait_for(
+                    lambda: artifact_id not in self._updates
+                    and artifact_id not in self._in_flight
+                )
+
+    def log(self, row: dict) -> None:
+        """Buffer an audit-log row for the next bulk insert."""
+        self._logs.append(row)
+        self._signal()
+
+    def pending(self, artifact_id: str) -> Optional[dict]:
+        """Updates not yet written for `artifact_id` (overlay them on reads), or None."""
+        in_flight, queued = self._in_flight.get(artifact_id), self._updates.get(
+            artifact_id
+        )
+        if in_flight is None and queued is None:
+            return None
+        return {**(in_flight or {}), **(queued or {})}
+
+    async def _run(self) -> None:
+        while True:
+            # Held or failed log rows wake the flusher when their backoff ends
+            backoff = (
+                max(0.0, self._logs_due - time.monotonic()) if self._logs else None
+            )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if not await self.flush():
+                await asyncio.sleep(self.retry_seconds)
+
+    async def flush(self, final: bool = False) -> bool:
+        """Write the buffered updates (and log rows, unless backing off); False if the updates failed.
+
+        `final` also tries log rows that are backing off (used by `stop()`).
+        """
+        self._ensure_primitives()
+        async with self._flush_lock:
+            self._wakeup.clear()
+            self._full.clear()
+            batch, self._updates = self._updates, {}
+            logs, self._logs = (
+                (self._logs, []) if final or self._logs_ready() else ([], self._logs)
+            )
+            self._in_flight = batch
+            failed = False
+            try:
+                if batch:
+                    try:
+                        await self.flush_updates(batch)
+                        self.rows_written += len(batch)
+                    except Exception as e:
+                        failed = True
+                        self.errors += 1
+                        logger.error(
+                            f"❌ Flushing {len(batch)} artifact updates failed, will retry: {e}"
+                        )
+                        self._updates = {
+                            artifact_id: {
+                                **batch.get(artifact_id, {}),
+                                **self._updates.get(artifact_id, {}),
+                            }
+                            for artifact_id in {**batch, **self._updates}
+                        }
+                if logs:
+                    try:
+                        held = await self.flush_logs(logs) or []
+                        self.logs_written += len(logs) - len(held)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(
+                            f"❌ Inserting {len(logs)} migration log rows failed, will retry: {e}"
+                        )
+                        held = logs
+                    if held:
+                        self._logs_due = time.monotonic() + self.retry_seconds
+                        self._logs = held + self._logs
+                        overflow = len(self._logs) - self.max_log_backlog
+                        if overflow > 0:
+                            del self._logs[:overflow]
+                            self.logs_dropped += overflow
+            finally:
+                self._in_flight = {}
+                self.flushes += 1
+            if self._updates or (self._logs and self._logs_ready()):
+                self._wakeup.set()
+        async with self._flushed:
+            self._flushed.notify_all()
+        return not failed
+
+    def stats(self) -> dict:
+        return {
+            "pending_updates": len(self._updates),
+            "pending_logs": len(self._logs),
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "logs_written": self.logs_written,
+            "logs_dropped": self.logs_dropped,
+            "errors": self.errors,
+            "window_ms": self.window_seconds * 1000,
+        }
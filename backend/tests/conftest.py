@@ -0,0 +1,32 @@
+"""
+Shared test setup — CI runs `pytest tests/` from backend/, so make `services` importable from here
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def swf_movie(
+    width: int = 550, height: int = 400, frames: int = 24, padding: int = 0
+) -> bytes:
+    """An uncompressed (FWS) SWF 10 movie: FileAttributes (AS3), a background colour, `frames` frames."""
+    nbits = 16
+    bits = f"{nbits:05b}" + "".join(
+        format(v & 0xFFFF, "016b") for v in (0, width * 20, 0, height * 20)
+    )
+    bits += "0" * (-len(bits) % 8)
+    body = int(bits, 2).to_bytes(len(bits) // 8, "big")
+    body += bytes([0, 24]) + frames.to_bytes(2, "little")  # 24.0 fps
+    body += ((69 << 6) | 4).to_bytes(2, "little") + bytes([0x08, 0, 0, 0])
+    body += ((9 << 6) | 3).to_bytes(2, "little") + bytes([0x12, 0x34, 0x56])
+    body += ((1 << 6) | 0).to_bytes(2, "little") * frames  # ShowFrame
+    if padding:
+        body += (
+            ((77 << 6) | 0x3F).to_bytes(2, "little")
+            + padding.to_bytes(4, "little")
+            + bytes(padding)
+        )
+    body += bytes(2)  # End
+    return b"FWS" + bytes([10]) + (8 + len(body)).to_bytes(4, "little") + body
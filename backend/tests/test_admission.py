@@ -0,0 +1,212 @@
+"""
+Upload admission control: size, per-client and global limits, FIFO queueing, client identity
+"""
+
+import asyncio
+
+import pytest
+
+from services.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+)
+
+MB = 1024 * 1024
+
+
+def controller(**kwargs) -> AdmissionController:
+    defaults = dict(
+        max_concurrent=2,
+        max_bytes=100 * MB,
+        client_max_concurrent=2,
+        client_max_bytes=50 * MB,
+        queue_size=2,
+        queue_timeout=0.2,
+        retry_after=1.0,
+    )
+    return AdmissionController(**{**defaults, **kwargs})
+
+
+async def rejection(coro) -> AdmissionRejected:
+    with pytest.raises(AdmissionRejected) as raised:
+        await coro
+    return raised.value
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_refused_from_its_declared_size():
+    admission = controller()
+    error = await rejection(admission.acquire("c", 11 * MB, max_request_bytes=10 * MB))
+    assert (error.status, error.reason) == (413, "too_large")
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_client_concurrency_limit_is_per_client():
+    admission = controller(max_concurrent=10)
+    sizes = [await admission.acquire("greedy", MB) for _ in range(2)]
+    error = await rejection(admission.acquire("greedy", MB))
+    assert (error.status, error.reason, error.retry_after) == (
+        429,
+        "client_concurrency",
+        1.0,
+    )
+    other = await admission.acquire("polite", MB)  # other clients are unaffected
+    for size in sizes:
+        await admission.release("greedy", size)
+    await admission.release("polite", other)
+    assert admission.stats()["clients"] == 0
+
+
+@pytest.mark.asyncio
+async def test_client_byte_limit():
+    admission = controller(max_concurrent=10, client_max_concurrent=10)
+    first = await admission.acquire("c", 40 * MB)
+    error = await rejection(admission.acquire("c", 20 * MB))
+    assert (error.status, error.reason) == (429, "client_bytes")
+    await admission.release("c", first)
+    big = await admission.acquire(
+        "c", 80 * MB
+    )  # alone, an upload over the share is still admitted
+    await admission.release("c", big)
+
+
+@pytest.mark.asyncio
+async def test_unknown_length_is_charged_the_route_cap():
+    admission = controller()
+    charged = await admission.acquire("c", None, max_request_bytes=5 * MB)
+    assert charged == 5 * MB
+    assert admission.in_flight_bytes == 5 * MB
+    await admission.release("c", charged)
+
+
+@pytest.mark.asyncio
+async def test_global_limit_queues_then_times_out():
+    admission = controller(max_concurrent=1, queue_size=1, queue_timeout=0.05)
+    held = await admission.acquire("a", MB)
+    waiter = asyncio.create_task(admission.acquire("b", MB))
+    await asyncio.sleep(0.01)
+    assert admission.waiting == 1
+    error = await rejection(admission.acquire("c", MB))
+    assert (error.status, error.reason) == (503, "queue_full")
+    error = await rejection(waiter)
+    assert (error.status, error.reason) == (503, "queue_timeout")
+    assert admission.waiting == 0
+    await admission.release("a", held)
+    assert (
+        admission.stats()["shed"]["queue_full"]
+        == admission.stats()["shed"]["queue_timeout"]
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_queued_upload_is_admitted_when_capacity_frees():
+    admission = controller(max_concurrent=1, queue_timeout=1.0)
+    held = await admission.acquire("a", MB)
+    waiter = asyncio.create_task(admission.acquire("b", MB))
+    await asyncio.sleep(0.01)
+    await admission.release("a", held)
+    await admission.release("b", await asyncio.wait_for(waiter, 1.0))
+    assert admission.admitted == 2
+
+
+@pytest.mark.asyncio
+async def test_waiting_large_upload_is_not_starved_by_small_ones():
+    admission = controller(
+        max_concurrent=10,
+        max_bytes=100,
+        client_max_concurrent=10,
+        client_max_bytes=10**9,
+        queue_size=10,
+        queue_timeout=2.0,
+    )
+    held = [await admission.acquire(f"h{i}", 30) for i in range(3)]
+    order = []
+
+    async def upload(name: str, size: int) -> None:
+        charged = await admission.acquire(name, size)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        await admission.release(name, charged)
+
+    large = asyncio.create_task(upload("large", 60))
+    await asyncio.sleep(0.01)
+    small = [
+        asyncio.create_task(upload(f"small{i}", 5)) for i in range(3)
+    ]  # each would fit right away
+    await asyncio.sleep(0.01)
+    assert order == []
+    for i, size in enumerate(held):
+        await admission.release(f"h{i}", size)
+    await asyncio.gather(large, *small)
+    assert order == ["large", "small0", "small1", "small2"]
+
+
+@pytest.mark.asyncio
+async def test_migration_backlog_sheds_uploads():
+    async def backlog() -> int:
+        return 50
+
+    admission = controller(max_backlog=50, backlog=backlog)
+    error = await rejection(admission.acquire("c", MB))
+    assert (error.status, error.reason, error.retry_after) == (503, "backlog", 5.0)
+
+
+def client_of(
+    header_value: bytes, trusted_hops: int = 1, peer: str = "10.0.0.1"
+) -> str:
+    middleware = AdmissionMiddleware(
+        None,
+        controller(),
+        {},
+        client_header="X-Forwarded-For",
+        trusted_hops=trusted_hops,
+    )
+    return middleware._client(
+        {"client": (peer, 1234)}, {b"x-forwarded-for": header_value}
+    )
+
+
+def test_client_identity_ignores_hops_the_client_can_spoof():
+    assert client_of(b"6.6.6.6, 203.0.113.9") == "203.0.113.9"
+    assert client_of(b"203.0.113.9") == "203.0.113.9"
+    assert client_of(b"6.6.6.6, 203.0.113.9, 10.0.0.5", trusted_hops=2) == "203.0.113.9"
+    assert (
+        client_of(b"203.0.113.9", trusted_hops=2) == "10.0.0.1"
+    )  # didn't pass both proxies
+    assert client_of(b"") == "10.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_middleware_answers_rejections_without_calling_the_app():
+    called = []
+
+    async def app(scope, receive, send):
+        called.append(scope["path"])
+
+    admission = controller()
+    middleware = AdmissionMiddleware(app, admission, {"/upload": 10})
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"x" * 20, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "path": "/upload",
+        "method": "POST",
+        "headers": [(b"content-length", b"20")],
+        "client": ("127.0.0.1", 1),
+    }
+    await middleware(scope, receive, send)
+    assert sent[0]["status"] == 413 and called == []
+    await middleware({**scope, "path": "/other"}, receive, send)
+    assert called == ["/other"]
+    await middleware({**scope, "headers": [(b"content-length", b"5")]}, receive, send)
+    assert called == ["/other", "/upload"]
+    assert admission.in_flight == 0
@@ -0,0 +1,398 @@
+"""
+API end to end: mock DB, local storage and the migration queue under a temp dir
+"""
+
+import importlib
+import io
+import tarfile
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from conftest import swf_movie
+from PIL import Image
+
+PAGE = b"<html><body><a href='javascript:alert(1)'>x</a><script>steal()</script><p>hello</p></body></html>"
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    data = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as env:
+        for name in (
+            "SUPABASE_URL",
+            "SUPABASE_KEY",
+            "AWS_ACCESS_KEY_ID",
+            "AWS_SECRET_ACCESS_KEY",
+            "ELEVENLABS_API_KEY",
+        ):
+            env.setenv(name, "")
+        env.setenv("STORAGE_BACKEND", "local")
+        env.setenv("LOCAL_STORAGE_PATH", str(data / "objects"))
+        env.setenv("MIGRATION_QUEUE_PATH", str(data / "jobs.db"))
+        env.setenv("ARTIFACT_STORE_PATH", str(data / "artifacts.db"))
+        env.setenv("MAX_UPLOAD_BYTES", str(256 * 1024))
+        env.setenv("DELIVERY_MODE", "proxy")
+        main = importlib.import_module("main")
+        with TestClient(main.app) as test_client:
+            yield test_client
+
+
+def upload(
+    client, name: str, body: bytes, content_type: str = "application/octet-stream"
+) -> dict:
+    response = client.post(
+        "/api/artifacts/upload", files={"file": (name, body, content_type)}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def settled(client, artifact_id: str, timeout: float = 20.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        artifact = client.get(f"/api/artifacts/{artifact_id}").json()
+        if artifact["status"] in ("ready", "failed") or time.monotonic() > deadline:
+            return artifact
+        time.sleep(0.05)
+
+
+def png(width: int = 64, height: int = 48) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_probes(client):
+    assert client.get("/").status_code == 200
+    health = client.get("/health").json()
+    assert health["status"] == "alive" and health["storage"] == "local"
+    ready = client.get("/ready")
+    assert ready.status_code == 200
+    assert ready.json()["ready"] is True and ready.json()["degraded"] == []
+    assert client.get("/health/migrations").status_code == 200
+    assert client.get("/health/tts/queue").json()["in_flight"] == 0
+    assert client.get("/health/tts").json()["tts"] == "not_configured"
+    assert client.get("/metrics").status_code == 200
+
+
+def test_flash_migration_plan(client):
+    plan = client.post(
+        "/api/artifacts/migrate", json={"name": "movie.swf", "artifact_type": "flash"}
+    ).json()
+    assert plan["strategy"] == "ruffle_embed"
+    assert "1. Parse SWF header" in plan["steps"]
+
+
+def test_html_page_is_served_sanitized(client):
+    artifact = settled(
+        client, upload(client, "page.html", PAGE, "text/html")["artifact_id"]
+    )
+    assert artifact["status"] == "ready"
+    sanitized = client.get(
+        f"/api/artifacts/{artifact['artifact_id']}/content",
+        params={"variant": "sanitized"},
+    )
+    assert sanitized.status_code == 200
+    assert b"steal" not in sanitized.content and b"javascript:" not in sanitized.content
+    assert b"<p>hello</p>" in sanitized.content
+    assert "content-disposition" not in sanitized.headers
+    assert sanitized.headers["x-content-type-options"] == "nosniff"
+    assert sanitized.headers["content-security-policy"] == "sandbox"
+
+
+def test_originals_are_only_served_as_downloads(client):
+    page = PAGE + b"<!-- served raw -->"
+    artifact = upload(client, "raw.html", page, "text/html")
+    original = client.get(f"/api/artifacts/{artifact['artifact_id']}/content")
+    assert original.content == page
+    assert original.headers["content-disposition"].startswith("attachment;")
+    assert original.headers["content-security-policy"] == "sandbox"
+
+    stored = client.get(f"/api/storage/{artifact['storage_key']}")
+    assert stored.content == page
+    assert stored.headers["content-security-policy"] == "sandbox"
+
+
+def test_upload_named_like_a_derived_object_cannot_replace_it(client):
+    artifact = upload(
+        client, "sanitized.html", b"<p>not the sanitizer's output</p>", "text/html"
+    )
+    assert artifact["storage_key"].endswith("/original-sanitized.html")
+
+
+def test_ranges_and_revalidation(client):
+    body = bytes(range(256)) * 8
+    artifact = upload(client, "blob.bin", body)
+    content = f"/api/artifacts/{artifact['artifact_id']}/content"
+
+    partial = client.get(content, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == body[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(body)}"
+    assert client.get(content, headers={"Range": "bytes=-5"}).content == body[-5:]
+
+    unsatisfiable = client.get(content, headers={"Range": f"bytes={len(body)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(body)}"
+
+    stale = client.get(
+        content, headers={"Range": "bytes=0-9", "If-Range": '"elsewhere"'}
+    )
+    assert stale.status_code == 200 and stale.content == body
+
+    etag = client.get(content).headers["etag"]
+    assert client.get(content, headers={"If-None-Match": etag}).status_code == 304
+    versioned = client.get(content, params={"v": artifact["content_hash"]})
+    assert "immutable" in versioned.headers["cache-control"]
+
+
+def test_artifact_etag(client):
+    artifact = settled(
+        client, upload(client, "notes.txt", b"plain old text")["artifact_id"]
+    )
+    path = f"/api/artifacts/{artifact['artifact_id']}"
+    first = client.get(path)
+    assert (
+        client.get(path, headers={"If-None-Match": first.headers["etag"]}).status_code
+        == 304
+    )
+
+
+def test_missing_things(client):
+    assert (
+        client.get("/api/artifacts/00000000-0000-0000-0000-000000000000").status_code
+        == 404
+    )
+    artifact = upload(client, "other.txt", b"no derived copies here")
+    content = f"/api/artifacts/{artifact['artifact_id']}/content"
+    assert client.get(content, params={"variant": "sanitized"}).status_code == 404
+    assert client.get(content, params={"mode": "teleport"}).status_code == 400
+    assert (
+        client.get("/api/storage/artifacts/html/nothing/here.html").status_code == 404
+    )
+
+
+@pytest.mark.parametrize(
+    "key", ["artifacts/../../etc/passwd", "artifacts/%2e%2e/secret", ".multipart/x/1"]
+)
+def test_storage_route_rejects_keys_outside_the_store(client, key):
+    assert client.get(f"/api/storage/{key}").status_code in (400, 404)
+
+
+def test_image_variants_are_served_inline(client):
+    artifact = settled(
+        client, upload(client, "pic.png", png(), "image/png")["artifact_id"]
+    )
+    assert artifact["status"] == "ready", artifact["error_message"]
+    variants = artifact["metadata"]["variants"]
+    assert variants
+    name = next(iter(variants))
+    variant = client.get(
+        f"/api/artifacts/{artifact['artifact_id']}/content", params={"variant": name}
+    )
+    assert variant.status_code == 200
+    assert "content-disposition" not in variant.headers
+
+
+def test_flash_movie_is_recompressed_and_described(client):
+    movie = swf_movie(padding=30_000)
+    artifact = settled(
+        client,
+        upload(client, "intro.swf", movie, "application/x-shockwave-flash")[
+            "artifact_id"
+        ],
+    )
+    assert artifact["status"] == "ready", artifact["error_message"]
+    swf = artifact["metadata"]["swf"]
+    assert (swf["width"], swf["height"], swf["frame_count"]) == (550, 400, 24)
+
+    compressed = client.get(
+        f"/api/artifacts/{artifact['artifact_id']}/content",
+        params={"variant": "compressed"},
+    )
+    assert compressed.status_code == 200
+    assert compressed.content[:3] == b"CWS" and len(compressed.content) < len(movie)
+    assert (
+        compressed.headers["content-security-policy"] == "sandbox"
+    )  # movies are scriptable, never inline
+
+
+def test_archive_members_become_child_artifacts(client):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("site/index.html", "<p>archived home page</p>")
+        archive.writestr("site/img/logo.png", png(16, 16))
+        archive.writestr("../escape.txt", "kept out of the tree")
+    artifact = settled(
+        client,
+        upload(client, "site.zip", buffer.getvalue(), "application/zip")["artifact_id"],
+    )
+    assert artifact["status"] == "ready", artifact["error_message"]
+
+    children = [
+        child
+        for child in client.get("/api/artifacts", params={"limit": 200}).json()[
+            "artifacts"
+        ]
+        if child.get("parent_artifact_id") == artifact["artifact_id"]
+    ]
+    assert sorted(child["name"] for child in children) == [
+        "site/img/logo.png",
+        "site/index.html",
+    ]
+    assert all("/members/site/" in child["storage_key"] for child in children)
+
+
+def test_gzipped_tarball_is_streamed_into_children(client):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in (
+            ("docs/readme.txt", b"read me from a tarball"),
+            ("docs/page.html", b"<p>tar page</p>"),
+        ):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    artifact = settled(
+        client,
+        upload(client, "docs.tar.gz", buffer.getvalue(), "application/gzip")[
+            "artifact_id"
+        ],
+    )
+    assert artifact["status"] == "ready", artifact["error_message"]
+    children = [
+        child
+        for child in client.get("/api/artifacts", params={"limit": 200}).json()[
+            "artifacts"
+        ]
+        if child.get("parent_artifact_id") == artifact["artifact_id"]
+    ]
+    assert sorted(child["name"] for child in children) == [
+        "docs/page.html",
+        "docs/readme.txt",
+    ]
+
+
+def test_duplicate_uploads_share_the_first_copy(client):
+    first = upload(client, "same.txt", b"identical bytes")
+    second = upload(client, "again.txt", b"identical bytes")
+    assert second["storage_key"] == first["storage_key"]
+    assert second["metadata"]["duplicate_of"] == first["artifact_id"]
+
+
+def test_copy_of_a_just_finished_upload_sees_its_buffered_status(client):
+    canonical = settled(
+        client, upload(client, "fresh.txt", b"just finished")["artifact_id"]
+    )
+    assert canonical["status"] == "ready"
+    copy = upload(client, "fresh-copy.txt", b"just finished")
+    assert copy["metadata"]["duplicate_of"] == canonical["artifact_id"]
+    assert copy["status"] == "ready"
+
+
+def test_duplicates_reuse_the_canonical_migration_result(client):
+    image = png(96, 64)
+    canonical = settled(
+        client, upload(client, "orig.png", image, "image/png")["artifact_id"]
+    )
+    copy = upload(client, "copy.png", image, "image/png")
+    assert copy["status"] == "ready"
+    assert copy["metadata"]["variants"] == canonical["metadata"]["variants"]
+    variant = client.get(
+        f"/api/artifacts/{copy['artifact_id']}/content",
+        params={"variant": next(iter(copy["metadata"]["variants"]))},
+    )
+    assert variant.status_code == 200
+
+    # Uploaded together, the copy's job waits for the canonical's migration and then follows it
+    movie = swf_movie(padding=1000)
+    batch = client.post(
+        "/api/artifacts/batch",
+        files=[
+            ("files", ("a.swf", movie, "application/x-shockwave-flash")),
+            ("files", ("b.swf", movie, "application/x-shockwave-flash")),
+        ],
+    ).json()
+    first, second = (
+        settled(client, result["artifact"]["artifact_id"])
+        for result in batch["results"]
+    )
+    assert second["metadata"]["duplicate_of"] == first["artifact_id"]
+    assert second["metadata"]["swf"] == first["metadata"]["swf"]
+    compressed = client.get(
+        f"/api/artifacts/{second['artifact_id']}/content",
+        params={"variant": "compressed"},
+    )
+    assert compressed.status_code == 200 and compressed.content[:3] == b"CWS"
+
+
+def test_batch_reports_each_file(client):
+    response = client.post(
+        "/api/artifacts/batch",
+        files=[
+            ("files", ("one.txt", b"first of the batch", "text/plain")),
+            ("files", ("two.txt", b"second of the batch", "text/plain")),
+            ("files", ("copy.txt", b"first of the batch", "text/plain")),
+        ],
+    )
+    assert response.status_code == 200
+    batch = response.json()
+    assert (batch["total"], batch["succeeded"], batch["failed"]) == (3, 3, 0)
+    one, _, copy = (result["artifact"] for result in batch["results"])
+    assert copy["storage_key"] == one["storage_key"]
+
+
+def test_oversized_upload_is_refused(client):
+    response = client.post(
+        "/api/artifacts/upload", files={"file": ("big.bin", b"x" * (512 * 1024))}
+    )
+    assert response.status_code == 413
+
+
+def test_listing_pages_by_cursor(client):
+    for i in range(3):
+        upload(client, f"page{i}.txt", f"listing {i}".encode())
+    first = client.get("/api/artifacts", params={"limit": 2})
+    assert first.status_code == 200
+    page = first.json()
+    assert len(page["artifacts"]) == 2 and page["next_cursor"]
+    assert (
+        client.get(
+            "/api/artifacts",
+            params={"limit": 2},
+            headers={"If-None-Match": first.headers["etag"]},
+        ).status_code
+        == 304
+    )
+
+    rest = client.get(
+        "/api/artifacts", params={"limit": 200, "cursor": page["next_cursor"]}
+    ).json()["artifacts"]
+    seen = [a["artifact_id"] for a in page["artifacts"] + rest]
+    assert len(seen) == len(set(seen))
+    assert {a["artifact_id"] for a in page["artifacts"]}.isdisjoint(
+        a["artifact_id"] for a in rest
+    )
+
+    others = client.get("/api/artifacts", params={"artifact_type": "other"}).json()
+    assert others["artifacts"] and all(
+        a["artifact_type"] == "other" for a in others["artifacts"]
+    )
+    assert (
+        client.get("/api/artifacts", params={"cursor": "not-a-cursor"}).status_code
+        == 400
+    )
+
+
+def test_events_for_a_settled_artifact_end_after_the_snapshot(client):
+    artifact = settled(
+        client, upload(client, "done.txt", b"done and dusted")["artifact_id"]
+    )
+    with client.stream(
+        "GET", f"/api/artifacts/{artifact['artifact_id']}/events"
+    ) as events:
+        body = events.read().decode()
+    assert body.startswith("event: snapshot\n")
+    assert artifact["artifact_id"] in body
@@ -0,0 +1,27 @@
+"""
+Local artifact store: eviction only ever drops rows a remote (Supabase) copy already holds
+"""
+
+from services.artifact_store import ArtifactStore
+
+
+def row(i: int) -> dict:
+    return {"artifact_id": f"a{i:03d}", "created_at": f"2024-01-01T00:00:{i:02d}"}
+
+
+def test_mock_mode_store_never_evicts(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts.db"), max_rows=10, remote=False)
+    store.put_many([row(i) for i in range(25)])
+    assert store.count() == 25
+    assert store.get("a000") is not None
+    assert store.stats()["evicted"] == 0
+
+
+def test_eviction_drops_oldest_synced_rows_and_keeps_dirty_ones(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts.db"), max_rows=10)
+    store.put_many([row(i) for i in range(5)], dirty=True)
+    store.put_many([row(i) for i in range(5, 20)])
+    assert store.count() == 9
+    assert store.pending_count() == 5
+    assert all(store.get(f"a{i:03d}") for i in range(5))
+    assert store.get("a005") is None and store.get("a019") is not None
@@ -0,0 +1,103 @@
+"""
+Lazy clients and the warm-up readiness gate, including a degradable DB
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.clients import LazyClient, Readiness
+
+
+def test_lazy_client_builds_once_and_reports_failures():
+    builds = []
+    client = LazyClient("db", lambda: builds.append(1) or SimpleNamespace(rows=3))
+    assert client and not client.built and client.stats()["status"] == "pending"
+    assert (
+        client.rows == 3 and client.rows == 3
+    )  # attribute access goes to the built client
+    assert builds == [1] and client.stats()["status"] == "connected"
+
+    def broken():
+        raise ConnectionError("no route to host")
+
+    failed = LazyClient("s3", broken)
+    with pytest.raises(ConnectionError):
+        failed.get()
+    assert not failed and failed.stats()["status"] == "failed"
+    with pytest.raises(ConnectionError):
+        failed.get()
+
+    unconfigured = LazyClient("tts", None)
+    assert not unconfigured and unconfigured.stats()["status"] == "not_configured"
+    with pytest.raises(RuntimeError):
+        unconfigured.get()
+
+
+@pytest.mark.asyncio
+async def test_ready_once_every_required_component_warmed():
+    readiness = Readiness(required={"db", "storage"})
+
+    async def warm(state):
+        return state
+
+    await readiness.warm("db", lambda: warm("connected"))
+    assert not readiness.ready
+    await readiness.warm("storage", lambda: warm("local"))
+    assert readiness.ready and readiness.ready_at is not None
+    assert readiness.snapshot()["storage"]["state"] == "local"
+
+
+@pytest.mark.asyncio
+async def test_failed_optional_component_gets_one_try():
+    readiness = Readiness(required=set())
+
+    async def broken():
+        raise TimeoutError("voice lookup timed out")
+
+    await readiness.warm("tts", broken)
+    assert readiness.snapshot()["tts"]["state"] == "unavailable"
+    assert readiness.snapshot()["tts"]["attempts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_degradable_component_stops_gating_after_its_first_failure():
+    readiness = Readiness(
+        required={"db", "storage"}, degradable=frozenset({"db"}), retry_initial=0.01
+    )
+    attempts = []
+
+    async def flaky_db():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("db down")
+        return "connected"
+
+    async def storage():
+        return "local"
+
+    await readiness.warm("storage", storage)
+    warming = asyncio.create_task(readiness.warm("db", flaky_db))
+    await asyncio.wait_for(readiness.wait_attempt("db"), 1.0)
+    assert readiness.ready and readiness.degraded == ["db"]
+
+    await asyncio.wait_for(readiness.wait("db"), 1.0)
+    await warming
+    assert readiness.degraded == [] and readiness.snapshot()["db"]["attempts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_required_component_without_a_fallback_keeps_gating():
+    readiness = Readiness(required={"storage"}, retry_initial=0.01)
+
+    async def broken():
+        raise ConnectionError("bucket unreachable")
+
+    warming = asyncio.create_task(readiness.warm("storage", broken))
+    await asyncio.wait_for(readiness.wait_attempt("storage"), 1.0)
+    assert not readiness.ready
+    assert readiness.snapshot()["storage"]["state"] == "retrying"
+    warming.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await warming
@@ -0,0 +1,44 @@
+"""
+Content delivery helpers: Range header normalization and the presigned URL cache
+"""
+
+import pytest
+
+from services.delivery import PresignedUrlCache, normalize_range
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", "bytes=0-99"),
+        ("BYTES = 10 - ", "bytes=10-"),
+        ("bytes=-500", "bytes=-500"),
+        (None, None),
+        ("", None),
+        ("bytes=-", None),
+        ("bytes=10-5", None),
+        ("bytes=0-1,5-6", None),  # multi-range: serve the whole object
+        ("items=0-1", None),
+        ("bytes=abc-", None),
+    ],
+)
+def test_normalize_range(header, expected):
+    assert normalize_range(header) == expected
+
+
+def test_presigned_urls_are_reused_until_near_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.delivery.time.time", lambda: now[0])
+    signed = []
+
+    def sign(key, ttl, cache_control):
+        signed.append(key)
+        return f"https://bucket/{key}?sig={len(signed)}"
+
+    cache = PresignedUrlCache(sign, ttl_seconds=600, refresh_margin=100)
+    first, fresh_for = cache.get("a", None)
+    assert cache.get("a", None)[0] == first
+    assert fresh_for <= 600
+    now[0] += 550  # inside the refresh margin: sign again
+    assert cache.get("a", None)[0] != first
+    assert signed == ["a", "a"]
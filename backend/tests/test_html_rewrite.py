@@ -0,0 +1,245 @@
+"""
+Sanitizer: script / handler / URL-scheme removal, CSS scrubbing, comments and chunked input
+"""
+
+import pytest
+
+from services.html_rewrite import (
+    MAX_PENDING_CHARS,
+    HTMLRewriter,
+    RewriteStream,
+    is_unsafe_css,
+    is_unsafe_url,
+    normalize_css,
+    resolve_member_path,
+    sniff_charset,
+)
+
+
+def rewrite(document: str, chunk_size: int = 0, resolve=None) -> tuple[str, dict]:
+    rewriter = HTMLRewriter(resolve)
+    if chunk_size:
+        out = "".join(
+            rewriter.feed(document[i : i + chunk_size])
+            for i in range(0, len(document), chunk_size)
+        )
+    else:
+        out = rewriter.feed(document)
+    return out + rewriter.close(), rewriter.stats
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "javascript:alert(1)",
+        "JavaScript:alert(1)",
+        "  javascript:alert(1)",
+        "\x01\x10javascript:alert(1)",
+        "java\tscript:alert(1)",
+        "java\nscr\ript:alert(1)",
+        "jav&#x09;ascript:alert(1)",
+        "&#106;avascript:alert(1)",
+        "&#x6A;&#x61;vascript:alert(1)",
+        "vbscript:msgbox(1)",
+        "livescript:x",
+    ],
+)
+def test_unsafe_url_schemes_are_detected_however_obfuscated(url):
+    assert is_unsafe_url(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["https://example.com/", "img/a.gif", "/javascript/app.js", "mailto:x@y", "#top"],
+)
+def test_ordinary_urls_are_safe(url):
+    assert not is_unsafe_url(url)
+
+
+@pytest.mark.parametrize(
+    "attribute",
+    [
+        "href='javascript:alert(1)'",
+        "href='jav&#x09;ascript:alert(1)'",
+        "href='&#x20;javascript:alert(1)'",
+        'href="java&#10;script:alert(1)"',
+    ],
+)
+def test_obfuscated_javascript_links_are_stripped(attribute):
+    out, stats = rewrite(f"<a {attribute}>x</a>")
+    assert "script:" not in out.lower()
+    assert out == "<a>x</a>"
+    assert stats["unsafe_urls_removed"] == 1
+
+
+def test_scripts_and_event_handlers_are_removed():
+    out, stats = rewrite(
+        "<p onclick='evil()' class=x>hi<script>alert(1)</script></p><noscript><b>no js</b></noscript>"
+    )
+    assert out == '<p class="x">hi</p><b>no js</b>'
+    assert stats["scripts_removed"] == 1
+    assert stats["handlers_removed"] == 1
+
+
+@pytest.mark.parametrize(
+    "css",
+    [
+        "width: expression(alert(1))",
+        "width: expr/**/ession(alert(1))",
+        "width: \\65 xpression(alert(1))",
+        "behavior: url(x.htc)",
+        "-moz-binding: url(x.xml#y)",
+        "background: url('javascript:alert(1)')",
+        "background: url(java\\73 cript:alert(1))",
+    ],
+)
+def test_unsafe_css_is_detected_after_normalization(css):
+    assert is_unsafe_css(css)
+
+
+def test_normalize_css_decodes_escapes_and_drops_comments():
+    assert normalize_css('a/* x */b\\41 \\"') == 'abA"'
+
+
+def test_unsafe_inline_style_is_dropped():
+    out, stats = rewrite("<div style='width: e\\78pression(alert(1))' id=a>x</div>")
+    assert out == '<div id="a">x</div>'
+    assert stats["unsafe_urls_removed"] == 1
+
+
+def test_unsafe_style_block_is_neutralized():
+    out, stats = rewrite(
+        "<style>p { width: ex/**/pression(alert(1)); color: red }</style>"
+    )
+    assert "expression" not in out.lower()
+    assert "color: red" in out
+    assert out.startswith("<style>") and out.endswith("</style>")
+    assert stats["unsafe_urls_removed"] == 1
+
+
+def test_escaped_angle_bracket_cannot_close_a_neutralized_style_block():
+    out, _ = rewrite(
+        "<style>a { behavior: url(x) } \\3c /style><script>alert(1)</script></style>"
+    )
+    assert "</style><script>" not in out
+    assert out.count("</style>") == 1
+
+
+def test_safe_style_block_urls_are_rewritten():
+    out, stats = rewrite(
+        "<style>body { background: url('img/bg.gif') }</style>",
+        resolve=lambda url: "/s/" + url,
+    )
+    assert out == "<style>body { background: url('/s/img/bg.gif') }</style>"
+    assert stats["urls_rewritten"] == 1
+
+
+@pytest.mark.parametrize("root", ["svg", "math"])
+def test_style_inside_foreign_content_cannot_carry_markup(root):
+    out, _ = rewrite(f"<{root}><style><img src=x onerror=alert(1)></style></{root}>")
+    assert out == f"<{root}><style>\\3c img src=x onerror=alert(1)></style></{root}>"
+
+
+def test_legacy_comment_wrapped_style_block_keeps_its_rules():
+    out, _ = rewrite("<style><!--\nbody { color: red }\n--></style>")
+    assert out == "<style>\nbody { color: red }\n</style>"
+
+
+def test_comments_are_kept_but_conditional_comments_are_dropped():
+    out, _ = rewrite(
+        "<!-- note --><!--[if IE]><script>alert(1)</script><![endif]--><p>x</p>"
+    )
+    assert out == "<!-- note --><p>x</p>"
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "<!-- x --!><img src=x onerror=alert(1)> -->",
+        "<!--><img src=x onerror=alert(1)>-->",
+        "<!---><img src=x onerror=alert(1)>-->",
+        "<!-- <p> -->",
+    ],
+)
+def test_comments_a_browser_would_end_early_are_dropped(document):
+    out, _ = rewrite(document + "<p>x</p>")
+    assert out == "<p>x</p>"
+
+
+def test_cdata_is_only_kept_as_text_inside_foreign_content():
+    payload = "<![CDATA[ ><img src=x onerror=alert(1)> ]]>"
+    out, _ = rewrite(payload + "<svg><text>" + payload + "</text></svg>")
+    assert out == "<svg><text> &gt;&lt;img src=x onerror=alert(1)&gt; </text></svg>"
+
+
+def test_oversized_comment_is_discarded_without_buffering_it():
+    rewriter = HTMLRewriter()
+    out = rewriter.feed("<p>a</p><!--")
+    for _ in range(50):
+        out += rewriter.feed("x" * 8192)
+        assert len(rewriter.rawdata) <= MAX_PENDING_CHARS + 8192
+    out += rewriter.feed("--><p>b</p>") + rewriter.close()
+    assert out == "<p>a</p><p>b</p>"
+
+
+def test_dropped_script_body_is_not_buffered_to_its_close_tag():
+    rewriter = HTMLRewriter()
+    out = rewriter.feed("<p>a</p><script>")
+    for _ in range(50):
+        out += rewriter.feed("var x = 1;" * 1000)
+        assert len(rewriter.rawdata) <= MAX_PENDING_CHARS + 10_000
+    out += rewriter.feed("</scr") + rewriter.feed("ipt><p>b</p>") + rewriter.close()
+    assert out == "<p>a</p><p>b</p>"
+
+
+def test_chunked_input_matches_whole_input():
+    document = (
+        "<html><head><style>a { background: url(x.gif) }</style></head>"
+        "<body><a href='jav&#x09;ascript:x' title=t>l</a><img src=a.gif srcset='a.gif 1x, b.gif 2x'></body></html>"
+    )
+    whole, _ = rewrite(document, resolve=lambda url: "/r/" + url)
+    for size in (1, 3, 7, 64):
+        assert (
+            rewrite(document, chunk_size=size, resolve=lambda url: "/r/" + url)[0]
+            == whole
+        )
+
+
+def test_base_and_srcdoc_are_removed_and_charset_is_utf8():
+    out, _ = rewrite(
+        "<meta charset=windows-1252><base href='http://evil/'><iframe srcdoc='<script>x</script>'>"
+    )
+    assert out == '<meta charset="utf-8"><iframe>'
+
+
+def test_resolve_member_path():
+    assert resolve_member_path("site/index.html", "img/a.gif?v=1#f") == (
+        "site/img/a.gif",
+        "?v=1#f",
+    )
+    assert resolve_member_path("site/index.html", "/top.css") == ("top.css", "")
+    assert resolve_member_path("site/index.html", "../../etc/passwd") is None
+    assert resolve_member_path("site/index.html", "https://example.com/a.gif") is None
+
+
+def test_sniff_charset():
+    assert sniff_charset(b'<meta charset="windows-1252">') == "cp1252"
+    assert sniff_charset(b"\xef\xbb\xbf<p>") == "utf-8-sig"
+    assert sniff_charset(b"<p>no meta</p>") == "utf-8"
+
+
+@pytest.mark.asyncio
+async def test_rewrite_stream_decodes_and_reencodes_as_utf8():
+    chunks = [
+        b'<meta charset="windows-1252"><p>caf\xe9</p>',
+        b"<script>x</script>",
+        b"",
+    ]
+
+    async def read_chunk() -> bytes:
+        return chunks.pop(0)
+
+    stream = RewriteStream(read_chunk, HTMLRewriter())
+    body = await stream.read()
+    assert body.decode("utf-8") == '<meta charset="utf-8"><p>café</p>'
+    assert stream.charset == "cp1252"
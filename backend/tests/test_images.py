@@ -0,0 +1,78 @@
+"""
+Image variants: sizes, alpha, animation, EXIF handling and undecodable input
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from services.images import ImageDecodeError, process_image, supported_formats
+
+FORMATS = supported_formats(["webp"])
+pytestmark = pytest.mark.skipif(not FORMATS, reason="Pillow built without WebP")
+
+
+def encoded(image: Image.Image, fmt: str = "PNG", **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def test_variants_are_only_ever_downscaled():
+    result = process_image(
+        encoded(Image.new("RGB", (400, 200))), [160, 320, 640], FORMATS, 80, 10_000_000
+    )
+    sizes = {
+        variant.name: (variant.width, variant.height) for variant in result.variants
+    }
+    assert sizes == {
+        "full.webp": (400, 200),
+        "w160.webp": (160, 80),
+        "w320.webp": (320, 160),
+    }
+    assert all(variant.content_type == "image/webp" for variant in result.variants)
+    assert result.metadata["format"] == "PNG" and result.metadata["animated"] is False
+
+
+def test_alpha_is_kept():
+    result = process_image(
+        encoded(Image.new("RGBA", (32, 32), (0, 0, 0, 0))), [], FORMATS, 80, 10_000_000
+    )
+    assert Image.open(io.BytesIO(result.variants[0].data)).mode == "RGBA"
+
+
+def test_exif_goes_to_metadata_not_variants():
+    exif = Image.Exif()
+    exif[0x010F] = "Haunted Camera Co."  # Make
+    exif[0x0112] = 6  # Orientation: rotate 90° CW
+    result = process_image(
+        encoded(Image.new("RGB", (40, 20)), "JPEG", exif=exif),
+        [],
+        FORMATS,
+        80,
+        10_000_000,
+    )
+    assert result.metadata["exif"]["Make"] == "Haunted Camera Co."
+    full = result.variants[0]
+    assert (full.width, full.height) == (20, 40)
+    assert "exif" not in Image.open(io.BytesIO(full.data)).info
+
+
+def test_animation_survives_in_the_full_size_variant():
+    frames = [Image.new("RGB", (24, 24), color) for color in ("red", "green", "blue")]
+    gif = encoded(
+        frames[0], "GIF", save_all=True, append_images=frames[1:], duration=80, loop=0
+    )
+    result = process_image(gif, [12], FORMATS, 80, 10_000_000)
+    assert result.metadata["animated"] and result.metadata["frames"] == 3
+    full = next(variant for variant in result.variants if variant.name == "full.webp")
+    assert getattr(Image.open(io.BytesIO(full.data)), "n_frames", 1) == 3
+
+
+@pytest.mark.parametrize(
+    "data", [b"definitely not an image", encoded(Image.new("RGB", (200, 200)))]
+)
+def test_undecodable_or_oversized_input_is_refused(data):
+    with pytest.raises(ImageDecodeError):
+        process_image(data, [], FORMATS, 80, 1000)
@@ -0,0 +1,73 @@
+"""
+Durable job queue: claiming, retries, orphan recovery and pruning of finished jobs
+"""
+
+import time
+
+import pytest
+
+from services.jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(
+        str(tmp_path / "jobs.db"), lease_seconds=60, max_attempts=2, backoff_base=0
+    )
+
+
+def test_jobs_are_claimed_once_per_type(queue):
+    queue.enqueue_many(
+        [("a", "a.swf", "flash", None), ("b", "b.png", "image", {"k": 1})]
+    )
+    job = queue.claim("image", "worker-1")
+    assert (job.artifact_id, job.payload, job.attempts) == ("b", {"k": 1}, 1)
+    assert queue.claim("image", "worker-2") is None
+    assert queue.stats() == {"queued": {"flash": 1}, "running": {"image": 1}}
+
+
+def test_failures_retry_until_attempts_run_out(queue):
+    queue.enqueue("a", "a.swf", "flash")
+    assert queue.fail(queue.claim("flash", "w"), "boom") is True
+    assert queue.fail(queue.claim("flash", "w"), "boom again") is False
+    assert queue.stats() == {"dead": {"flash": 1}}
+
+
+def test_expired_leases_are_requeued(queue):
+    queue.lease_seconds = -1
+    queue.enqueue("a", "a.swf", "flash")
+    queue.claim("flash", "gone")
+    recovered, dead = queue.recover_orphans()
+    assert (recovered, dead) == (1, [])
+    assert queue.claim("flash", "w").artifact_id == "a"
+
+
+def test_only_old_finished_jobs_are_pruned(queue, monkeypatch):
+    for artifact_id in ("old", "dead", "recent"):
+        queue.enqueue(artifact_id, f"{artifact_id}.swf", "flash")
+    queue.complete(queue.claim("flash", "w").id)
+    queue.fail(queue.claim("flash", "w"), "permanent", retryable=False)
+
+    queue.retention_seconds = 3600
+    later = time.time() + 7200
+    monkeypatch.setattr("services.jobs.time.time", lambda: later)
+    queue.complete(queue.claim("flash", "w").id)
+
+    assert queue.prune_finished() == 1
+    assert queue.prune_finished() == 0
+    assert queue.stats() == {"dead": {"flash": 1}}
+    with queue._tx() as conn:
+        remaining = {
+            row[0] for row in conn.execute("SELECT artifact_id FROM migration_jobs")
+        }
+    assert remaining == {"dead", "recent"}
+
+
+def test_pruning_works_in_batches(queue, monkeypatch):
+    monkeypatch.setattr("services.jobs.PRUNE_BATCH", 3)
+    queue.retention_seconds = 0
+    queue.enqueue_many([(str(i), f"{i}.png", "image", None) for i in range(7)])
+    for _ in range(7):
+        queue.complete(queue.claim("image", "w").id)
+    time.sleep(0.01)
+    assert queue.prune_finished() == 7
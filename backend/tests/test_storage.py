@@ -0,0 +1,137 @@
+"""
+Local storage backend: key validation, atomic writes, ranged reads and multipart uploads
+"""
+
+import os
+
+import pytest
+
+from services.storage import (
+    InvalidRange,
+    LocalStorage,
+    ObjectNotFound,
+    StorageError,
+    resolve_range,
+)
+from services.uploads import safe_filename
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path / "objects"), "http://testserver/api/storage")
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        "artifacts/html/a/../../other/b/victim.bin",
+        "../outside.txt",
+        "..",
+        "a/..",
+        "a\\..\\b",
+        ".multipart/0123/part",
+        "",
+        ".",
+    ],
+)
+def test_keys_that_could_escape_their_prefix_are_rejected(storage, key):
+    with pytest.raises(StorageError):
+        storage.put(key, b"x")
+
+
+def test_rejected_key_leaves_the_target_untouched(storage):
+    storage.put("artifacts/other/victim/victim.bin", b"VICTIM")
+    with pytest.raises(StorageError):
+        storage.put("artifacts/other/attacker/../victim/victim.bin", b"EVIL")
+    assert storage.get("artifacts/other/victim/victim.bin") == b"VICTIM"
+
+
+def test_plain_keys_stay_under_the_root(storage, tmp_path):
+    storage.put("/artifacts/html/id/page.html", b"<p>x</p>", "text/html")
+    assert os.path.isfile(
+        tmp_path / "objects" / "artifacts" / "html" / "id" / "page.html"
+    )
+    assert storage.get("artifacts/html/id/page.html") == b"<p>x</p>"
+    assert storage.head("artifacts/html/id/page.html").content_type == "text/html"
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("page.html", "page.html"),
+        ("../../other/id/victim.bin", "victim.bin"),
+        ("C:\\Users\\me\\site.zip", "site.zip"),
+        ("..", "upload"),
+        ("...", "upload"),
+        (".htaccess", "htaccess"),
+        ("bad\x00name\n.txt", "badname.txt"),
+        ("dir/", "upload"),
+    ],
+)
+def test_safe_filename(name, expected):
+    assert safe_filename(name) == expected
+
+
+@pytest.mark.parametrize(
+    "spec, size, expected",
+    [
+        ("bytes=0-99", 1000, (0, 99)),
+        ("bytes=500-", 1000, (500, 999)),
+        ("bytes=-100", 1000, (900, 999)),
+        ("bytes=-5000", 1000, (0, 999)),
+        ("bytes=900-5000", 1000, (900, 999)),
+        ("bytes=999-999", 1000, (999, 999)),
+    ],
+)
+def test_resolve_range(spec, size, expected):
+    assert resolve_range(spec, size) == expected
+
+
+@pytest.mark.parametrize(
+    "spec, size", [("bytes=1000-", 1000), ("bytes=-0", 1000), ("bytes=0-", 0)]
+)
+def test_unsatisfiable_ranges_raise(spec, size):
+    with pytest.raises(InvalidRange) as raised:
+        resolve_range(spec, size)
+    assert raised.value.size == size
+
+
+def test_malformed_range_spec_is_a_value_error():
+    with pytest.raises(ValueError):
+        resolve_range("items=0-1", 10)
+
+
+def test_open_serves_byte_ranges(storage):
+    storage.put("a/data.bin", bytes(range(100)))
+    stream = storage.open("a/data.bin", "bytes=10-19")
+    try:
+        assert stream.body.read() == bytes(range(10, 20))
+        assert stream.content_range == "bytes 10-19/100"
+        assert (stream.size, stream.total_size) == (10, 100)
+    finally:
+        stream.close()
+    with pytest.raises(InvalidRange):
+        storage.open("a/data.bin", "bytes=100-")
+
+
+def test_missing_objects(storage):
+    with pytest.raises(ObjectNotFound):
+        storage.open("nope/missing.bin")
+    assert not storage.exists("nope/missing.bin")
+    storage.delete("nope/missing.bin")  # no error
+
+
+def test_multipart_upload_concatenates_parts(storage):
+    upload_id = storage.create_multipart_upload(
+        "big/file.bin", "application/octet-stream"
+    )
+    etags = [
+        storage.upload_part("big/file.bin", upload_id, n, bytes([n]) * 3)
+        for n in (1, 2)
+    ]
+    storage.complete_multipart_upload(
+        "big/file.bin", upload_id, list(zip((1, 2), etags))
+    )
+    assert storage.get("big/file.bin") == b"\x01\x01\x01\x02\x02\x02"
+    with pytest.raises(StorageError):
+        storage.upload_part("big/file.bin", "../../etc", 1, b"x")
@@ -0,0 +1,90 @@
+"""
+SWF header parsing across compressions, and on-the-fly FWS → CWS recompression
+"""
+
+import lzma
+import struct
+import zlib
+
+import pytest
+from conftest import swf_movie
+
+from services.swf import CompressingSwfStream, SwfError, SwfTruncated, parse_swf_header
+
+
+def cws(movie: bytes) -> bytes:
+    return b"CWS" + movie[3:8] + zlib.compress(movie[8:])
+
+
+def zws(movie: bytes) -> bytes:
+    filters = [
+        {"id": lzma.FILTER_LZMA1, "dict_size": 1 << 16, "lc": 3, "lp": 0, "pb": 2}
+    ]
+    body = lzma.compress(movie[8:], format=lzma.FORMAT_RAW, filters=filters)
+    props = (2 * 5 + 0) * 9 + 3
+    return (
+        b"ZWS"
+        + movie[3:8]
+        + struct.pack("<I", len(body))
+        + bytes([props])
+        + struct.pack("<I", 1 << 16)
+        + body
+    )
+
+
+@pytest.mark.parametrize(
+    "encode, compression", [(lambda m: m, "none"), (cws, "zlib"), (zws, "lzma")]
+)
+def test_header_is_read_through_each_compression(encode, compression):
+    movie = swf_movie(width=640, height=480, frames=3)
+    header = parse_swf_header(encode(movie))
+    assert header.compression == compression
+    assert (header.version, header.file_length) == (10, len(movie))
+    assert (header.width, header.height, header.frame_rate, header.frame_count) == (
+        640,
+        480,
+        24.0,
+        3,
+    )
+    assert header.actionscript3 is True and header.use_network is False
+    assert header.background_color == "#123456"
+
+
+def test_truncated_and_foreign_files():
+    movie = swf_movie()
+    with pytest.raises(SwfTruncated):
+        parse_swf_header(movie[:5])
+    with pytest.raises(SwfTruncated):
+        parse_swf_header(movie[:10])
+    with pytest.raises(SwfError):
+        parse_swf_header(b"GIF89a" + bytes(32))
+    with pytest.raises(SwfError):
+        parse_swf_header(b"CWS\x0a" + movie[4:8] + b"not zlib at all")
+
+
+@pytest.mark.asyncio
+async def test_recompression_round_trips():
+    movie = swf_movie(padding=20_000)
+    chunks = [movie[i : i + 4096] for i in range(0, len(movie), 4096)] + [b""]
+
+    async def read_chunk() -> bytes:
+        return chunks.pop(0)
+
+    stream = CompressingSwfStream(read_chunk)
+    compressed = b""
+    while piece := await stream.read(1000):
+        compressed += piece
+    assert compressed[:8] == b"CWS" + movie[3:8]
+    assert zlib.decompress(compressed[8:]) == movie[8:]
+    assert len(compressed) < len(movie)
+
+
+@pytest.mark.asyncio
+async def test_only_uncompressed_movies_are_recompressed():
+    chunks = [cws(swf_movie()), b""]
+
+    async def read_chunk() -> bytes:
+        return chunks.pop(0)
+
+    with pytest.raises(SwfError):
+        await CompressingSwfStream(read_chunk).read()
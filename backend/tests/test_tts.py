@@ -0,0 +1,103 @@
+"""
+TTS dispatcher: Retry-After parsing, the token bucket, coalescing and 429 handling
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from services.tts import TokenBucket, TTSDispatcher, TTSRateLimited, parse_retry_after
+
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) == parse_retry_after("soon") == 1.0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate_per_second=50, burst=3)
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.01
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.015
+
+
+@pytest.mark.asyncio
+async def test_pause_blocks_every_acquirer():
+    bucket = TokenBucket(rate_per_second=1000, burst=10)
+    bucket.pause_until(time.monotonic() + 0.05)
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_identical_jobs_share_one_call():
+    dispatcher = TTSDispatcher(rate_per_second=1000, burst=10, max_concurrency=2)
+    calls = []
+
+    async def synthesize():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return b"audio"
+
+    try:
+        results = await asyncio.gather(
+            *(dispatcher.submit("same text", synthesize) for _ in range(5))
+        )
+    finally:
+        await dispatcher.stop()
+    assert results == [b"audio"] * 5
+    assert len(calls) == 1
+    assert dispatcher.stats()["coalesced"] == 4 and dispatcher.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_job_is_retried_after_the_pause():
+    dispatcher = TTSDispatcher(
+        rate_per_second=1000, burst=10, max_concurrency=1, max_retries=2
+    )
+    attempts = []
+
+    async def synthesize():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise TTSRateLimited(0.05)
+        return b"audio"
+
+    try:
+        assert await dispatcher.submit("text", synthesize) == b"audio"
+    finally:
+        await dispatcher.stop()
+    assert attempts[1] - attempts[0] >= 0.04
+    assert dispatcher.stats()["rate_limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_reach_the_caller():
+    dispatcher = TTSDispatcher(
+        rate_per_second=1000, burst=10, max_concurrency=1, max_retries=1
+    )
+
+    async def always_limited():
+        raise TTSRateLimited(0.0)
+
+    async def broken():
+        raise ValueError("voice not found")
+
+    try:
+        with pytest.raises(TTSRateLimited):
+            await dispatcher.submit("limited", always_limited)
+        with pytest.raises(ValueError):
+            await dispatcher.submit("broken", broken)
+    finally:
+        await dispatcher.stop()
+    assert dispatcher.stats()["failed"] == 2
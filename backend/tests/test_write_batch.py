@@ -0,0 +1,148 @@
+"""
+WriteBatcher: per-artifact coalescing, write ordering, retries and log-row backoff
+"""
+
+import asyncio
+
+import pytest
+
+from services.write_batch import WriteBatcher
+
+
+class Recorder:
+    def __init__(
+        self, fail_updates: int = 0, fail_logs: int = 0, hold=lambda row: False
+    ):
+        self.updates: list[dict[str, dict]] = []
+        self.logs: list[list[dict]] = []
+        self.fail_updates = fail_updates
+        self.fail_logs = fail_logs
+        self.hold = hold
+
+    async def flush_updates(self, batch: dict[str, dict]) -> None:
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise RuntimeError("db down")
+        self.updates.append(dict(batch))
+
+    async def flush_logs(self, rows: list[dict]) -> list[dict]:
+        if self.fail_logs:
+            self.fail_logs -= 1
+            raise RuntimeError("fk violation")
+        held = [row for row in rows if self.hold(row)]
+        self.logs.append([row for row in rows if not self.hold(row)])
+        return held
+
+
+def batcher(recorder: Recorder, **kwargs) -> WriteBatcher:
+    return WriteBatcher(
+        recorder.flush_updates,
+        recorder.flush_logs,
+        **{"window_seconds": 0.02, **kwargs}
+    )
+
+
+@pytest.mark.asyncio
+async def test_updates_to_one_artifact_coalesce_into_one_write():
+    recorder = Recorder()
+    writes = batcher(recorder)
+    writes.start()
+    await writes.update("a", {"status": "migrating"}, wait=False)
+    await writes.update("a", {"progress": 50}, wait=False)
+    await writes.update("b", {"status": "migrating"}, wait=False)
+    await writes.update("a", {"status": "ready"}, wait=True)
+    await writes.stop()
+    assert recorder.updates == [
+        {"a": {"status": "ready", "progress": 50}, "b": {"status": "migrating"}}
+    ]
+    assert writes.stats()["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_later_updates_land_after_earlier_ones():
+    recorder = Recorder()
+    writes = batcher(recorder)
+    writes.start()
+    await writes.update("a", {"status": "migrating"}, wait=True)
+    await writes.update("a", {"status": "ready"}, wait=True)
+    await writes.stop()
+    assert [batch["a"]["status"] for batch in recorder.updates] == [
+        "migrating",
+        "ready",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pending_overlays_unwritten_updates():
+    recorder = Recorder()
+    writes = batcher(recorder, window_seconds=10)
+    await writes.update(
+        "a", {"status": "migrating"}, wait=False
+    )  # not started: written through
+    writes.start()
+    await writes.update("b", {"status": "ready"}, wait=False)
+    assert writes.pending("b") == {"status": "ready"}
+    assert writes.pending("a") is None
+    await writes.stop()
+    assert recorder.updates == [
+        {"a": {"status": "migrating"}},
+        {"b": {"status": "ready"}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_update_flush_is_retried_under_newer_values():
+    recorder = Recorder(fail_updates=1)
+    writes = batcher(recorder)  # not started: every update writes through
+    await writes.update("a", {"status": "migrating", "progress": 10})
+    assert recorder.updates == []
+    assert writes.pending("a") == {"status": "migrating", "progress": 10}
+    await writes.update("a", {"status": "ready"})
+    assert recorder.updates == [{"a": {"status": "ready", "progress": 10}}]
+    assert writes.stats()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_log_rows_do_not_delay_waited_updates():
+    recorder = Recorder(fail_logs=100)
+    writes = batcher(recorder, retry_seconds=5.0)
+    writes.start()
+    writes.log({"artifact_id": "a", "event": "upload"})
+    await asyncio.sleep(0.1)  # the log insert has failed and is backing off
+    await asyncio.wait_for(
+        writes.update("a", {"status": "ready"}, wait=True), timeout=1.0
+    )
+    assert recorder.updates == [{"a": {"status": "ready"}}]
+    assert writes.stats()["pending_logs"] == 1
+    await writes.stop()
+
+
+@pytest.mark.asyncio
+async def test_held_log_rows_are_retried_after_the_backoff():
+    held = {"a"}
+    recorder = Recorder(hold=lambda row: row["artifact_id"] in held)
+    writes = batcher(recorder, retry_seconds=0.05)
+    writes.start()
+    writes.log({"artifact_id": "a", "event": "upload"})
+    writes.log({"artifact_id": "b", "event": "upload"})
+    await asyncio.sleep(0.04)
+    assert [row["artifact_id"] for batch in recorder.logs for row in batch] == ["b"]
+    held.clear()  # the artifact reached the DB
+    await asyncio.sleep(0.15)
+    assert [row["artifact_id"] for batch in recorder.logs for row in batch] == [
+        "b",
+        "a",
+    ]
+    await writes.stop()
+    assert writes.stats()["logs_written"] == 2
+
+
+@pytest.mark.asyncio
+async def test_log_backlog_is_bounded():
+    recorder = Recorder(fail_logs=100)
+    writes = batcher(recorder, max_log_backlog=3)
+    for i in range(5):
+        writes.log({"artifact_id": str(i), "event": "upload"})
+    await writes.flush(final=True)
+    assert writes.stats()["pending_logs"] == 3
+    assert writes.stats()["logs_dropped"] == 2
@@ -6,7 +6,7 @@ CREATE TABLE artifacts (
     id BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
     artifact_id UUID NOT NULL UNIQUE DEFAULT gen_random_uuid(),
     name VARCHAR(255) NOT NULL,
-    artifact_type VARCHAR(50) NOT NULL, -- "flash", "html", "image", "other"
+    artifact_type VARCHAR(50) NOT NULL, -- "flash", "html", "image", "archive", "other"
     original_url VARCHAR(2048),
     storage_key VARCHAR(2048) NOT NULL, -- S3 key
     status VARCHAR(50) NOT NULL DEFAULT 'uploaded', -- "uploaded", "migrating", "ready", "failed"
@@ -14,6 +14,8 @@ CREATE TABLE artifacts (
     error_message TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    content_hash CHAR(64), -- SHA-256 of the uploaded bytes (dedup key)
+    parent_artifact_id UUID REFERENCES artifacts(artifact_id) ON DELETE CASCADE, -- archive this file was extracted from
     metadata JSONB DEFAULT '{}'::jsonb
 );
 
@@ -22,6 +24,13 @@ CREATE INDEX idx_artifacts_artifact_id ON artifacts(artifact_id);
 CREATE INDEX idx_artifacts_status ON artifacts(status);
 CREATE INDEX idx_artifacts_created_at ON artifacts(created_at DESC);
 CREATE INDEX idx_artifacts_artifact_type ON artifacts(artifact_type);
+CREATE INDEX idx_artifacts_content_hash ON artifacts(content_hash, created_at);
+CREATE INDEX idx_artifacts_parent ON artifacts(parent_artifact_id, created_at) WHERE parent_artifact_id IS NOT NULL;
+
+-- Keyset pagination on (created_at, artifact_id), optionally filtered by status or type
+CREATE INDEX idx_artifacts_keyset ON artifacts(created_at DESC, artifact_id DESC);
+CREATE INDEX idx_artifacts_status_keyset ON artifacts(status, created_at DESC, artifact_id DESC);
+CREATE INDEX idx_artifacts_type_keyset ON artifacts(artifact_type, created_at DESC, artifact_id DESC);
 
 -- Enable Row Level Security (optional but recommended)
 ALTER TABLE artifacts ENABLE ROW LEVEL SECURITY;
@@ -7,9 +7,9 @@
  */
 
 import { useState, useEffect, useRef } from 'react';
-import { getStorageUrl } from '@/lib/api';
+import { getContentUrl } from '@/lib/api';
 import { LoadingSpinner } from './LoadingSpinner';
-import type { Artifact } from '@/lib/types';
+import type { Artifact, SwfInfo } from '@/lib/types';
 import { TYPE_DISPLAY, STATUS_DISPLAY, STATUS_BADGE_CLASSES } from '@/lib/types';
 
 interface ExhibitPlayerProps {
@@ -24,8 +24,16 @@ export function ExhibitPlayer({ artifact }: ExhibitPlayerProps) {
   const [error, setError] = useState<string | null>(null);
   const ruffleContainerRef = useRef<HTMLDivElement>(null);
 
-  // Get the artifact URL
-  const artifactUrl = getStorageUrl(artifact.storage_key);
+  // Get the artifact URL (served by the delivery endpoint: cacheable, seekable)
+  const artifactUrl = getContentUrl(artifact);
+  // HTML pages render from the sanitized copy (scripts stripped, assets resolved) once migrated
+  const sanitizedKey = (artifact.metadata?.html as { sanitized_key?: string } | undefined)?.sanitized_key;
+  const pageUrl = sanitizedKey ? getContentUrl(artifact, 'sanitized') : artifactUrl;
+  // Flash movies: header parsed server-side; load the recompressed copy when there is one
+  const swf = artifact.metadata?.swf as SwfInfo | undefined;
+  const movieUrl = swf?.compressed_key ? getContentUrl(artifact, 'compressed') : artifactUrl;
+  // Narration audio through the delivery endpoint too, so the player can seek with Range requests
+  const narrationUrl = artifact.ghost_narration_url ? getContentUrl(artifact, 'narration') : null;
 
   // Initialize Ruffle for Flash artifacts
   useEffect(() => {
@@ -68,7 +76,10 @@ export function ExhibitPlayer({ artifact }: ExhibitPlayerProps) {
           player.style.width = '100%';
           player.style.height = '100%';
           
-          await player.load(artifactUrl);
+          await player.load({
+            url: movieUrl,
+            ...(swf?.background_color && { backgroundColor: swf.background_color }),
+          });
         }
         
         setIsLoading(false);
@@ -80,7 +91,7 @@ export function ExhibitPlayer({ artifact }: ExhibitPlayerProps) {
     };
 
     initRuffle();
-  }, [artifact.artifact_type, artifactUrl, activeTab]);
+  }, [artifact.artifact_type, movieUrl, swf?.background_color, activeTab]);
 
   // Handle iframe load
   const handleIframeLoad = () => {
@@ -193,7 +204,8 @@ export function ExhibitPlayer({ artifact }: ExhibitPlayerProps) {
           {artifact.artifact_type === 'flash' && activeTab === 'original' && (
             <div 
               ref={ruffleContainerRef}
-              className="w-full h-[500px]"
+              className={swf?.width && swf?.height ? 'mx-auto max-w-full max-h-[500px]' : 'w-full h-[500px]'}
+              style={swf?.width && swf?.height ? { aspectRatio: `${swf.width} / ${swf.height}`, width: swf.width } : undefined}
               aria-label={`Flash artifact: ${artifact.name}`}
             />
           )}
@@ -201,9 +213,9 @@ export function ExhibitPlayer({ artifact }: ExhibitPlayerProps) {
           {/* HTML artifact - Sandboxed iframe */}
           {artifact.artifact_type === 'html' && activeTab === 'original' && (
             <iframe
-              src={artifactUrl}
+              src={pageUrl}
               className="w-full h-[500px] bg-white"
-              sandbox="allow-scripts allow-same-origin"
+              sandbox={sanitizedKey ? 'allow-same-origin' : 'allow-scripts allow-same-origin'}
               title={`HTML artifact: ${artifact.name}`}
               onLoad={handleIframeLoad}
             />
@@ -339,9 +351,9 @@ export function ExhibitPlayer({ artifact }: ExhibitPlayerProps) {
       </div>
 
       {/* Narration Section - Museum Audio Guide */}
-      {artifact.ghost_narration_url && (
+      {narrationUrl && (
         <NarrationPlayer 
-          audioUrl={artifact.ghost_narration_url} 
+          audioUrl={narrationUrl} 
           artifactName={artifact.name}
         />
       )}
@@ -10,6 +10,7 @@ import { useState, useMemo } from 'react';
 import Link from 'next/link';
 import { useArtifacts } from '@/hooks/useArtifacts';
 import { LoadingSpinner } from './LoadingSpinner';
+import { getImageSrcSet } from '@/lib/api';
 import type { Artifact, ArtifactType } from '@/lib/types';
 import { 
   TYPE_BADGE_CLASSES, 
@@ -25,14 +26,18 @@ interface GalleryProps {
 type FilterType = 'all' | ArtifactType;
 
 export function Gallery({ initialArtifacts }: GalleryProps) {
-  const { artifacts, loading, error, refetch, loadMore, hasMore } = useArtifacts(20);
   const [filter, setFilter] = useState<FilterType>('all');
+  // Type filter runs server-side so every page is full of matching artifacts
+  const { artifacts, loading, error, refetch, loadMore, hasMore } = useArtifacts(
+    20,
+    filter === 'all' ? undefined : filter
+  );
 
-  // Filter artifacts by type
+  // Pre-rendered artifacts are filtered locally
   const filteredArtifacts = useMemo(() => {
-    const items = initialArtifacts || artifacts;
-    if (filter === 'all') return items;
-    return items.filter((a) => a.artifact_type === filter);
+    if (!initialArtifacts) return artifacts;
+    if (filter === 'all') return initialArtifacts;
+    return initialArtifacts.filter((a) => a.artifact_type === filter);
   }, [artifacts, initialArtifacts, filter]);
 
   // Loading state
@@ -127,6 +132,9 @@ function ArtifactCard({ artifact }: { artifact: Artifact }) {
     day: 'numeric',
     year: 'numeric',
   });
+  // Migrated images show a thumbnail instead of the type icon
+  const webpSrcSet = artifact.artifact_type === 'image' ? getImageSrcSet(artifact, 'webp') : null;
+  const avifSrcSet = webpSrcSet ? getImageSrcSet(artifact, 'avif') : null;
 
   return (
     <Link
@@ -146,14 +154,29 @@ function ArtifactCard({ artifact }: { artifact: Artifact }) {
         
         {/* Content */}
         <div className="relative p-6 pt-8">
+          {/* Thumbnail (smallest variant that fits the card) */}
+          {webpSrcSet && (
+            <picture>
+              {avifSrcSet && <source type="image/avif" srcSet={avifSrcSet} sizes="(min-width: 1024px) 320px, 50vw" />}
+              <img
+                srcSet={webpSrcSet}
+                sizes="(min-width: 1024px) 320px, 50vw"
+                alt={artifact.name}
+                loading="lazy"
+                decoding="async"
+                className="mb-4 h-32 w-full rounded-lg object-cover"
+              />
+            </picture>
+          )}
+
           {/* Type icon */}
-          <div className="text-4xl mb-4 text-center group-hover:scale-110 transition-transform">
+          {!webpSrcSet && <div className="text-4xl mb-4 text-center group-hover:scale-110 transition-transform">
             {artifact.artifact_type === 'flash' && '⚡'}
             {artifact.artifact_type === 'html' && '📄'}
             {artifact.artifact_type === 'image' && '🖼️'}
             {artifact.artifact_type === 'archive' && '📦'}
             {artifact.artifact_type === 'other' && '📁'}
-          </div>
+          </div>}
 
           {/* Name */}
           <h3 className="font-semibold text-necro-text text-center truncate mb-2 group-hover:text-necro-green transition-colors">
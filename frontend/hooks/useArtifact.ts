@@ -2,15 +2,17 @@
 
 /**
  * useArtifact Hook
- * Fetches single artifact with automatic polling for migration status
+ * Fetches single artifact and follows its migration over server-sent events
+ * Falls back to polling if the event stream is unavailable
  */
 
 import { useState, useEffect, useCallback, useRef } from 'react';
-import { getArtifact, pollMigrationStatus } from '@/lib/api';
-import type { Artifact, ApiError } from '@/lib/types';
+import { getArtifact, pollMigrationStatus, subscribeToArtifactEvents } from '@/lib/api';
+import type { Artifact, ApiError, MigrationProgress } from '@/lib/types';
 
 interface UseArtifactReturn {
   artifact: Artifact | null;
+  progress: MigrationProgress | null;
   loading: boolean;
   error: string | null;
   refetch: () => void;
@@ -18,9 +20,34 @@ interface UseArtifactReturn {
 
 export function useArtifact(id: string): UseArtifactReturn {
   const [artifact, setArtifact] = useState<Artifact | null>(null);
+  const [progress, setProgress] = useState<MigrationProgress | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const pollingRef = useRef(false);
+  const unsubscribeRef = useRef<(() => void) | null>(null);
+
+  const stopFollowing = useCallback(() => {
+    unsubscribeRef.current?.();
+    unsubscribeRef.current = null;
+    pollingRef.current = false;
+  }, []);
+
+  // Fallback: poll with backoff until the migration finishes
+  const startPolling = useCallback(async () => {
+    if (pollingRef.current) return;
+    pollingRef.current = true;
+
+    try {
+      await pollMigrationStatus(id, (updated) => {
+        setArtifact(updated);
+      });
+    } catch (pollError) {
+      // Polling timeout or error - artifact state is already set
+      console.warn('Polling ended:', pollError);
+    } finally {
+      pollingRef.current = false;
+    }
+  }, [id]);
 
   const fetchArtifact = useCallback(async () => {
     if (!id) return;
@@ -32,20 +59,21 @@ export function useArtifact(id: string): UseArtifactReturn {
       const result = await getArtifact(id);
       setArtifact(result);
 
-      // Start polling if artifact is still migrating
-      if (result.status === 'migrating' && !pollingRef.current) {
-        pollingRef.current = true;
-        
-        try {
-          await pollMigrationStatus(id, (updated) => {
+      // Follow the migration live while it is queued or running
+      if ((result.status === 'uploaded' || result.status === 'migrating') && !unsubscribeRef.current) {
+        unsubscribeRef.current = subscribeToArtifactEvents(id, {
+          onArtifact: (updated) => {
             setArtifact(updated);
-          });
-        } catch (pollError) {
-          // Polling timeout or error - artifact state is already set
-          console.warn('Polling ended:', pollError);
-        } finally {
-          pollingRef.current = false;
-        }
+            if (updated.status === 'ready' || updated.status === 'failed') {
+              setProgress(null);
+            }
+          },
+          onStage: setProgress,
+          onError: () => {
+            unsubscribeRef.current = null;
+            startPolling();
+          },
+        });
       }
     } catch (err) {
       const apiError = err as ApiError;
@@ -53,21 +81,19 @@ export function useArtifact(id: string): UseArtifactReturn {
     } finally {
       setLoading(false);
     }
-  }, [id]);
+  }, [id, startPolling]);
 
   useEffect(() => {
     fetchArtifact();
     
-    // Cleanup polling on unmount
-    return () => {
-      pollingRef.current = false;
-    };
-  }, [fetchArtifact]);
+    // Close the event stream / stop polling on unmount
+    return stopFollowing;
+  }, [fetchArtifact, stopFollowing]);
 
   const refetch = useCallback(() => {
-    pollingRef.current = false;
+    stopFollowing();
     fetchArtifact();
-  }, [fetchArtifact]);
+  }, [fetchArtifact, stopFollowing]);
 
-  return { artifact, loading, error, refetch };
+  return { artifact, progress, loading, error, refetch };
 }
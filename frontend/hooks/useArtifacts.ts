@@ -2,12 +2,13 @@
 
 /**
  * useArtifacts Hook
- * Fetches paginated artifact list with loading and error states
+ * Fetches cursor-paginated artifact list with loading and error states
+ * Optional type filter is applied server-side
  */
 
 import { useState, useEffect, useCallback } from 'react';
 import { listArtifacts } from '@/lib/api';
-import type { Artifact, ApiError } from '@/lib/types';
+import type { Artifact, ArtifactType, ApiError } from '@/lib/types';
 
 interface UseArtifactsReturn {
   artifacts: Artifact[];
@@ -21,30 +22,31 @@ interface UseArtifactsReturn {
 
 export function useArtifacts(
   limit: number = 20,
-  initialOffset: number = 0
+  artifactType?: ArtifactType
 ): UseArtifactsReturn {
   const [artifacts, setArtifacts] = useState<Artifact[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [total, setTotal] = useState(0);
-  const [offset, setOffset] = useState(initialOffset);
+  const [cursor, setCursor] = useState<string | null>(null);
 
   const fetchArtifacts = useCallback(async (reset: boolean = false) => {
     setLoading(true);
     setError(null);
 
     try {
-      const currentOffset = reset ? 0 : offset;
-      const response = await listArtifacts(limit, currentOffset);
+      const response = await listArtifacts(limit, {
+        cursor: reset ? null : cursor,
+        artifactType,
+      });
       
       if (reset) {
         setArtifacts(response.artifacts);
-        setOffset(limit);
       } else {
         setArtifacts((prev: Artifact[]) => [...prev, ...response.artifacts]);
-        setOffset((prev: number) => prev + limit);
       }
       
+      setCursor(response.next_cursor);
       setTotal(response.total);
     } catch (err) {
       const apiError = err as ApiError;
@@ -52,26 +54,26 @@ export function useArtifacts(
     } finally {
       setLoading(false);
     }
-  }, [limit, offset]);
+  }, [limit, cursor, artifactType]);
 
-  // Initial fetch
+  // Initial fetch, and again whenever the filter changes
   useEffect(() => {
     fetchArtifacts(true);
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, []);
+  }, [artifactType]);
 
   const refetch = useCallback(() => {
-    setOffset(0);
+    setCursor(null);
     fetchArtifacts(true);
   }, [fetchArtifacts]);
 
   const loadMore = useCallback(() => {
-    if (!loading && artifacts.length < total) {
+    if (!loading && cursor) {
       fetchArtifacts(false);
     }
-  }, [loading, artifacts.length, total, fetchArtifacts]);
+  }, [loading, cursor, fetchArtifacts]);
 
-  const hasMore = artifacts.length < total;
+  const hasMore = cursor !== null;
 
   return { artifacts, loading, error, total, refetch, loadMore, hasMore };
 }
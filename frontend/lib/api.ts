@@ -4,7 +4,15 @@
  * Includes curator-voiced error messages and typed responses
  */
 
-import type { Artifact, ArtifactsListResponse, ApiError, MigrationPlan } from './types';
+import type {
+  Artifact,
+  ArtifactsListResponse,
+  ApiError,
+  ImageVariant,
+  ListArtifactsOptions,
+  MigrationPlan,
+  MigrationProgress,
+} from './types';
 
 // API base URL from environment or default to localhost
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
@@ -114,17 +122,18 @@ export async function getArtifact(id: string): Promise<Artifact> {
 }
 
 /**
- * List artifacts with pagination
+ * List artifacts newest-first with keyset (cursor) pagination
+ * Pass the previous page's next_cursor to fetch the following page
  */
 export async function listArtifacts(
   limit: number = 20,
-  offset: number = 0
+  options: ListArtifactsOptions = {}
 ): Promise<ArtifactsListResponse> {
   try {
-    const params = new URLSearchParams({
-      limit: limit.toString(),
-      offset: offset.toString(),
-    });
+    const params = new URLSearchParams({ limit: limit.toString() });
+    if (options.cursor) params.set('cursor', options.cursor);
+    if (options.status) params.set('status', options.status);
+    if (options.artifactType) params.set('artifact_type', options.artifactType);
     
     const response = await fetch(`${API_BASE}/api/artifacts?${params}`);
     
@@ -213,6 +222,60 @@ export async function pollMigrationStatus(
   });
 }
 
+/**
+ * Subscribe to live migration events for an artifact (server-sent events)
+ * Pushes the artifact on every change and stage progress while migrating.
+ * onError fires if the stream can't be used, so callers can fall back to polling.
+ * Returns an unsubscribe function.
+ */
+export function subscribeToArtifactEvents(
+  id: string,
+  handlers: {
+    onArtifact: (artifact: Artifact) => void;
+    onStage?: (progress: MigrationProgress) => void;
+    onError?: () => void;
+  }
+): () => void {
+  if (typeof EventSource === 'undefined') {
+    handlers.onError?.();
+    return () => {};
+  }
+
+  const source = new EventSource(`${API_BASE}/api/artifacts/${id}/events`);
+  let current: Artifact | null = null;
+  let finished = false;
+
+  // Snapshot carries the full artifact; updates carry only changed fields
+  const handleArtifact = (event: MessageEvent) => {
+    current = { ...(current ?? {}), ...JSON.parse(event.data) } as Artifact;
+    handlers.onArtifact(current);
+    if (current.status === 'ready' || current.status === 'failed') {
+      finished = true;
+      source.close();
+    }
+  };
+
+  source.addEventListener('snapshot', handleArtifact);
+  source.addEventListener('update', handleArtifact);
+  source.addEventListener('stage', (event) => {
+    handlers.onStage?.(JSON.parse((event as MessageEvent).data) as MigrationProgress);
+  });
+
+  source.onerror = () => {
+    // The server ends the stream after a terminal status; anything else is a failure
+    source.close();
+    if (!finished) {
+      finished = true;
+      handlers.onError?.();
+    }
+  };
+
+  return () => {
+    finished = true;
+    source.close();
+  };
+}
+
 /**
  * Build S3 URL from storage key
  * Hardcoded for demo: necronet-artifacts-linford in eu-north-1
@@ -224,3 +287,33 @@ export function getStorageUrl(storageKey: string): string {
   
   return `https://${bucket}.s3.${region}.amazonaws.com/${storageKey}`;
 }
+
+/**
+ * URL of an artifact's bytes (or a derived copy) via the API's delivery endpoint
+ * Works with a private bucket, supports Range requests (seeking) and is
+ * content-addressed (?v=hash) so browsers and CDNs can cache it for good.
+ * variant: 'original' | 'sanitized' | 'compressed' | 'narration' | an image variant name
+ */
+export function getContentUrl(artifact: Artifact, variant: string = 'original'): string {
+  const params = new URLSearchParams({ variant });
+  if (artifact.content_hash) params.set('v', artifact.content_hash);
+  return `${API_BASE}/api/artifacts/${artifact.artifact_id}/content?${params}`;
+}
+
+/**
+ * Responsive srcset from the image pipeline's thumbnails (e.g. format "webp")
+ * Returns null until the artifact has been migrated
+ */
+export function getImageSrcSet(artifact: Artifact, format: 'webp' | 'avif'): string | null {
+  const variants = artifact.metadata?.variants as Record<string, ImageVariant> | undefined;
+  if (!variants) return null;
+
+  const entries = Object.entries(variants)
+    .filter(([name]) => name.startsWith('w') && name.endsWith(`.${format}`))
+    .sort(([, a], [, b]) => a.width - b.width)
+    .map(([name, variant]) => `${getContentUrl(artifact, name)} ${variant.width}w`);
+  const full = variants[`full.${format}`];
+  if (full) entries.push(`${getContentUrl(artifact, `full.${format}`)} ${full.width}w`);
+
+  return entries.length ? entries.join(', ') : null;
+}
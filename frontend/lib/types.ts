@@ -21,6 +21,9 @@ export interface Artifact {
   error_message: string | null;
   description?: string;
   original_url?: string;
+  content_hash?: string | null;
+  parent_artifact_id?: string | null; // set on files extracted from an archive
+  metadata?: Record<string, unknown> | null;
 }
 
 // Upload progress tracking for UI feedback
@@ -39,10 +42,48 @@ export interface MigrationPlan {
   estimated_duration_seconds: number;
 }
 
+// Live migration stage progress pushed over server-sent events
+export interface MigrationProgress {
+  artifact_id: string;
+  strategy: string;
+  stage: string;
+  step: number;
+  total: number;
+}
+
+// One stored image variant (metadata.variants["w320.webp"] etc.)
+export interface ImageVariant {
+  key: string;
+  width: number;
+  height: number;
+  bytes: number;
+}
+
+// Parsed SWF header (metadata.swf) - lets the player size itself before downloading the movie
+export interface SwfInfo {
+  compression: 'none' | 'zlib' | 'lzma';
+  version: number;
+  width: number;
+  height: number;
+  frame_rate: number;
+  frame_count: number;
+  actionscript3: boolean | null;
+  background_color: string | null;
+  compressed_key?: string | null;
+}
+
 // API response for artifact list endpoint
 export interface ArtifactsListResponse {
   artifacts: Artifact[];
   total: number;
+  next_cursor: string | null;
+}
+
+// Keyset pagination + server-side filters for the artifact list endpoint
+export interface ListArtifactsOptions {
+  cursor?: string | null;
+  status?: ArtifactStatus;
+  artifactType?: ArtifactType;
 }
 
 // Typed API error for consistent error handling